@@ -0,0 +1,242 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import io
+import os
+import time
+import tarfile
+import zipfile
+import threading
+
+from collections import OrderedDict
+
+# Lets a zip or tar of a tags folder stand in for the folder itself. Paths into an archive look like the archive was
+# extracted where it sits, so "drops/tags.zip/objects/weapons/rifle.weapon" is the member "objects/weapons/rifle.weapon".
+
+# Keyed by (root path, pid) since forked workers can't share the parent's file position.
+TAG_SOURCES = OrderedDict()
+TAG_SOURCE_LIMIT = 16
+
+class ArchiveStat:
+    def __init__(self, st_size, st_mtime_ns):
+        self.st_size = st_size
+        self.st_mtime_ns = st_mtime_ns
+
+class TagArchive:
+    def __init__(self, archive_path, root_path=None):
+        self.archive_path = archive_path
+        self.root_path = root_path if root_path is not None else archive_path
+        self.archive_stamp = get_archive_stamp(archive_path)
+        self.zip_file = None
+        self.tar_file = None
+        # TarFile reads through one shared file object so only one thread can be in it at a time.
+        self.tar_lock = threading.Lock()
+        self.members = {}
+        self.folded_members = {}
+        if zipfile.is_zipfile(archive_path):
+            self.zip_file = zipfile.ZipFile(archive_path)
+            for member_info in self.zip_file.infolist():
+                if not member_info.is_dir():
+                    self.members[get_member_name(member_info.filename)] = member_info
+
+        elif tarfile.is_tarfile(archive_path):
+            self.tar_file = tarfile.open(archive_path)
+            for member_info in self.tar_file.getmembers():
+                if member_info.isfile():
+                    self.members[get_member_name(member_info.name)] = member_info
+
+        else:
+            raise ValueError(f"{archive_path} is not a zip or tar archive.")
+
+        for member_name in sorted(self.members):
+            self.folded_members.setdefault(member_name.lower(), self.members[member_name])
+
+    def get_member_info(self, file_path):
+        member_name = file_path
+        if file_path.startswith(self.archive_path) and file_path[len(self.archive_path):len(self.archive_path) + 1] in ("/", "\\"):
+            member_name = file_path[len(self.archive_path) + 1:]
+
+        member_name = get_member_name(member_name)
+        member_info = self.members.get(member_name)
+        if member_info is None:
+            member_info = self.folded_members.get(member_name.lower())
+
+        return member_info
+
+    def isfile(self, file_path):
+        return self.get_member_info(file_path) is not None
+
+    def is_current(self):
+        try:
+            return get_archive_stamp(self.archive_path) == self.archive_stamp
+        except OSError:
+            return False
+
+    def find_file(self, file_path):
+        member_info = self.get_member_info(file_path)
+        if member_info is None:
+            return None
+
+        if self.zip_file is not None:
+            member_name = get_member_name(member_info.filename)
+        else:
+            member_name = get_member_name(member_info.name)
+
+        return os.path.join(self.archive_path, *member_name.split("/"))
+
+    def stat(self, file_path):
+        member_info = self.get_member_info(file_path)
+        if member_info is None:
+            raise FileNotFoundError(f"{file_path} not found in {self.archive_path}.")
+
+        if self.zip_file is not None:
+            return ArchiveStat(member_info.file_size, int(time.mktime(member_info.date_time + (0, 0, -1))) * 1000000000)
+
+        return ArchiveStat(member_info.size, int(member_info.mtime) * 1000000000)
+
+    def read_bytes(self, file_path, size=-1):
+        member_info = self.get_member_info(file_path)
+        if member_info is None:
+            raise FileNotFoundError(f"{file_path} not found in {self.archive_path}.")
+
+        if self.zip_file is not None:
+            with self.zip_file.open(member_info) as member_stream:
+                return member_stream.read(size)
+
+        with self.tar_lock:
+            return self.tar_file.extractfile(member_info).read(size)
+
+    def open(self, file_path, size=-1):
+        # Compressed members can only seek by decompressing again so hand the parser an in memory copy instead.
+        return io.BytesIO(self.read_bytes(file_path, size))
+
+    def iter_entries(self, tag_extensions=None):
+        root_name = get_member_name(os.path.relpath(self.root_path, self.archive_path))
+        if root_name == ".":
+            root_name = ""
+
+        for member_name in self.members:
+            if len(root_name) > 0 and not member_name.startswith(root_name + "/"):
+                continue
+
+            if tag_extensions is None or member_name.rsplit(".", 1)[-1] in tag_extensions:
+                file_path = os.path.join(self.archive_path, *member_name.split("/"))
+                yield file_path, self.stat(file_path)
+
+    def close(self):
+        if self.zip_file is not None:
+            self.zip_file.close()
+
+        if self.tar_file is not None:
+            self.tar_file.close()
+
+def get_archive_stamp(archive_path):
+    stat_result = os.stat(archive_path)
+
+    return (stat_result.st_size, stat_result.st_mtime_ns)
+
+def get_member_name(file_path):
+    # Tag references use backslashes and tar members sometimes start with ./ so everything is keyed on forward slashes.
+    member_name = file_path.replace("\\", "/")
+    while member_name.startswith("./"):
+        member_name = member_name[2:]
+
+    return member_name
+
+def find_archive_path(tag_directory):
+    archive_path = tag_directory
+    while len(archive_path) > 0 and not os.path.isdir(archive_path):
+        if os.path.isfile(archive_path):
+            if zipfile.is_zipfile(archive_path) or tarfile.is_tarfile(archive_path):
+                return archive_path
+
+            return None
+
+        parent_path = os.path.dirname(archive_path)
+        if parent_path == archive_path:
+            break
+
+        archive_path = parent_path
+
+    return None
+
+def get_tag_source(tag_directory):
+    if not isinstance(tag_directory, str):
+        return tag_directory
+
+    if os.path.isdir(tag_directory):
+        return tag_directory
+
+    source_key = (tag_directory, os.getpid())
+    tag_source = TAG_SOURCES.get(source_key)
+    if tag_source is not None and tag_source.is_current():
+        TAG_SOURCES.move_to_end(source_key)
+        return tag_source
+
+    stale_source = TAG_SOURCES.pop(source_key, None)
+    if is_archive_source(stale_source):
+        stale_source.close()
+
+    archive_path = find_archive_path(tag_directory)
+    if archive_path is None:
+        return tag_directory
+
+    tag_source = TagArchive(archive_path, tag_directory)
+    TAG_SOURCES[source_key] = tag_source
+    while len(TAG_SOURCES) > TAG_SOURCE_LIMIT:
+        evicted_source = TAG_SOURCES.popitem(last=False)[1]
+        if is_archive_source(evicted_source):
+            evicted_source.close()
+
+    return tag_source
+
+def is_archive_source(tag_source):
+    return isinstance(tag_source, TagArchive)
+
+def get_source_root(tag_source):
+    if is_archive_source(tag_source):
+        return tag_source.root_path
+
+    return tag_source
+
+def open_tag_file(tag_source, file_path, size=-1):
+    if is_archive_source(tag_source):
+        return tag_source.open(file_path, size)
+
+    return open(file_path, "rb")
+
+def stat_tag_file(tag_source, file_path):
+    if is_archive_source(tag_source):
+        return tag_source.stat(file_path)
+
+    return os.stat(file_path)
+
+def close_tag_sources():
+    for tag_source in TAG_SOURCES.values():
+        if is_archive_source(tag_source):
+            tag_source.close()
+
+    TAG_SOURCES.clear()
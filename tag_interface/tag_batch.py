@@ -0,0 +1,947 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import io
+import os
+import json
+import time
+import bisect
+import struct
+import collections
+import hashlib
+import traceback
+import xml.etree.ElementTree as ET
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    from . import tag_common
+    from . import tag_cache
+    from . import tag_archive
+    from . import tag_layout
+    from . import tag_patching
+    from . import tag_scanning
+    from . import tag_interface
+except ImportError:
+    import tag_common
+    import tag_cache
+    import tag_archive
+    import tag_layout
+    import tag_patching
+    import tag_scanning
+    import tag_interface
+
+# read_file and write_file keep their state in module globals so tags can't be decoded on threads. Everything here runs
+# one tag per worker process. Forked workers inherit WORKER_STATE so the definitions are only compiled once.
+
+WORKER_STATE = {}
+
+MANIFEST_VERSION = 1
+
+# Module settings in tag_interface that change what gets written. Spawned workers start from the defaults so these get sent along.
+INTERFACE_SETTINGS = ("GENERATE_CHECKSUM", "CONVERT_RADIANS", "PRESERVE_STRINGS", "PRESERVE_PADDING", "PRESERVE_VERSION", "PRESERVE_SIZE")
+
+def get_interface_settings():
+    return {setting_name: getattr(tag_interface, setting_name) for setting_name in INTERFACE_SETTINGS}
+
+def apply_interface_settings(interface_settings):
+    if interface_settings is not None:
+        for setting_name, setting_value in interface_settings.items():
+            setattr(tag_interface, setting_name, setting_value)
+
+def initialize_batch_worker(engine_tag, interface_settings=None):
+    apply_interface_settings(interface_settings)
+    if WORKER_STATE.get("engine tag") != engine_tag:
+        WORKER_STATE["merged defs"] = tag_interface.get_merged_defs(engine_tag, dump_xml=False)
+        WORKER_STATE["engine tag"] = engine_tag
+
+    if WORKER_STATE.get("obfuscation buffer") is None:
+        WORKER_STATE["obfuscation buffer"] = tag_interface.obfuscation_buffer_prepare()
+
+def get_error_log(title, lines, error=None):
+    log_text = "\n%s:\n" % title
+    for line in lines:
+        log_text += "  %s\n" % line
+
+    if error is not None:
+        log_text += "".join(traceback.format_exception(type(error), error, error.__traceback__))
+
+    return log_text
+
+def collect_tag_paths(input_dir, engine_tag=tag_common.EngineTag.H2Latest.value):
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    tag_source = tag_archive.get_tag_source(input_dir)
+    if tag_archive.is_archive_source(tag_source):
+        read_paths = [read_path for read_path, stat_result in tag_source.iter_entries()]
+    else:
+        read_paths = [os.path.join(root, file) for root, dirs, files in os.walk(input_dir) for file in files]
+
+    tag_paths = []
+    invalid_paths = []
+    for read_path in read_paths:
+        if tag_extensions.get(read_path.rsplit(".", 1)[-1]):
+            tag_paths.append(read_path)
+        else:
+            invalid_paths.append(read_path)
+
+    return tag_paths, invalid_paths
+
+def get_round_trip_result(read_path, input_dir, output_base_dir):
+    rel_path = os.path.relpath(read_path, input_dir)
+    output_dir = os.path.join(output_base_dir, os.path.dirname(rel_path))
+    output_path = os.path.join(output_dir, os.path.basename(read_path))
+    result = {"path": rel_path, "size": 0, "status": "identical", "written": False, "mismatch offset": None, "log": ""}
+
+    return result, output_path
+
+def set_parse_error(result, read_path, e):
+    result["status"] = "parse error"
+    result["error"] = f"{type(e).__name__}: {e}"
+    result["log"] += get_error_log("Parse Error", [f"File: {read_path}", f"Error: {type(e).__name__}: {e}", "While parsing tag file."], e)
+
+def set_write_error(result, output_path, e):
+    result["status"] = "write error"
+    result["error"] = f"{type(e).__name__}: {e}"
+    result["log"] += get_error_log("Write File Error", [f"File: {output_path}", f"Error: {type(e).__name__}: {e}", "While writing tag file after parsing."], e)
+
+def set_mismatch(result, read_path, output_path, mismatch_offset):
+    result["mismatch offset"] = mismatch_offset
+    if mismatch_offset != -1:
+        result["status"] = "mismatch"
+        result["log"] += get_error_log("Byte Mismatch", [f"File: {os.path.basename(read_path)}",
+                                                         f"Read Path: {read_path}",
+                                                         f"Output Path: {output_path}",
+                                                         f"First Difference: {mismatch_offset}",
+                                                         "The recompiled file differs from the original."])
+
+def dump_tag_json(result, tag_dict, output_path):
+    json_path = output_path.rsplit(".", 1)[0] + ".json"
+    try:
+        with open(json_path, 'w', encoding='utf8') as json_file:
+            json.dump(tag_dict, json_file, ensure_ascii=True, indent=4)
+
+    except Exception as e:
+        result["log"] += get_error_log("JSON Write Error", [f"File: {json_path}", f"Error: {type(e).__name__}: {e}", "While writing JSON for parsed tag."], e)
+
+def start_tag_timing(timing, read_path):
+    timing_record = None
+    if timing:
+        timing_record = {"tag group": read_path.rsplit(".", 1)[-1], "read": 0.0, "postprocess": 0.0, "upgrade": 0.0, "write": 0.0, "checksum": 0.0, "total": 0.0, "bytes in": 0, "bytes out": 0, "tag dict size": 0}
+
+    tag_interface.TIMING_RECORD = timing_record
+
+    return timing_record
+
+def finish_tag_timing(result, timing_record):
+    tag_interface.TIMING_RECORD = None
+    if timing_record is not None:
+        # read and write are timed around the whole call so take out the parts that are broken out on their own.
+        timing_record["read"] = max(0.0, timing_record["read"] - timing_record["postprocess"])
+        timing_record["write"] = max(0.0, timing_record["write"] - timing_record["upgrade"] - timing_record["checksum"])
+        timing_record["total"] = sum(timing_record[timing_key] for timing_key in ("read", "postprocess", "upgrade", "write", "checksum"))
+        result["timing"] = timing_record
+
+def round_trip_tag(read_path, input_dir, output_base_dir, engine_tag, dump_json=False, timing=False):
+    initialize_batch_worker(engine_tag)
+    merged_defs = WORKER_STATE["merged defs"]
+    result, output_path = get_round_trip_result(read_path, input_dir, output_base_dir)
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    tag_source = tag_archive.get_tag_source(input_dir)
+    timing_record = start_tag_timing(timing, read_path)
+    try:
+        result["size"] = tag_archive.stat_tag_file(tag_source, read_path).st_size
+        start_time = time.perf_counter()
+        tag_dict = tag_interface.read_file(merged_defs, tag_source, read_path, engine_tag=engine_tag, private=True)
+        tag_interface.add_timing("read", start_time)
+
+    except Exception as e:
+        set_parse_error(result, read_path, e)
+        finish_tag_timing(result, timing_record)
+        return result
+
+    if timing_record is not None:
+        timing_record["tag group"] = tag_dict["Header"]["tag group"]
+        timing_record["bytes in"] = result["size"]
+        timing_record["tag dict size"] = tag_cache.get_tag_dict_size(tag_dict)
+
+    if dump_json:
+        dump_tag_json(result, tag_dict, output_path)
+
+    reference_path = read_path
+    if tag_archive.is_archive_source(tag_source):
+        reference_path = None
+
+    try:
+        start_time = time.perf_counter()
+        write_result = tag_interface.write_file(merged_defs, tag_dict, WORKER_STATE["obfuscation buffer"], output_path, engine_tag=engine_tag, reference_path=reference_path, skip_identical=True)
+        mismatch_offset = write_result["mismatch offset"]
+        if reference_path is None:
+            # Archive members can't be mapped so compare the member bytes against what ended up on disk instead.
+            mismatch_offset = tag_interface.find_file_mismatch(tag_source.read_bytes(read_path), output_path)
+
+        tag_interface.add_timing("write", start_time)
+        result["written"] = write_result["written"]
+        set_mismatch(result, read_path, output_path, mismatch_offset)
+        if timing_record is not None:
+            timing_record["bytes out"] = write_result["size"]
+
+    except Exception as e:
+        set_write_error(result, output_path, e)
+
+    finish_tag_timing(result, timing_record)
+
+    return result
+
+def get_percentile(sorted_values, percentile):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percentile / 100))]
+
+def get_timing_summary(results, top_count=20):
+    group_times = {}
+    timed_results = [result for result in results if result.get("timing") is not None]
+    for result in timed_results:
+        group_times.setdefault(result["timing"]["tag group"], []).append(result["timing"]["total"])
+
+    group_summaries = {}
+    for tag_group, tag_times in sorted(group_times.items()):
+        tag_times.sort()
+        group_summaries[tag_group] = {"tags": len(tag_times),
+                                      "total": sum(tag_times),
+                                      "p50": get_percentile(tag_times, 50),
+                                      "p90": get_percentile(tag_times, 90),
+                                      "p99": get_percentile(tag_times, 99),
+                                      "max": tag_times[-1]}
+
+    timed_results.sort(key=lambda result: result["timing"]["total"], reverse=True)
+    slowest_tags = [{"path": result["path"], **result["timing"]} for result in timed_results[:top_count]]
+
+    return {"groups": group_summaries, "slowest": slowest_tags}
+
+def print_timing_summary(timing_summary):
+    print("%-6s %8s %10s %10s %10s %10s %10s" % ("group", "tags", "total", "p50", "p90", "p99", "max"))
+    for tag_group, group_summary in timing_summary["groups"].items():
+        print("%-6s %8d %10.3f %10.4f %10.4f %10.4f %10.4f" % (tag_group, group_summary["tags"], group_summary["total"], group_summary["p50"],
+                                                             group_summary["p90"], group_summary["p99"], group_summary["max"]))
+
+    print("\nSlowest tags:")
+    for slow_tag in timing_summary["slowest"]:
+        print("%10.4f  read %.4f  postprocess %.4f  upgrade %.4f  write %.4f  checksum %.4f  %s" % (slow_tag["total"], slow_tag["read"], slow_tag["postprocess"],
+                                                                                                slow_tag["upgrade"], slow_tag["write"], slow_tag["checksum"], slow_tag["path"]))
+
+def write_timing_report(results, timing_path):
+    with open(timing_path, "w", encoding="utf8") as timing_file:
+        for result in results:
+            if result.get("timing") is not None:
+                timing_file.write(json.dumps({"path": result["path"], "status": result["status"], **result["timing"]}) + "\n")
+
+# Estimated memory for a tag is overhead + file size * ratio * margin. Only a starting point, calibrate_memory_model
+# fits the ratios to a timing report from a real run.
+DEFAULT_MEMORY_MODEL = {"overhead": 16777216, "margin": 1.5, "default ratio": 64.0, "ratios": {"bitm": 4.0, "snd!": 4.0, "ugh!": 4.0}}
+
+def read_timing_records(timing_path):
+    with open(timing_path, "r", encoding="utf8") as timing_file:
+        return [json.loads(line) for line in timing_file if len(line.strip()) > 0]
+
+def calibrate_memory_model(timing_records, base_model=DEFAULT_MEMORY_MODEL):
+    group_totals = {}
+    for timing_record in timing_records:
+        if timing_record.get("bytes in", 0) > 0 and timing_record.get("tag dict size", 0) > 0:
+            group_total = group_totals.setdefault(timing_record["tag group"], [0, 0])
+            group_total[0] += timing_record["tag dict size"]
+            group_total[1] += timing_record["bytes in"]
+
+    memory_model = dict(base_model)
+    memory_model["ratios"] = dict(base_model["ratios"])
+    for tag_group, (tag_dict_size, file_size) in group_totals.items():
+        memory_model["ratios"][tag_group] = tag_dict_size / file_size
+
+    return memory_model
+
+def estimate_tag_memory(memory_model, tag_group, file_size):
+    ratio = memory_model["ratios"].get(tag_group, memory_model["default ratio"])
+
+    return int(memory_model["overhead"] + file_size * ratio * memory_model["margin"])
+
+def round_trip_budgeted(executor, tag_estimates, memory_budget, max_in_flight, tag_args, record_result, isolated_paths):
+    pending_tags = list(tag_estimates)
+    # Negated so bisect can search the descending estimates.
+    pending_keys = [-estimate for estimate, read_path in pending_tags]
+    futures = {}
+    memory_used = 0
+    while len(pending_tags) > 0 or len(futures) > 0:
+        while len(pending_tags) > 0 and len(futures) < max_in_flight:
+            tag_idx = bisect.bisect_left(pending_keys, memory_used - memory_budget)
+            if tag_idx == len(pending_tags):
+                break
+
+            pending_keys.pop(tag_idx)
+            estimate, read_path = pending_tags.pop(tag_idx)
+            futures[executor.submit(round_trip_tag, read_path, *tag_args)] = (read_path, estimate)
+            memory_used += estimate
+
+        done_futures, not_done_futures = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done_futures:
+            read_path, estimate = futures.pop(future)
+            memory_used -= estimate
+            try:
+                record_result(future.result())
+            except BrokenProcessPool:
+                isolated_paths.append(read_path)
+                isolated_paths.extend(read_path for estimate, read_path in pending_tags)
+                pending_tags.clear()
+                pending_keys.clear()
+
+def read_tag_bytes(tag_source, read_path):
+    with tag_archive.open_tag_file(tag_source, read_path) as input_stream:
+        return input_stream.read()
+
+def write_tag_bytes(output_path, tag_bytes, skip_identical=True):
+    if skip_identical and tag_interface.find_file_mismatch(tag_bytes, output_path) == -1:
+        return False
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    output_stream, temp_path = tag_interface.open_temp_stream(output_path)
+    try:
+        output_stream.write(tag_bytes)
+        tag_interface.commit_temp_stream(output_stream, temp_path, output_path)
+
+    except BaseException:
+        tag_interface.discard_temp_stream(output_stream, temp_path)
+        raise
+
+    return True
+
+def prefetch_tag_bytes(tag_source, read_paths, executor, max_buffered_bytes):
+    pending_reads = collections.deque()
+    buffered_bytes = 0
+    path_idx = 0
+    while path_idx < len(read_paths) or len(pending_reads) > 0:
+        # Always keep one read going even if a single tag is bigger than the budget.
+        while path_idx < len(read_paths) and (len(pending_reads) == 0 or buffered_bytes < max_buffered_bytes):
+            read_path = read_paths[path_idx]
+            try:
+                file_size = tag_archive.stat_tag_file(tag_source, read_path).st_size
+            except OSError:
+                file_size = 0
+
+            pending_reads.append((read_path, file_size, executor.submit(read_tag_bytes, tag_source, read_path)))
+            buffered_bytes += file_size
+            path_idx += 1
+
+        read_path, file_size, read_future = pending_reads.popleft()
+        buffered_bytes -= file_size
+        yield read_path, read_future
+
+def resolve_tag_write(result, output_path, write_future):
+    try:
+        result["written"] = write_future.result()
+
+    except Exception as e:
+        set_write_error(result, output_path, e)
+
+def round_trip_pipeline(input_dir, output_base_dir=None, engine_tag=tag_common.EngineTag.H2Latest.value, merged_defs=None, io_workers=4, max_buffered_bytes=268435456, log_path=None, report_path=None, dump_json=None,
+                        checkpoint_path=None, memory_limit=None, timing_path=None, top_count=20):
+    # Single process version of round_trip_directory that reads and writes on io_workers threads while this one decodes.
+    if output_base_dir is None:
+        output_base_dir = os.path.join(os.path.dirname(input_dir), "blender_output")
+
+    if dump_json is None:
+        dump_json = tag_interface.DUMP_JSON
+
+    if merged_defs is None:
+        merged_defs = tag_interface.get_merged_defs(engine_tag)
+
+    WORKER_STATE["merged defs"] = merged_defs
+    WORKER_STATE["engine tag"] = engine_tag
+
+    obfuscation_buffer = tag_interface.obfuscation_buffer_prepare()
+    os.makedirs(output_base_dir, exist_ok=True)
+    tag_source = tag_archive.get_tag_source(input_dir)
+    tag_paths, invalid_paths = collect_tag_paths(input_dir, engine_tag)
+    tag_paths.sort()
+
+    results = []
+    checkpoint_file = None
+    isolated_paths = []
+    if checkpoint_path is not None:
+        checkpoint_results, checkpoint_file = open_checkpoint(checkpoint_path, {"input dir": input_dir, "output dir": output_base_dir, "engine tag": engine_tag})
+        pending_paths = []
+        for read_path in tag_paths:
+            checkpoint_result = checkpoint_results.get(os.path.relpath(read_path, input_dir))
+            if checkpoint_result is None:
+                pending_paths.append(read_path)
+            elif checkpoint_result["status"] in ("identical", "mismatch"):
+                results.append(checkpoint_result)
+            else:
+                isolated_paths.append(read_path)
+
+        tag_paths = pending_paths
+
+    timing = timing_path is not None
+    timed_results = []
+    def record_result(result):
+        results.append(result)
+        if result.get("timing") is not None:
+            timed_results.append(result)
+
+        if checkpoint_file is not None:
+            write_checkpoint_entry(checkpoint_file, result)
+
+    processed_count = len(tag_paths) + len(isolated_paths)
+    pending_writes = collections.deque()
+    pending_write_bytes = 0
+    try:
+        with ThreadPoolExecutor(max_workers=io_workers) as executor:
+            for read_path, read_future in prefetch_tag_bytes(tag_source, tag_paths, executor, max_buffered_bytes):
+                result, output_path = get_round_trip_result(read_path, input_dir, output_base_dir)
+                timing_record = start_tag_timing(timing, read_path)
+                try:
+                    tag_bytes = read_future.result()
+                    result["size"] = len(tag_bytes)
+                    start_time = time.perf_counter()
+                    tag_dict = tag_interface.read_stream(merged_defs, tag_source, io.BytesIO(tag_bytes), read_path, engine_tag=engine_tag)
+                    tag_interface.add_timing("read", start_time)
+
+                except Exception as e:
+                    set_parse_error(result, read_path, e)
+                    finish_tag_timing(result, timing_record)
+                    record_result(result)
+                    continue
+
+                if timing_record is not None:
+                    timing_record["tag group"] = tag_dict["Header"]["tag group"]
+                    timing_record["bytes in"] = result["size"]
+                    timing_record["tag dict size"] = tag_cache.get_tag_dict_size(tag_dict)
+
+                if dump_json:
+                    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+                    dump_tag_json(result, tag_dict, output_path)
+
+                try:
+                    start_time = time.perf_counter()
+                    output_stream = io.BytesIO()
+                    tag_interface.write_file(merged_defs, tag_dict, obfuscation_buffer, output_path, engine_tag=engine_tag, output_stream=output_stream)
+                    output_bytes = output_stream.getvalue()
+                    tag_interface.add_timing("write", start_time)
+                    set_mismatch(result, read_path, output_path, tag_interface.find_mismatch_offset(memoryview(output_bytes), memoryview(tag_bytes)))
+                    if timing_record is not None:
+                        timing_record["bytes out"] = len(output_bytes)
+
+                except Exception as e:
+                    set_write_error(result, output_path, e)
+                    finish_tag_timing(result, timing_record)
+                    record_result(result)
+                    continue
+
+                finish_tag_timing(result, timing_record)
+                while len(pending_writes) > 0 and pending_write_bytes + len(output_bytes) > max_buffered_bytes:
+                    write_result, write_path, write_size, write_future = pending_writes.popleft()
+                    pending_write_bytes -= write_size
+                    resolve_tag_write(write_result, write_path, write_future)
+                    record_result(write_result)
+
+                pending_writes.append((result, output_path, len(output_bytes), executor.submit(write_tag_bytes, output_path, output_bytes)))
+                pending_write_bytes += len(output_bytes)
+
+            while len(pending_writes) > 0:
+                write_result, write_path, write_size, write_future = pending_writes.popleft()
+                resolve_tag_write(write_result, write_path, write_future)
+                record_result(write_result)
+
+        interface_settings = get_interface_settings()
+        for read_path in sorted(isolated_paths):
+            record_result(round_trip_isolated_tag(read_path, input_dir, output_base_dir, engine_tag, dump_json, interface_settings, memory_limit, timing))
+
+    finally:
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+
+    results.sort(key=lambda result: result["path"])
+    report = get_batch_report(input_dir, output_base_dir, engine_tag, results, invalid_paths, processed_count)
+    if timing:
+        timed_results.sort(key=lambda result: result["path"])
+        write_timing_report(timed_results, timing_path)
+        report["timing"] = get_timing_summary(timed_results, top_count)
+        print_timing_summary(report["timing"])
+
+    write_batch_report(report, log_path, report_path)
+
+    return report
+
+def get_definition_hashes(merged_defs):
+    definition_hashes = {}
+    for tag_group, tag_def in merged_defs.items():
+        definition_hashes[tag_group] = hashlib.sha256(ET.tostring(tag_def)).hexdigest()
+
+    return definition_hashes
+
+def load_manifest(manifest_path, engine_tag):
+    manifest = {"version": MANIFEST_VERSION, "engine tag": engine_tag, "settings": {}, "definitions": {}, "tags": {}}
+    if manifest_path is not None and os.path.isfile(manifest_path):
+        try:
+            with open(manifest_path, "r", encoding="utf8") as manifest_file:
+                loaded_manifest = json.load(manifest_file)
+
+            if loaded_manifest.get("version") == MANIFEST_VERSION and loaded_manifest.get("engine tag") == engine_tag:
+                manifest = loaded_manifest
+
+        except (OSError, ValueError):
+            # A broken manifest only costs us a full run.
+            pass
+
+    return manifest
+
+def save_manifest(manifest, manifest_path):
+    manifest_stream, temp_path = tag_interface.open_temp_stream(manifest_path)
+    try:
+        manifest_stream.write(json.dumps(manifest, ensure_ascii=True, indent=4).encode("utf8"))
+        tag_interface.commit_temp_stream(manifest_stream, temp_path, manifest_path)
+
+    except BaseException:
+        tag_interface.discard_temp_stream(manifest_stream, temp_path)
+        raise
+
+def get_manifest_key(read_path, tag_source=None):
+    stat_result = tag_archive.stat_tag_file(tag_source, read_path)
+    manifest_key = {"size": stat_result.st_size, "mtime": stat_result.st_mtime_ns, "group": None, "checksum": None}
+    try:
+        with tag_archive.open_tag_file(tag_source, read_path, 64) as input_stream:
+            valid_header, tag_group, checksum, engine_tag = tag_interface.check_header(input_stream)
+
+        manifest_key["group"] = tag_group
+        manifest_key["checksum"] = checksum
+
+    except (OSError, struct.error, UnicodeDecodeError):
+        pass
+
+    return manifest_key
+
+def is_manifest_entry_current(manifest_entry, manifest_key, manifest, definition_hashes, interface_settings, output_path):
+    if manifest_entry is None or not manifest_entry["key"] == manifest_key:
+        return False
+
+    if not manifest["settings"] == interface_settings:
+        return False
+
+    tag_group = manifest_key["group"]
+    if not manifest["definitions"].get(tag_group) == definition_hashes.get(tag_group):
+        return False
+
+    if manifest_entry["result"]["status"] in ("identical", "mismatch") and not os.path.isfile(output_path):
+        return False
+
+    return True
+
+def open_checkpoint(checkpoint_path, run_info):
+    checkpoint_results = {}
+    if os.path.isfile(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf8") as checkpoint_file:
+            checkpoint_lines = checkpoint_file.read().splitlines()
+
+        try:
+            is_current = len(checkpoint_lines) > 0 and json.loads(checkpoint_lines[0]) == run_info
+        except ValueError:
+            is_current = False
+
+        if is_current:
+            for checkpoint_line in checkpoint_lines[1:]:
+                try:
+                    checkpoint_entry = json.loads(checkpoint_line)
+                except ValueError:
+                    # Last line can be cut off if we died while writing it.
+                    continue
+
+                checkpoint_results[checkpoint_entry["path"]] = checkpoint_entry
+
+    if len(checkpoint_results) == 0:
+        checkpoint_file = open(checkpoint_path, "w", encoding="utf8")
+        checkpoint_file.write(json.dumps(run_info) + "\n")
+        checkpoint_file.flush()
+    else:
+        checkpoint_file = open(checkpoint_path, "a", encoding="utf8")
+        checkpoint_file.write("\n")
+
+    return checkpoint_results, checkpoint_file
+
+def write_checkpoint_entry(checkpoint_file, result):
+    checkpoint_file.write(json.dumps(result, ensure_ascii=True) + "\n")
+    checkpoint_file.flush()
+
+def initialize_isolated_worker(engine_tag, interface_settings=None, memory_limit=None):
+    if memory_limit is not None and resource is not None:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+
+    initialize_batch_worker(engine_tag, interface_settings)
+
+def round_trip_isolated_tag(read_path, input_dir, output_base_dir, engine_tag, dump_json, interface_settings, memory_limit=None, timing=False):
+    with ProcessPoolExecutor(max_workers=1, initializer=initialize_isolated_worker, initargs=(engine_tag, interface_settings, memory_limit)) as executor:
+        try:
+            return executor.submit(round_trip_tag, read_path, input_dir, output_base_dir, engine_tag, dump_json, timing).result()
+
+        except BrokenProcessPool as e:
+            result, output_path = get_round_trip_result(read_path, input_dir, output_base_dir)
+            result["status"] = "process error"
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["log"] += get_error_log("Process Error", [f"File: {read_path}", f"Error: {type(e).__name__}: {e}", "The worker process died while handling this tag."])
+
+            return result
+
+def get_batch_report(input_dir, output_base_dir, engine_tag, results, invalid_paths, processed_count):
+    report = {"input dir": input_dir,
+              "output dir": output_base_dir,
+              "engine tag": engine_tag,
+              "processed": processed_count,
+              "identical": sum(1 for result in results if result["status"] == "identical"),
+              "mismatches": sum(1 for result in results if result["status"] == "mismatch"),
+              "errors": sum(1 for result in results if result["status"].endswith("error")),
+              "invalid files": sorted(os.path.relpath(invalid_path, input_dir) for invalid_path in invalid_paths),
+              "tags": results}
+
+    return report
+
+def write_batch_report(report, log_path=None, report_path=None):
+    if log_path is not None:
+        with open(log_path, "w", encoding="utf-8") as log_file:
+            for invalid_path in report["invalid files"]:
+                log_file.write(get_error_log("Invalid File", [f"File: {os.path.join(report['input dir'], invalid_path)}"]))
+
+            for result in report["tags"]:
+                log_file.write(result["log"])
+
+    if report_path is not None:
+        with open(report_path, 'w', encoding='utf8') as report_file:
+            json.dump(report, report_file, ensure_ascii=True, indent=4)
+
+def round_trip_directory(input_dir, output_base_dir=None, engine_tag=tag_common.EngineTag.H2Latest.value, merged_defs=None, workers=None, log_path=None, report_path=None, dump_json=None, manifest_path=None,
+                         checkpoint_path=None, memory_limit=None, timing_path=None, top_count=20, memory_budget=None, memory_model=None):
+    # Parallel version of h1_directory/h2_directory. manifest_path skips tags that haven't changed since the last run,
+    # checkpoint_path lets a killed run pick up where it stopped and memory_budget caps the estimated memory in flight.
+    # Tags over the whole budget, retried tags and tags from a crashed worker each run in their own process limited to memory_limit.
+    if output_base_dir is None:
+        output_base_dir = os.path.join(os.path.dirname(input_dir), "blender_output")
+
+    if dump_json is None:
+        dump_json = tag_interface.DUMP_JSON
+
+    os.makedirs(output_base_dir, exist_ok=True)
+    tag_source = tag_archive.get_tag_source(input_dir)
+    tag_paths, invalid_paths = collect_tag_paths(input_dir, engine_tag)
+    tag_paths.sort(key=lambda read_path: tag_archive.stat_tag_file(tag_source, read_path).st_size, reverse=True)
+
+    if merged_defs is None:
+        merged_defs = tag_interface.get_merged_defs(engine_tag)
+
+    WORKER_STATE["merged defs"] = merged_defs
+    WORKER_STATE["engine tag"] = engine_tag
+
+    interface_settings = get_interface_settings()
+    results = []
+    manifest_keys = {}
+    if manifest_path is not None:
+        manifest = load_manifest(manifest_path, engine_tag)
+        definition_hashes = get_definition_hashes(merged_defs)
+        pending_paths = []
+        for read_path in tag_paths:
+            rel_path = os.path.relpath(read_path, input_dir)
+            manifest_key = manifest_keys[rel_path] = get_manifest_key(read_path, tag_source)
+            manifest_entry = manifest["tags"].get(rel_path)
+            if is_manifest_entry_current(manifest_entry, manifest_key, manifest, definition_hashes, interface_settings, os.path.join(output_base_dir, rel_path)):
+                results.append(manifest_entry["result"])
+            else:
+                pending_paths.append(read_path)
+
+        tag_paths = pending_paths
+
+    checkpoint_file = None
+    isolated_paths = []
+    if checkpoint_path is not None:
+        checkpoint_results, checkpoint_file = open_checkpoint(checkpoint_path, {"input dir": input_dir, "output dir": output_base_dir, "engine tag": engine_tag})
+        pending_paths = []
+        for read_path in tag_paths:
+            checkpoint_result = checkpoint_results.get(os.path.relpath(read_path, input_dir))
+            if checkpoint_result is None:
+                pending_paths.append(read_path)
+            elif checkpoint_result["status"] in ("identical", "mismatch"):
+                results.append(checkpoint_result)
+            else:
+                isolated_paths.append(read_path)
+
+        tag_paths = pending_paths
+
+    timing = timing_path is not None
+    timed_results = []
+    def record_result(result):
+        results.append(result)
+        if result.get("timing") is not None:
+            timed_results.append(result)
+
+        if checkpoint_file is not None:
+            write_checkpoint_entry(checkpoint_file, result)
+
+    processed_count = len(tag_paths) + len(isolated_paths)
+    tag_estimates = []
+    serial_paths = []
+    if memory_budget is not None:
+        if memory_model is None:
+            memory_model = DEFAULT_MEMORY_MODEL
+        elif isinstance(memory_model, str):
+            memory_model = calibrate_memory_model(read_timing_records(memory_model))
+
+        tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+        for read_path in tag_paths:
+            estimate = estimate_tag_memory(memory_model, tag_extensions.get(read_path.rsplit(".", 1)[-1]), tag_archive.stat_tag_file(tag_source, read_path).st_size)
+            if estimate > memory_budget:
+                serial_paths.append(read_path)
+            else:
+                tag_estimates.append((estimate, read_path))
+
+        tag_estimates.sort(key=lambda tag_estimate: tag_estimate[0], reverse=True)
+        tag_paths = [read_path for estimate, read_path in tag_estimates]
+
+    try:
+        if workers == 1:
+            for read_path in tag_paths:
+                record_result(round_trip_tag(read_path, input_dir, output_base_dir, engine_tag, dump_json, timing))
+
+        elif memory_budget is not None and len(tag_paths) > 0:
+            with ProcessPoolExecutor(max_workers=workers, initializer=initialize_batch_worker, initargs=(engine_tag, interface_settings)) as executor:
+                round_trip_budgeted(executor, tag_estimates, memory_budget, workers or os.cpu_count() or 1, (input_dir, output_base_dir, engine_tag, dump_json, timing),
+                                    record_result, isolated_paths)
+
+        elif len(tag_paths) > 0:
+            with ProcessPoolExecutor(max_workers=workers, initializer=initialize_batch_worker, initargs=(engine_tag, interface_settings)) as executor:
+                futures = {executor.submit(round_trip_tag, read_path, input_dir, output_base_dir, engine_tag, dump_json, timing): read_path for read_path in tag_paths}
+                for future in as_completed(futures):
+                    try:
+                        record_result(future.result())
+                    except BrokenProcessPool:
+                        # We can't tell which tag took the worker down so everything still queued gets retried on its own.
+                        isolated_paths.append(futures[future])
+
+        for read_path in serial_paths:
+            record_result(round_trip_isolated_tag(read_path, input_dir, output_base_dir, engine_tag, dump_json, interface_settings, memory_limit, timing))
+
+        for read_path in sorted(isolated_paths):
+            record_result(round_trip_isolated_tag(read_path, input_dir, output_base_dir, engine_tag, dump_json, interface_settings, memory_limit, timing))
+
+    finally:
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+
+    results.sort(key=lambda result: result["path"])
+    if manifest_path is not None:
+        manifest = {"version": MANIFEST_VERSION,
+                    "engine tag": engine_tag,
+                    "settings": interface_settings,
+                    "definitions": definition_hashes,
+                    "tags": {result["path"]: {"key": manifest_keys[result["path"]], "result": result} for result in results}}
+
+        save_manifest(manifest, manifest_path)
+
+    report = get_batch_report(input_dir, output_base_dir, engine_tag, results, invalid_paths, processed_count)
+    if timing:
+        timed_results.sort(key=lambda result: result["path"])
+        write_timing_report(timed_results, timing_path)
+        report["timing"] = get_timing_summary(timed_results, top_count)
+        print_timing_summary(report["timing"])
+
+    write_batch_report(report, log_path, report_path)
+
+    return report
+
+class TagView:
+    # Handed out by iter_tags(lazy=True). Nothing is parsed until read() is called so filters on the header cost nothing.
+    def __init__(self, read_path, input_dir, engine_tag, merged_defs):
+        self.read_path = read_path
+        self.input_dir = input_dir
+        self.engine_tag = engine_tag
+        self.merged_defs = merged_defs
+        self.tag_dict = None
+
+    def read(self):
+        if self.tag_dict is None:
+            self.tag_dict = tag_interface.read_file(self.merged_defs, tag_archive.get_tag_source(self.input_dir), self.read_path, engine_tag=self.engine_tag)
+
+        return self.tag_dict
+
+def get_tag_dict_value(tag_block_fields, field_path):
+    for field_key in field_path:
+        tag_block_fields = tag_block_fields[field_key]
+
+    return tag_block_fields
+
+def read_tag_projection(merged_defs, input_dir, read_path, engine_tag, projection):
+    field_paths = [tuple(field_path) for field_path in projection]
+    with tag_archive.open_tag_file(input_dir, read_path) as tag_stream:
+        located_fields = tag_layout.find_tag_fields(merged_defs, tag_stream, field_paths)
+        tag_header, file_endian = tag_layout.read_layout_header(tag_stream)
+
+    field_values = {}
+    unresolved_paths = []
+    for field_path in field_paths:
+        located_field = located_fields.get(field_path)
+        if located_field is None:
+            continue
+
+        field_node, offset, field_bytes = located_field
+        if tag_patching.is_field_patchable(field_node):
+            field_values[field_path] = tag_patching.decode_field_value(field_node, field_bytes, tag_header, file_endian)
+        else:
+            unresolved_paths.append(field_path)
+
+    if len(unresolved_paths) > 0:
+        # Field paths follow the layout on disk so skip postprocessing to keep them lined up.
+        preserve_version = tag_interface.PRESERVE_VERSION
+        tag_interface.PRESERVE_VERSION = True
+        try:
+            tag_dict = tag_interface.read_file(merged_defs, input_dir, read_path, engine_tag=engine_tag, private=True)
+        finally:
+            tag_interface.PRESERVE_VERSION = preserve_version
+
+        for field_path in unresolved_paths:
+            try:
+                field_values[field_path] = get_tag_dict_value(tag_dict["Data"], field_path)
+            except (KeyError, IndexError):
+                pass
+
+    return field_values
+
+def decode_tag(read_path, input_dir, engine_tag, projection=None):
+    initialize_batch_worker(engine_tag)
+    merged_defs = WORKER_STATE["merged defs"]
+    tag_source = tag_archive.get_tag_source(input_dir)
+    if projection is not None:
+        return read_tag_projection(merged_defs, tag_source, read_path, engine_tag, projection)
+
+    return tag_interface.read_file(merged_defs, tag_source, read_path, engine_tag=engine_tag, private=True)
+
+def iter_tag_headers(input_dir, groups=None, engine_tag=tag_common.EngineTag.H2Latest.value, order="filesystem", header_filter=None):
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    scan_extensions = set(tag_extensions)
+    if groups is not None:
+        groups = set(groups)
+        scan_extensions = {tag_groups[tag_group] for tag_group in groups if tag_group in tag_groups}
+
+    tag_source = tag_archive.get_tag_source(input_dir)
+    if tag_archive.is_archive_source(tag_source):
+        tag_entries = tag_source.iter_entries(scan_extensions)
+    else:
+        tag_entries = tag_scanning.iter_tag_entries(input_dir, scan_extensions)
+
+    if order == "size":
+        tag_entries = sorted(tag_entries, key=lambda tag_entry: tag_entry[1].st_size, reverse=True)
+    elif not order == "filesystem":
+        raise ValueError(f"Unknown tag order {order}.")
+
+    is_h1 = engine_tag == tag_common.EngineTag.H1Latest.value
+    for read_path, stat_result in tag_entries:
+        if tag_archive.is_archive_source(tag_source):
+            scan_record = tag_scanning.unpack_scan_record(read_path, tag_source.read_bytes(read_path, 80), stat_result.st_size, stat_result.st_mtime_ns)
+        else:
+            scan_record = tag_scanning.scan_tag_header(read_path, stat_result)
+
+        tag_header = dict(zip(tag_scanning.SCAN_FIELDS, scan_record))
+        if tag_header["tag group"] is None or not tag_header["engine tag"] in tag_common.engine_tag_values:
+            continue
+
+        if is_h1 != (tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value):
+            continue
+
+        if groups is not None and not tag_header["tag group"] in groups:
+            continue
+
+        if header_filter is not None and not header_filter(read_path, tag_header):
+            continue
+
+        yield read_path, tag_header
+
+def iter_tags(input_dir, groups=None, engine_tag=tag_common.EngineTag.H2Latest.value, projection=None, order="filesystem", header_filter=None,
+              lazy=False, merged_defs=None, workers=1, read_ahead=None, skip_errors=False):
+    # Yields (path, header, tag) where tag is the tag dict, {field path: value} for a projection or a TagView with lazy.
+    if merged_defs is None:
+        merged_defs = tag_interface.get_merged_defs(engine_tag)
+
+    WORKER_STATE["merged defs"] = merged_defs
+    WORKER_STATE["engine tag"] = engine_tag
+    tag_headers = iter_tag_headers(input_dir, groups, engine_tag, order, header_filter)
+    if lazy:
+        for read_path, tag_header in tag_headers:
+            yield read_path, tag_header, TagView(read_path, input_dir, engine_tag, merged_defs)
+
+    elif workers == 1:
+        for read_path, tag_header in tag_headers:
+            try:
+                tag = decode_tag(read_path, input_dir, engine_tag, projection)
+            except Exception:
+                if not skip_errors:
+                    raise
+
+                continue
+
+            yield read_path, tag_header, tag
+
+    else:
+        if workers is None:
+            workers = os.cpu_count() or 1
+
+        if read_ahead is None:
+            read_ahead = workers * 2
+
+        pending_tags = collections.deque()
+        with ProcessPoolExecutor(max_workers=workers, initializer=initialize_batch_worker, initargs=(engine_tag, get_interface_settings())) as executor:
+            for read_path, tag_header in tag_headers:
+                pending_tags.append((read_path, tag_header, executor.submit(decode_tag, read_path, input_dir, engine_tag, projection)))
+                if len(pending_tags) >= read_ahead:
+                    yield from resolve_decoded_tags(pending_tags, 1, skip_errors)
+
+            yield from resolve_decoded_tags(pending_tags, len(pending_tags), skip_errors)
+
+def resolve_decoded_tags(pending_tags, tag_count, skip_errors):
+    for tag_idx in range(tag_count):
+        read_path, tag_header, decode_future = pending_tags.popleft()
+        try:
+            tag = decode_future.result()
+        except Exception:
+            if not skip_errors:
+                raise
+
+            continue
+
+        yield read_path, tag_header, tag
+
+def filter_tags(tag_items, predicate):
+    for read_path, tag_header, tag in tag_items:
+        if predicate(read_path, tag_header, tag):
+            yield read_path, tag_header, tag
+
+def map_tags(tag_items, function):
+    for read_path, tag_header, tag in tag_items:
+        yield read_path, tag_header, function(read_path, tag_header, tag)
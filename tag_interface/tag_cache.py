@@ -0,0 +1,212 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import sys
+import pickle
+
+from types import MappingProxyType
+from collections import OrderedDict
+
+# Optional cache in front of read_file, off until enable_tag_cache is called. Entries are checked against the file size
+# and mtime, or the header checksum, so an edited tag is always read again. Copies of the same bytes share one entry.
+# "copy" hands every hit its own unpickled copy, "readonly" shares one frozen view that read_file(..., private=True) thaws.
+
+TAG_CACHE_VIEWS = ("copy", "readonly")
+TAG_CACHE_CHECKS = ("stat", "checksum")
+
+TAG_CACHE_BUDGET = 0
+TAG_CACHE_VIEW = "copy"
+TAG_CACHE_CHECK = "stat"
+
+TAG_CACHE = OrderedDict()
+TAG_CONTENTS = {}
+TAG_CACHE_STATS = {"size": 0, "hits": 0, "misses": 0, "evictions": 0, "shared": 0}
+
+def get_tag_dict_size(tag_dict):
+    tag_dict_size = 0
+    pending_values = [tag_dict]
+    while len(pending_values) > 0:
+        value = pending_values.pop()
+        tag_dict_size += sys.getsizeof(value)
+        if isinstance(value, (dict, MappingProxyType)):
+            pending_values.extend(value.keys())
+            pending_values.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            pending_values.extend(value)
+
+    return tag_dict_size
+
+class FrozenTagList(tuple):
+    # Tag dicts hold real tuples for vectors and the like so frozen lists are marked to thaw them back to lists.
+    pass
+
+class FrozenTagBytes(bytes):
+    pass
+
+def freeze_tag_dict(value):
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze_tag_dict(item) for key, item in value.items()})
+    elif isinstance(value, list):
+        return FrozenTagList(freeze_tag_dict(item) for item in value)
+    elif isinstance(value, bytearray):
+        return FrozenTagBytes(value)
+
+    return value
+
+def thaw_tag_dict(value):
+    if isinstance(value, MappingProxyType):
+        return {key: thaw_tag_dict(item) for key, item in value.items()}
+    elif isinstance(value, FrozenTagList):
+        return [thaw_tag_dict(item) for item in value]
+    elif isinstance(value, tuple):
+        return tuple(thaw_tag_dict(item) for item in value)
+    elif isinstance(value, FrozenTagBytes):
+        return bytearray(value)
+
+    return value
+
+def get_private_tag(tag_dict):
+    if isinstance(tag_dict, MappingProxyType):
+        return thaw_tag_dict(tag_dict)
+
+    return tag_dict
+
+def enable_tag_cache(budget, view="copy", check="stat"):
+    global TAG_CACHE_BUDGET, TAG_CACHE_VIEW, TAG_CACHE_CHECK
+    if view not in TAG_CACHE_VIEWS:
+        raise ValueError(f"Unknown tag cache view {view}.")
+
+    if check not in TAG_CACHE_CHECKS:
+        raise ValueError(f"Unknown tag cache check {check}.")
+
+    clear_tag_cache()
+    TAG_CACHE_BUDGET = budget
+    TAG_CACHE_VIEW = view
+    TAG_CACHE_CHECK = check
+
+def disable_tag_cache():
+    global TAG_CACHE_BUDGET
+    TAG_CACHE_BUDGET = 0
+    clear_tag_cache()
+
+def is_tag_cache_enabled():
+    return TAG_CACHE_BUDGET > 0
+
+def clear_tag_cache():
+    TAG_CACHE.clear()
+    TAG_CONTENTS.clear()
+    TAG_CACHE_STATS.update({"size": 0, "hits": 0, "misses": 0, "evictions": 0, "shared": 0})
+
+def get_cache_key(file_path, tag_directory, engine_tag, read_options):
+    # Postprocessing can look at other tags under tag_directory so the same file read from another one is another tag.
+    return (os.path.abspath(file_path), os.path.abspath(tag_directory), engine_tag, read_options)
+
+def get_content_cache_key(cache_key, content_key):
+    return (content_key,) + cache_key[1:]
+
+def remove_cache_entry(cache_key):
+    cache_entry = TAG_CACHE.pop(cache_key, None)
+    if cache_entry is not None:
+        content_entry = TAG_CONTENTS[cache_entry["content key"]]
+        content_entry["users"] -= 1
+        if content_entry["users"] == 0:
+            del TAG_CONTENTS[cache_entry["content key"]]
+            TAG_CACHE_STATS["size"] -= content_entry["size"]
+
+def get_tag_view(content_entry, file_path):
+    if content_entry["view"] == "copy":
+        tag_dict = pickle.loads(content_entry["tag dict"])
+        tag_dict["TagName"] = file_path
+        return tag_dict
+
+    tag_dict = content_entry["tag dict"]
+    if not tag_dict.get("TagName") == file_path:
+        tag_dict = MappingProxyType(dict(tag_dict, TagName=file_path))
+
+    return tag_dict
+
+def add_cache_entry(cache_key, merged_defs, tag_stamp, content_cache_key):
+    remove_cache_entry(cache_key)
+    TAG_CONTENTS[content_cache_key]["users"] += 1
+    TAG_CACHE[cache_key] = {"merged defs": merged_defs, "stamp": tag_stamp, "content key": content_cache_key}
+    while TAG_CACHE_STATS["size"] > TAG_CACHE_BUDGET and len(TAG_CACHE) > 0:
+        remove_cache_entry(next(iter(TAG_CACHE)))
+        TAG_CACHE_STATS["evictions"] += 1
+
+def get_cached_tag(cache_key, merged_defs, tag_stamp, file_path):
+    cache_entry = TAG_CACHE.get(cache_key)
+    # The same path read with other definitions is a different tag.
+    if cache_entry is None or cache_entry["merged defs"] is not merged_defs or not cache_entry["stamp"] == tag_stamp:
+        remove_cache_entry(cache_key)
+        return None
+
+    TAG_CACHE.move_to_end(cache_key)
+    TAG_CACHE_STATS["hits"] += 1
+
+    return get_tag_view(TAG_CONTENTS[cache_entry["content key"]], file_path)
+
+def get_cached_content(cache_key, merged_defs, tag_stamp, content_key, file_path):
+    content_cache_key = get_content_cache_key(cache_key, content_key)
+    content_entry = TAG_CONTENTS.get(content_cache_key)
+    if content_entry is None or content_entry["merged defs"] is not merged_defs:
+        return None
+
+    add_cache_entry(cache_key, merged_defs, tag_stamp, content_cache_key)
+    TAG_CACHE_STATS["shared"] += 1
+
+    return get_tag_view(content_entry, file_path)
+
+def cache_tag(cache_key, merged_defs, tag_stamp, tag_dict, content_key):
+    TAG_CACHE_STATS["misses"] += 1
+    if not is_tag_cache_enabled() or len(tag_dict) == 0:
+        return tag_dict
+
+    if TAG_CACHE_VIEW == "copy":
+        cached_dict = pickle.dumps(tag_dict, pickle.HIGHEST_PROTOCOL)
+        entry_size = len(cached_dict)
+        result_dict = tag_dict
+    else:
+        cached_dict = freeze_tag_dict(tag_dict)
+        entry_size = get_tag_dict_size(cached_dict)
+        result_dict = cached_dict
+
+    remove_cache_entry(cache_key)
+    content_cache_key = get_content_cache_key(cache_key, content_key)
+    if entry_size <= TAG_CACHE_BUDGET and content_cache_key not in TAG_CONTENTS:
+        TAG_CONTENTS[content_cache_key] = {"merged defs": merged_defs, "view": TAG_CACHE_VIEW, "tag dict": cached_dict, "size": entry_size, "users": 0}
+        TAG_CACHE_STATS["size"] += entry_size
+        add_cache_entry(cache_key, merged_defs, tag_stamp, content_cache_key)
+
+    return result_dict
+
+def get_tag_cache_stats():
+    tag_cache_stats = dict(TAG_CACHE_STATS)
+    tag_cache_stats["entries"] = len(TAG_CACHE)
+    tag_cache_stats["contents"] = len(TAG_CONTENTS)
+    tag_cache_stats["budget"] = TAG_CACHE_BUDGET
+
+    return tag_cache_stats
@@ -0,0 +1,267 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import json
+import sqlite3
+
+try:
+    from . import tag_common
+    from . import tag_layout
+    from . import tag_interface
+    from . import tag_scanning
+except ImportError:
+    import tag_common
+    import tag_layout
+    import tag_interface
+    import tag_scanning
+
+# One row per tag in a tags directory so tools can query groups, versions and references without opening every file.
+# Tag paths and reference paths also get a lowercase backslash key since that's how references are written in tags.
+
+CATALOG_VERSION = 1
+
+CATALOG_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS catalog_info (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS tags ("
+    "path TEXT PRIMARY KEY, "
+    "tag_path TEXT, "
+    "tag_key TEXT, "
+    "tag_group TEXT, "
+    "engine_tag TEXT, "
+    "version INTEGER, "
+    "checksum INTEGER, "
+    "flags INTEGER, "
+    "tag_type INTEGER, "
+    "data_offset INTEGER, "
+    "data_length INTEGER, "
+    "destination INTEGER, "
+    "plugin_handle INTEGER, "
+    "root_version INTEGER, "
+    "root_count INTEGER, "
+    "root_size INTEGER, "
+    "file_size INTEGER, "
+    "mtime INTEGER, "
+    "valid INTEGER, "
+    "references_scanned INTEGER)",
+    "CREATE TABLE IF NOT EXISTS tag_references ("
+    "path TEXT, "
+    "field_path TEXT, "
+    "reference_group TEXT, "
+    "reference_path TEXT, "
+    "reference_key TEXT)",
+    "CREATE INDEX IF NOT EXISTS tags_group_version ON tags (tag_group, version)",
+    "CREATE INDEX IF NOT EXISTS tags_key ON tags (tag_key, tag_group)",
+    "CREATE INDEX IF NOT EXISTS tag_references_key ON tag_references (reference_key, reference_group)",
+    "CREATE INDEX IF NOT EXISTS tag_references_path ON tag_references (path)",
+    "CREATE TABLE IF NOT EXISTS group_matches (reference_group TEXT, tag_group TEXT, PRIMARY KEY (reference_group, tag_group))",
+)
+
+# A reference resolves to the tags with the same key in any group it matches. References without a group never
+# join group_matches so those are matched on the path alone.
+RESOLVED_REFERENCES = ("SELECT r.path AS path, t.path AS reference FROM tag_references r "
+                       "JOIN group_matches g ON g.reference_group = r.reference_group "
+                       "JOIN tags t ON t.tag_key = r.reference_key AND t.tag_group = g.tag_group "
+                       "UNION ALL "
+                       "SELECT r.path AS path, t.path AS reference FROM tag_references r "
+                       "JOIN tags t ON t.tag_key = r.reference_key "
+                       "WHERE COALESCE(r.reference_group, '') = ''")
+
+# UNION drops rows already in the closure so reference loops end.
+DEPENDENCIES_QUERY = ("WITH RECURSIVE resolved(path, reference) AS (%s), "
+                      "closure(path) AS (SELECT ? UNION SELECT resolved.reference FROM closure JOIN resolved ON resolved.path = closure.path) "
+                      "SELECT path FROM closure WHERE NOT path = ? ORDER BY path") % RESOLVED_REFERENCES
+
+DEPENDENTS_QUERY = ("WITH RECURSIVE resolved(path, reference) AS (%s), "
+                    "closure(path) AS (SELECT ? UNION SELECT resolved.path FROM closure JOIN resolved ON resolved.reference = closure.path) "
+                    "SELECT path FROM closure WHERE NOT path = ? ORDER BY path") % RESOLVED_REFERENCES
+
+TAG_COLUMNS = ("path", "tag_path", "tag_key", "tag_group", "engine_tag", "version", "checksum", "flags", "tag_type", "data_offset", "data_length",
+               "destination", "plugin_handle", "root_version", "root_count", "root_size", "file_size", "mtime", "valid", "references_scanned")
+
+TAG_SCAN_COLUMNS = ("path", "tag_group", "engine_tag", "version", "checksum", "file_size", "mtime", "root_version", "root_count", "root_size",
+                    "flags", "tag_type", "data_offset", "data_length", "destination", "plugin_handle")
+
+def get_tag_key(tag_path):
+    return tag_path.replace("/", "\\").lower()
+
+def open_catalog(catalog_path):
+    connection = sqlite3.connect(catalog_path)
+    connection.row_factory = sqlite3.Row
+    # WAL lets other tools query the catalog while it's being updated.
+    connection.execute("PRAGMA journal_mode=WAL")
+    with connection:
+        for statement in CATALOG_SCHEMA:
+            connection.execute(statement)
+
+        connection.execute("INSERT OR IGNORE INTO catalog_info (key, value) VALUES ('version', ?)", (str(CATALOG_VERSION),))
+        group_matches = [(tag_group, tag_group) for tag_group in set(tag_common.h1_tag_groups) | set(tag_common.h2_tag_groups)]
+        group_matches.extend((tag_group, child_group) for tag_group, child_groups in tag_common.tag_group_children.items() for child_group in child_groups)
+        connection.executemany("INSERT OR IGNORE INTO group_matches (reference_group, tag_group) VALUES (?, ?)", group_matches)
+
+    return connection
+
+def get_catalog_record(scan_record, rel_path):
+    tag_path = rel_path.rsplit(".", 1)[0]
+    tag_record = dict(zip(TAG_SCAN_COLUMNS, scan_record))
+    tag_record.update({"path": rel_path, "tag_path": tag_path, "tag_key": get_tag_key(tag_path), "references_scanned": 0,
+                       "valid": int(tag_scanning.is_scan_record_valid(scan_record))})
+
+    return tag_record
+
+def read_tag_references(merged_defs, read_path):
+    tag_references = []
+    with open(read_path, "rb") as tag_stream:
+        for reference_group, reference_path, field_path in tag_layout.scan_tag_references(merged_defs, tag_stream):
+            # No group comes back as None for -1 or as null bytes, both are stored as NULL.
+            if reference_group is not None and len(reference_group.strip("\x00")) == 0:
+                reference_group = None
+
+            tag_references.append((list(field_path), reference_group, reference_path))
+
+    return tag_references
+
+def update_catalog(catalog_path, input_dir, engine_tag=tag_common.EngineTag.H2Latest.value, references=False, merged_defs=None, workers=None):
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    if references and merged_defs is None:
+        merged_defs = tag_interface.get_merged_defs(engine_tag)
+
+    connection = open_catalog(catalog_path)
+    update_counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    try:
+        catalog_rows = {row["path"]: (row["file_size"], row["mtime"], row["references_scanned"], row["checksum"]) for row in connection.execute("SELECT path, file_size, mtime, references_scanned, checksum FROM tags")}
+        found_paths = set()
+        changed_entries = []
+        for read_path, stat_result in tag_scanning.iter_tag_entries(input_dir, set(tag_extensions)):
+            rel_path = os.path.relpath(read_path, input_dir)
+            found_paths.add(rel_path)
+            catalog_row = catalog_rows.get(rel_path)
+            if catalog_row is not None and catalog_row[0] == stat_result.st_size and catalog_row[1] == stat_result.st_mtime_ns and (catalog_row[2] or not references):
+                update_counts["unchanged"] += 1
+                continue
+
+            if catalog_row is None:
+                update_counts["added"] += 1
+            else:
+                update_counts["updated"] += 1
+
+            changed_entries.append((read_path, stat_result))
+
+        tag_records = [(scan_record[0], get_catalog_record(scan_record, os.path.relpath(scan_record[0], input_dir))) for scan_record in tag_scanning.scan_tag_files(changed_entries, workers)]
+
+        # Everything that reads tags happens before the transaction so the catalog is only write locked while rows go in.
+        stale_paths = []
+        reference_rows = []
+        for read_path, tag_record in tag_records:
+            catalog_row = catalog_rows.get(tag_record["path"])
+            if (tag_record["valid"] and catalog_row is not None and catalog_row[2] and tag_record["checksum"]
+                and catalog_row[0] == tag_record["file_size"] and catalog_row[3] == tag_record["checksum"]):
+                # Tags that never had a checksum written are all 0 so those always get scanned again.
+                tag_record["references_scanned"] = 1
+
+            else:
+                # The tag really changed so whatever references it had are stale even if we aren't scanning this time.
+                stale_paths.append((tag_record["path"],))
+                if references and tag_record["valid"]:
+                    try:
+                        tag_references = read_tag_references(merged_defs, read_path)
+                        reference_rows.extend((tag_record["path"], json.dumps(field_path), reference_group, reference_path, get_tag_key(reference_path))
+                                              for field_path, reference_group, reference_path in tag_references)
+                        tag_record["references_scanned"] = 1
+
+                    except Exception:
+                        # references_scanned stays 0 so the next update tries again.
+                        pass
+
+        removed_paths = [(rel_path,) for rel_path in catalog_rows if rel_path not in found_paths]
+        update_counts["removed"] = len(removed_paths)
+        insert_statement = "INSERT OR REPLACE INTO tags (%s) VALUES (%s)" % (", ".join(TAG_COLUMNS), ", ".join("?" * len(TAG_COLUMNS)))
+        with connection:
+            connection.executemany("DELETE FROM tags WHERE path = ?", removed_paths)
+            connection.executemany("DELETE FROM tag_references WHERE path = ?", removed_paths + stale_paths)
+            connection.executemany("INSERT INTO tag_references (path, field_path, reference_group, reference_path, reference_key) VALUES (?, ?, ?, ?, ?)", reference_rows)
+            connection.executemany(insert_statement, [tuple(tag_record[column] for column in TAG_COLUMNS) for read_path, tag_record in tag_records])
+            connection.execute("INSERT OR REPLACE INTO catalog_info (key, value) VALUES ('input dir', ?)", (input_dir,))
+            connection.execute("INSERT OR REPLACE INTO catalog_info (key, value) VALUES ('engine tag', ?)", (engine_tag,))
+
+    finally:
+        connection.close()
+
+    return update_counts
+
+def find_tags(connection, tag_group=None, version=None, engine_tag=None):
+    conditions = []
+    parameters = []
+    for column, value in (("tag_group", tag_group), ("version", version), ("engine_tag", engine_tag)):
+        if value is not None:
+            conditions.append("%s = ?" % column)
+            parameters.append(value)
+
+    query = "SELECT * FROM tags"
+    if len(conditions) > 0:
+        query += " WHERE " + " AND ".join(conditions)
+
+    return connection.execute(query + " ORDER BY path", parameters).fetchall()
+
+def find_referencing_tags(connection, reference_path, reference_group=None):
+    query = "SELECT * FROM tag_references WHERE reference_key = ?"
+    parameters = [get_tag_key(reference_path)]
+    if reference_group is not None:
+        query += " AND reference_group = ?"
+        parameters.append(reference_group)
+
+    return connection.execute(query + " ORDER BY path", parameters).fetchall()
+
+def get_dependencies(connection, path, transitive=False):
+    if not transitive:
+        return [row["reference"] for row in connection.execute("SELECT DISTINCT reference FROM (%s) WHERE path = ? ORDER BY reference" % RESOLVED_REFERENCES, (path,))]
+
+    return [row["path"] for row in connection.execute(DEPENDENCIES_QUERY, (path, path))]
+
+def get_dependents(connection, path, transitive=False):
+    if not transitive:
+        return [row["path"] for row in connection.execute("SELECT DISTINCT path FROM (%s) WHERE reference = ? ORDER BY path" % RESOLVED_REFERENCES, (path,))]
+
+    return [row["path"] for row in connection.execute(DEPENDENTS_QUERY, (path, path))]
+
+def get_orphans(connection, tag_group=None):
+    query = "SELECT path FROM tags WHERE valid = 1 AND path NOT IN (SELECT reference FROM (%s))" % RESOLVED_REFERENCES
+    parameters = []
+    if tag_group is not None:
+        query += " AND tag_group = ?"
+        parameters.append(tag_group)
+
+    return [row["path"] for row in connection.execute(query + " ORDER BY path", parameters)]
+
+def get_missing_references(connection, path=None):
+    query = ("SELECT * FROM tag_references r WHERE NOT EXISTS (SELECT 1 FROM tags t WHERE t.tag_key = r.reference_key AND "
+             "(COALESCE(r.reference_group, '') = '' OR t.tag_group IN (SELECT g.tag_group FROM group_matches g WHERE g.reference_group = r.reference_group)))")
+    parameters = []
+    if path is not None:
+        query += " AND r.path = ?"
+        parameters.append(path)
+
+    return connection.execute(query + " ORDER BY r.path", parameters).fetchall()
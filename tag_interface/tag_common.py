@@ -244,6 +244,15 @@ h2_tag_groups = {
 h1_tag_extensions = {ext: group for group, ext in h1_tag_groups.items()}
 h2_tag_extensions = {ext: group for group, ext in h2_tag_groups.items()}
 
+# References to these groups can point at a tag of any of the listed groups. Everything else only matches its own group.
+tag_group_children = {
+    "obje": ("bipd", "vehi", "weap", "eqip", "garb", "proj", "scen", "mach", "ctrl", "lifi", "plac", "ssce", "bloc", "crea"),
+    "unit": ("bipd", "vehi"),
+    "item": ("weap", "eqip", "garb"),
+    "devi": ("mach", "ctrl", "lifi"),
+    "shdr": ("senv", "soso", "sotr", "schi", "scex", "swat", "sgla", "smet", "spla"),
+}
+
 h1_tag_groups_tuple=[(key, val, f"{val} tag") for key, val in h1_tag_groups.items()]
 h2_tag_groups_tuple=[(key, val, f"{val} tag") for key, val in h2_tag_groups.items()]
 
@@ -0,0 +1,112 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import io
+import os
+
+from types import MappingProxyType
+from collections import OrderedDict
+
+try:
+    from . import tag_cache
+    from . import tag_common
+    from . import tag_interface
+    from . import tag_patching
+except ImportError:
+    import tag_cache
+    import tag_common
+    import tag_interface
+    import tag_patching
+
+# A default tag only depends on the definitions, the group, the engine and the write options so each one is encoded once.
+
+DEFAULT_TAG_IMAGES = OrderedDict()
+DEFAULT_TAG_IMAGE_LIMIT = 256
+
+def get_default_image_options():
+    return (tag_interface.GENERATE_CHECKSUM,
+            tag_interface.CONVERT_RADIANS,
+            tag_interface.PRESERVE_STRINGS,
+            tag_interface.PRESERVE_PADDING,
+            tag_interface.PRESERVE_VERSION,
+            tag_interface.PRESERVE_SIZE)
+
+def get_default_tag_image(merged_defs, tag_group, engine_tag=tag_common.EngineTag.H2Latest.value):
+    image_key = (id(merged_defs), tag_group, engine_tag, get_default_image_options())
+    default_image = DEFAULT_TAG_IMAGES.get(image_key)
+    if default_image is not None:
+        DEFAULT_TAG_IMAGES.move_to_end(image_key)
+        return default_image
+
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    tag_extension = tag_groups.get(tag_group)
+    if tag_extension is None or merged_defs.get(tag_group) is None:
+        raise ValueError(f"Tag group {tag_group} not found.")
+
+    file_path = "default.%s" % tag_extension
+    tag_stream = io.BytesIO()
+    tag_interface.write_file(merged_defs, {"Data": {}}, tag_interface.obfuscation_buffer_prepare(), file_path, engine_tag=engine_tag, output_stream=tag_stream)
+    tag_bytes = tag_stream.getvalue()
+
+    tag_stream.seek(0)
+    tag_dict = tag_interface.read_stream(merged_defs, "", tag_stream, file_path, engine_tag=engine_tag)
+    default_image = MappingProxyType({"merged defs": merged_defs,
+                                      "bytes": tag_bytes,
+                                      "checksum": tag_interface.checksum_calculate_stream(io.BytesIO(tag_bytes), 64),
+                                      "tag dict": tag_cache.freeze_tag_dict(tag_dict)})
+
+    DEFAULT_TAG_IMAGES[image_key] = default_image
+    while len(DEFAULT_TAG_IMAGES) > DEFAULT_TAG_IMAGE_LIMIT:
+        DEFAULT_TAG_IMAGES.popitem(last=False)
+
+    return default_image
+
+def get_default_tag_dict(merged_defs, tag_group, engine_tag=tag_common.EngineTag.H2Latest.value):
+    return tag_cache.thaw_tag_dict(get_default_tag_image(merged_defs, tag_group, engine_tag)["tag dict"])
+
+def create_default_tag(merged_defs, tag_group, file_path, engine_tag=tag_common.EngineTag.H2Latest.value, field_values=None):
+    default_image = get_default_tag_image(merged_defs, tag_group, engine_tag)
+    tag_bytes = default_image["bytes"]
+    changes = []
+    if field_values:
+        tag_stream = io.BytesIO(tag_bytes)
+        changes = tag_patching.patch_tag_stream(merged_defs, tag_stream, field_values)
+        tag_bytes = tag_stream.getvalue()
+
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    output_stream, temp_path = tag_interface.open_temp_stream(file_path)
+    try:
+        output_stream.write(tag_bytes)
+        tag_interface.commit_temp_stream(output_stream, temp_path, file_path)
+
+    except BaseException:
+        tag_interface.discard_temp_stream(output_stream, temp_path)
+        raise
+
+    return changes
+
+def clear_default_tag_images():
+    DEFAULT_TAG_IMAGES.clear()
@@ -538,7 +538,7 @@ def generate_defs_from_jsons(base_dir, output_dir):
 
     return merged_cache
 
-def generate_defs(base_dir, output_dir):
+def generate_defs(base_dir, output_dir, dump_xml=True):
     tag_defs, regolith_map = parse_all_xmls(base_dir)
     merged_cache = {}
     for tag_def in tag_defs:
@@ -547,7 +547,7 @@ def generate_defs(base_dir, output_dir):
     for tag_def in merged_cache:
         initialize_definitions(merged_cache[tag_def], regolith_map)
 
-    if DUMP_XML:
+    if DUMP_XML and dump_xml:
         dump_merged_xml(merged_cache, output_dir, tag_common.h1_tag_groups)
 
     return merged_cache
@@ -31,7 +31,7 @@ except ImportError:
     
 from .common import initialize_definitions, parse_all_xmls, dump_merged_xml, merge_parent_tag, DUMP_XML
 
-def generate_defs(base_dir, output_dir):
+def generate_defs(base_dir, output_dir, dump_xml=True):
     tag_defs, regolith_map = parse_all_xmls(base_dir)
     merged_cache = {}
     for tag_def in tag_defs:
@@ -40,7 +40,7 @@ def generate_defs(base_dir, output_dir):
     for tag_def in merged_cache:
         initialize_definitions(merged_cache[tag_def], regolith_map)
 
-    if DUMP_XML:
+    if DUMP_XML and dump_xml:
         dump_merged_xml(merged_cache, output_dir, tag_common.h2_tag_groups)
 
     return merged_cache
@@ -0,0 +1,375 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import collections
+
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+try:
+    from . import tag_layout
+    from . import tag_archive
+    from . import tag_resolver
+    from . import tag_batch
+    from . import tag_interface
+except ImportError:
+    import tag_layout
+    import tag_archive
+    import tag_resolver
+    import tag_batch
+    import tag_interface
+
+# Loads a tag and everything it references as a graph, parsing each tag on a process pool as soon as it's found.
+
+class TagNode:
+    def __init__(self, tag_group, tag_path, depth=0):
+        self.tag_group = tag_group
+        self.tag_path = tag_path
+        self.depth = depth
+        self.asset = None
+        self.content_key = None
+        self.missing = False
+        self.error = None
+        self.references = []
+        self.referenced_by = []
+
+    @property
+    def key(self):
+        return get_node_key(self.tag_group, self.tag_path)
+
+def get_node_key(tag_group, tag_path):
+    return (tag_group, tag_resolver.get_folded_path(tag_path))
+
+class TagEdge:
+    # One TagReference from source to target. reference_group is the group the reference asked for.
+    def __init__(self, source, target, reference_group):
+        self.source = source
+        self.target = target
+        self.reference_group = reference_group
+
+class TagGraph:
+    def __init__(self):
+        self.nodes = {}
+        self.edges = []
+        self.root = None
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __iter__(self):
+        return iter(self.nodes.values())
+
+    def get_node(self, tag_group, tag_path):
+        return self.nodes.get(get_node_key(tag_group, tag_path))
+
+    def add_node(self, tag_group, tag_path, depth=0):
+        node_key = get_node_key(tag_group, tag_path)
+        node = self.nodes.get(node_key)
+        if node is None:
+            node = self.nodes[node_key] = TagNode(tag_group, tag_path, depth)
+
+        return node
+
+    def add_edge(self, source, target, reference_group):
+        edge = TagEdge(source, target, reference_group)
+        self.edges.append(edge)
+        self.nodes[source].references.append(edge)
+        self.nodes[target].referenced_by.append(edge)
+
+        return edge
+
+    def dependencies(self, tag_group, tag_path):
+        return [self.nodes[edge.target] for edge in self.nodes[get_node_key(tag_group, tag_path)].references]
+
+    def dependents(self, tag_group, tag_path):
+        return [self.nodes[edge.source] for edge in self.nodes[get_node_key(tag_group, tag_path)].referenced_by]
+
+def get_asset_references(merged_defs, parsed_asset, game_title, tag_directory, tag_groups, engine_tag, prepare_for_blender, traversal_policy=None):
+    tag_group = parsed_asset["Header"]["tag group"]
+    tag_def = merged_defs.get(tag_group)
+    latest_field_set = None
+    for layout in tag_def:
+        for field_set in layout:
+            if bool(field_set.attrib.get('isLatest')):
+                latest_field_set = field_set
+                break
+
+    if latest_field_set is None:
+        raise ValueError(f"Latest field set not found.")
+
+    tag_references = []
+    for field_node in latest_field_set:
+        tag_interface.get_tag_references(field_node, parsed_asset["Data"], tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, {}, prepare_for_blender,
+                                         traversal_policy, tag_group)
+
+    return tag_references
+
+def load_graph_tag(tag_group, tag_path, tag_directory, game_title, engine_tag, prepare_for_blender, traversal_policy=None, merged_defs=None):
+    if merged_defs is None:
+        tag_batch.initialize_batch_worker(engine_tag)
+        merged_defs = tag_batch.WORKER_STATE["merged defs"]
+
+    tag_source = tag_archive.get_tag_source(tag_directory)
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    read_path = tag_interface.get_tag_file_path(tag_source, tag_path, tag_groups.get(tag_group))
+    parsed_asset = None
+    content_key = None
+    if read_path is not None:
+        try:
+            with tag_archive.open_tag_file(tag_source, read_path) as tag_stream:
+                tag_bytes = tag_stream.read()
+
+            # Hashed here so generate_tag_dictionary can key the asset store without reading the tag again.
+            content_key = tag_interface.get_content_key(tag_bytes)
+            parsed_asset = tag_interface.read_tag_bytes(merged_defs, tag_source, read_path, tag_bytes, engine_tag, content_key=content_key, private=True)
+        except FileNotFoundError:
+            pass
+
+    tag_references = []
+    if parsed_asset is not None:
+        for tag_reference in get_asset_references(merged_defs, parsed_asset, game_title, tag_source, tag_groups, engine_tag, prepare_for_blender, traversal_policy):
+            tag_references.append((tag_reference["group name"], tag_reference["path"]))
+
+    return parsed_asset is not None, parsed_asset, tag_references, content_key
+
+def scan_graph_tag(tag_group, tag_path, tag_directory, game_title, engine_tag, prepare_for_blender, traversal_policy=None, merged_defs=None):
+    if traversal_policy is None:
+        traversal_policy = tag_interface.DEFAULT_TRAVERSAL_POLICY
+
+    if merged_defs is None:
+        tag_batch.initialize_batch_worker(engine_tag)
+        merged_defs = tag_batch.WORKER_STATE["merged defs"]
+
+    tag_source = tag_archive.get_tag_source(tag_directory)
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    read_path = tag_interface.get_tag_file_path(tag_source, tag_path, tag_groups.get(tag_group))
+    if read_path is None:
+        return False, None, [], None
+
+    tag_references = []
+    with tag_archive.open_tag_file(tag_source, read_path) as tag_stream:
+        for reference_group, reference_path, field_path in tag_layout.scan_tag_references(merged_defs, tag_stream, traversal_policy.get_field_filter(tag_group)):
+            reference_group = traversal_policy.get_reference_group(game_title, reference_group)
+            if traversal_policy.allows_group(tag_group, reference_group):
+                tag_references.append((reference_group, reference_path))
+
+    return True, None, tag_references, None
+
+def lower_node_depth(graph, node, depth):
+    # A shorter chain turned up after node was found, everything already hanging off it gets closer to the root too.
+    pending_nodes = collections.deque([(node, depth)])
+    while len(pending_nodes) > 0:
+        node, depth = pending_nodes.popleft()
+        if node.depth <= depth:
+            continue
+
+        node.depth = depth
+        pending_nodes.extend((graph.nodes[edge.target], depth + 1) for edge in node.references)
+
+def set_graph_result(graph, node, tag_found, parsed_asset, tag_references, content_key=None, traversal_policy=None):
+    new_nodes = []
+    node.asset = parsed_asset
+    node.content_key = content_key
+    node.missing = not tag_found
+    # Only right if depth is final when the node loads, see hold_levels in iter_tag_graph.
+    if traversal_policy is not None and not traversal_policy.allows_depth(node.depth + 1):
+        return new_nodes
+
+    for reference_group, reference_path in tag_references:
+        if tag_interface.string_empty_check(reference_path):
+            continue
+
+        target_node = graph.get_node(reference_group, reference_path)
+        if target_node is None:
+            target_node = graph.add_node(reference_group, reference_path, node.depth + 1)
+            new_nodes.append(target_node)
+
+        else:
+            lower_node_depth(graph, target_node, node.depth + 1)
+
+        graph.add_edge(node.key, target_node.key, reference_group)
+
+    return new_nodes
+
+def get_ready_nodes(graph, node, ready_keys, pending_counts):
+    target_keys = set(edge.target for edge in node.references if not edge.target == node.key)
+    pending_counts[node.key] = len([target_key for target_key in target_keys if target_key not in ready_keys])
+    ready_nodes = []
+    pending_nodes = [node]
+    while len(pending_nodes) > 0:
+        node = pending_nodes.pop()
+        if node.key in ready_keys or not pending_counts.get(node.key) == 0:
+            continue
+
+        ready_keys.add(node.key)
+        ready_nodes.append(node)
+        for source_key in set(edge.source for edge in node.referenced_by):
+            if source_key in pending_counts and source_key not in ready_keys:
+                pending_counts[source_key] -= 1
+                pending_nodes.append(graph.nodes[source_key])
+
+    return ready_nodes
+
+def get_cycle_order(graph, node_keys):
+    node_keys = set(node_keys)
+    index_counter = 0
+    node_indices = {}
+    low_links = {}
+    component_stack = []
+    on_stack = set()
+    ordered_keys = []
+    for start_key in sorted(node_keys):
+        if start_key in node_indices:
+            continue
+
+        call_stack = [(start_key, iter(graph.nodes[start_key].references))]
+        node_indices[start_key] = low_links[start_key] = index_counter
+        index_counter += 1
+        component_stack.append(start_key)
+        on_stack.add(start_key)
+        while len(call_stack) > 0:
+            node_key, edge_iter = call_stack[-1]
+            for edge in edge_iter:
+                if edge.target not in node_keys:
+                    continue
+
+                if edge.target not in node_indices:
+                    node_indices[edge.target] = low_links[edge.target] = index_counter
+                    index_counter += 1
+                    component_stack.append(edge.target)
+                    on_stack.add(edge.target)
+                    call_stack.append((edge.target, iter(graph.nodes[edge.target].references)))
+                    break
+
+                elif edge.target in on_stack:
+                    low_links[node_key] = min(low_links[node_key], node_indices[edge.target])
+
+            else:
+                call_stack.pop()
+                if len(call_stack) > 0:
+                    parent_key = call_stack[-1][0]
+                    low_links[parent_key] = min(low_links[parent_key], low_links[node_key])
+
+                if low_links[node_key] == node_indices[node_key]:
+                    while True:
+                        component_key = component_stack.pop()
+                        on_stack.discard(component_key)
+                        ordered_keys.append(component_key)
+                        if component_key == node_key:
+                            break
+
+    return ordered_keys
+
+def iter_tag_graph(game_title, root_tag_ref, tag_directory, engine_tag, merged_defs=None, workers=None, prepare_for_blender=True, references_only=False, graph=None,
+                   traversal_policy=None):
+    # Yields each TagNode once it and everything it references has loaded. Tags in a reference loop come out last.
+    if traversal_policy is None:
+        traversal_policy = tag_interface.DEFAULT_TRAVERSAL_POLICY
+
+    load_function = load_graph_tag
+    if references_only:
+        load_function = scan_graph_tag
+
+    if merged_defs is None:
+        merged_defs = tag_interface.get_merged_defs(engine_tag)
+
+    # Archives can't be sent to a worker so they get the path and open their own.
+    source_root = tag_archive.get_source_root(tag_directory)
+    # Before the pool starts so the workers inherit the index.
+    tag_interface.refresh_tag_directory(tag_directory)
+    if graph is None:
+        graph = TagGraph()
+
+    root_path = root_tag_ref.get("path", "")
+    if tag_interface.string_empty_check(root_path):
+        return
+
+    root_node = graph.add_node(root_tag_ref.get("group name", ""), root_path)
+    graph.root = root_node.key
+    ready_keys = set()
+    pending_counts = {}
+    if workers == 1:
+        pending_nodes = collections.deque([root_node])
+        while len(pending_nodes) > 0:
+            node = pending_nodes.popleft()
+            try:
+                tag_found, parsed_asset, tag_references, content_key = load_function(node.tag_group, node.tag_path, tag_directory, game_title, engine_tag, prepare_for_blender, traversal_policy,
+                                                                                      merged_defs)
+                pending_nodes.extend(set_graph_result(graph, node, tag_found, parsed_asset, tag_references, content_key, traversal_policy))
+            except Exception as e:
+                node.error = f"{type(e).__name__}: {e}"
+
+            yield from get_ready_nodes(graph, node, ready_keys, pending_counts)
+
+    else:
+        # Workers finish in whatever order so with a max depth a tag could be found down a long chain first and never
+        # expanded. Holding new nodes until the level loading now is done keeps depth the shortest chain.
+        hold_levels = traversal_policy.max_depth is not None
+        # Forked workers pick the definitions up from WORKER_STATE, put back what was there before once the pool is done.
+        previous_state = {state_key: tag_batch.WORKER_STATE[state_key] for state_key in ("merged defs", "engine tag") if state_key in tag_batch.WORKER_STATE}
+        tag_batch.WORKER_STATE["merged defs"] = merged_defs
+        tag_batch.WORKER_STATE["engine tag"] = engine_tag
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=tag_batch.initialize_batch_worker, initargs=(engine_tag, tag_batch.get_interface_settings())) as executor:
+                futures = {executor.submit(load_function, root_node.tag_group, root_node.tag_path, source_root, game_title, engine_tag, prepare_for_blender, traversal_policy): root_node}
+                next_level_nodes = []
+                try:
+                    while len(futures) > 0:
+                        done_futures, not_done_futures = wait(futures, return_when=FIRST_COMPLETED)
+                        for future in done_futures:
+                            node = futures.pop(future)
+                            try:
+                                tag_found, parsed_asset, tag_references, content_key = future.result()
+                                next_level_nodes.extend(set_graph_result(graph, node, tag_found, parsed_asset, tag_references, content_key, traversal_policy))
+                            except Exception as e:
+                                node.error = f"{type(e).__name__}: {e}"
+
+                            yield from get_ready_nodes(graph, node, ready_keys, pending_counts)
+
+                        if not hold_levels or len(futures) == 0:
+                            for new_node in next_level_nodes:
+                                futures[executor.submit(load_function, new_node.tag_group, new_node.tag_path, source_root, game_title, engine_tag, prepare_for_blender, traversal_policy)] = new_node
+
+                            next_level_nodes = []
+
+                finally:
+                    # The consumer stopped early, don't make it wait on tags nobody will look at.
+                    for future in futures:
+                        future.cancel()
+
+        finally:
+            tag_batch.WORKER_STATE.pop("merged defs", None)
+            tag_batch.WORKER_STATE.pop("engine tag", None)
+            tag_batch.WORKER_STATE.update(previous_state)
+
+    for node_key in get_cycle_order(graph, [node_key for node_key in graph.nodes if node_key not in ready_keys]):
+        yield graph.nodes[node_key]
+
+def load_tag_graph(game_title, root_tag_ref, tag_directory, engine_tag, merged_defs=None, workers=None, prepare_for_blender=True, references_only=False, traversal_policy=None):
+    graph = TagGraph()
+    for node in iter_tag_graph(game_title, root_tag_ref, tag_directory, engine_tag, merged_defs, workers, prepare_for_blender, references_only, graph, traversal_policy):
+        pass
+
+    return graph
@@ -30,7 +30,12 @@ import re
 import base64
 import struct
 import json
+import mmap
+import stat
+import time
+import zlib
 import hashlib
+import tempfile
 import traceback
 import xml.etree.ElementTree as ET
 
@@ -39,6 +44,12 @@ from math import degrees, radians, copysign
 
 try:
     from . import tag_common
+    from . import tag_archive
+    from . import tag_cache
+    from . import tag_store
+    from . import tag_resolver
+    from . import tag_traversal
+    from . import tag_graph
     from .tag_definitions import h1, h2, common
     from .tag_postprocessing.h1 import postprocess_functions as h1_postprocess_functions
     from .tag_postprocessing.h2 import postprocess_functions as h2_postprocess_functions, create_function
@@ -46,6 +57,12 @@ try:
     from .tag_upgrading.h2 import upgrade_functions as h2_upgrade_functions
 except ImportError:
     import tag_common
+    import tag_archive
+    import tag_cache
+    import tag_store
+    import tag_resolver
+    import tag_traversal
+    import tag_graph
     from tag_definitions import h1, h2, common
     from tag_postprocessing.h1 import postprocess_functions as h1_postprocess_functions
     from tag_postprocessing.h2 import postprocess_functions as h2_postprocess_functions, create_function
@@ -77,6 +94,99 @@ def checksum_calculate(source_buffer, obfuscation_buffer):
 
     return calculated_checksum
 
+def gf2_matrix_times(matrix, vector):
+    result = 0
+    matrix_idx = 0
+    while vector:
+        if vector & 1:
+            result ^= matrix[matrix_idx]
+
+        vector >>= 1
+        matrix_idx += 1
+
+    return result
+
+def gf2_matrix_square(matrix):
+    return [gf2_matrix_times(matrix, row) for row in matrix]
+
+def get_zero_operators(count=64):
+    # operators[bit] advances a checksum past 2 ** bit zero bytes. Built once since squaring 32x32 matrices isn't cheap.
+    odd_matrix = [0xEDB88320] + [1 << row_idx for row_idx in range(31)]
+    even_matrix = gf2_matrix_square(odd_matrix)
+    odd_matrix = gf2_matrix_square(even_matrix)
+    zero_operators = [gf2_matrix_square(odd_matrix)]
+    while len(zero_operators) < count:
+        zero_operators.append(gf2_matrix_square(zero_operators[-1]))
+
+    return zero_operators
+
+CHECKSUM_ZERO_OPERATORS = get_zero_operators()
+
+def checksum_append_zeros(checksum, length):
+    # Advances a checksum as if length zero bytes were run through checksum_calculate. Same operator zlib uses for crc32_combine.
+    operator_idx = 0
+    while length > 0:
+        if length & 1:
+            checksum = gf2_matrix_times(CHECKSUM_ZERO_OPERATORS[operator_idx], checksum)
+
+        length >>= 1
+        operator_idx += 1
+
+    return checksum
+
+def checksum_patch(checksum, old_bytes, new_bytes, trailing_length):
+    # The tag checksum is linear so replacing bytes only needs the checksum of the xor delta shifted past the bytes that follow it.
+    delta = bytes(old_byte ^ new_byte for old_byte, new_byte in zip(old_bytes, new_bytes))
+    delta_checksum = zlib.crc32(delta, 0xFFFFFFFF) ^ 0xFFFFFFFF
+
+    return checksum ^ checksum_append_zeros(delta_checksum, trailing_length)
+
+def checksum_calculate_stream(input_stream, offset=0):
+    calculated_checksum = 0
+    input_stream.seek(offset)
+    while chunk := input_stream.read(1048576):
+        calculated_checksum = zlib.crc32(chunk, calculated_checksum)
+
+    return calculated_checksum ^ 0xFFFFFFFF
+
+class TagStreamView:
+    # Every block is appended to the end of the file as it's reached so the end of the file is always the end of the innermost block.
+    def __init__(self, stream, base_offset=0):
+        self.stream = stream
+        self.base_offset = base_offset
+
+    def tell(self):
+        return self.stream.tell() - self.base_offset
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_SET:
+            offset += self.base_offset
+
+        return self.stream.seek(offset, whence) - self.base_offset
+
+    def write(self, data):
+        return self.stream.write(data)
+
+    def create_view(self, initial_size):
+        self.stream.seek(0, io.SEEK_END)
+        view_offset = self.stream.tell()
+        while initial_size > 0:
+            chunk_size = min(initial_size, 1048576)
+            self.stream.write(bytes(chunk_size))
+            initial_size -= chunk_size
+
+        self.stream.seek(view_offset)
+
+        return TagStreamView(self.stream, view_offset)
+
+def get_stream_size(tag_stream):
+    pos = tag_stream.tell()
+    tag_stream.seek(0, io.SEEK_END)
+    stream_size = tag_stream.tell()
+    tag_stream.seek(pos)
+
+    return stream_size
+
 def string_to_bytes(string, field_endian):
     if field_endian == "<":
         string = string[::-1]
@@ -98,6 +208,8 @@ DUMP_JSON = False
 
 GENERATE_CHECKSUM = True
 CONVERT_RADIANS = True
+# Set to a dict to have read_file and write_file add the seconds spent postprocessing, upgrading and checksumming to it.
+TIMING_RECORD = None
 PRESERVE_STRINGS = False
 PRESERVE_PADDING = False
 PRESERVE_VERSION = False
@@ -342,6 +454,43 @@ def check_header(input_stream):
 
     return valid_header, tag_group, checksum, engine_tag
 
+def read_header(tag_stream, file_endian="<"):
+    header_struct = struct.unpack('%shbb32s4sIiiihbb4s' % file_endian, tag_stream.read(64))
+
+    header_unk1 = header_struct[0]
+    header_flags = header_struct[1]
+    header_tag_type = header_struct[2]
+    header_name = header_struct[3].decode('utf-8', 'replace').split('\x00', 1)[0].strip('\x20')
+    header_tag_group = header_struct[4].decode('utf-8', 'replace')
+    if file_endian == "<":
+        header_tag_group = header_tag_group[::-1]
+    header_checksum = header_struct[5]
+    header_data_offset = header_struct[6]
+    header_data_length = header_struct[7]
+    header_unk2 = header_struct[8]
+    header_version = header_struct[9]
+    header_destination = header_struct[10]
+    header_plugin_handle = header_struct[11]
+    header_engine_tag = header_struct[12].decode('utf-8', 'replace')
+    if file_endian == "<":
+        header_engine_tag = header_engine_tag[::-1]
+
+    tag_header = {"unk1": header_unk1, 
+                  "flags": header_flags, 
+                  "tag type": header_tag_type, 
+                  "name": header_name, 
+                  "tag group": header_tag_group, 
+                  "checksum": header_checksum, 
+                  "data offset": header_data_offset, 
+                  "data length": header_data_length, 
+                  "unk2": header_unk2, 
+                  "version": header_version, 
+                  "destination": header_destination, 
+                  "plugin handle": header_plugin_handle, 
+                  "engine tag": header_engine_tag}
+
+    return tag_header
+
 def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_node, tag_block_fields, block_idx=0, struct_offset=0, return_size=False):
     result = None
     field_tag = field_node.tag
@@ -543,7 +692,17 @@ def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_nod
                     current_block_count = len(current_block)
                     if current_block_count > 0:
                         initial_size = (current_block_count * current_field_header_data["size"])
-                        current_block_stream = io.BytesIO(b"\x00" * initial_size)
+                        if isinstance(block_stream, TagStreamView):
+                            # Streaming straight to disk. The block goes at the end of the file right now instead of being copied in once it's done.
+                            pos = block_stream.tell()
+                            block_stream.seek(0, io.SEEK_END)
+                            if not tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
+                                write_field_header(current_field_header_data, current_block_count, block_stream, is_legacy=HAS_LEGACY_HEADER)
+
+                            current_block_stream = block_stream.create_view(initial_size)
+                        else:
+                            current_block_stream = io.BytesIO(b"\x00" * initial_size)
+
                         for block_idx, block_element in enumerate(current_block):
                             for field_node in block_field_set:
                                 get_fields(tag_stream, current_block_stream, tag_header, current_field_header_data, field_node, block_element, block_idx)
@@ -556,20 +715,23 @@ def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_nod
                                 else:
                                     current_block_stream.write(bytes(len(leftover_bytes)))
 
-                        pos = block_stream.tell()
-                        block_stream.seek(0, io.SEEK_END)  
-                        current_block_stream.seek(0)
-                        if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
-                            block_stream.write(current_block_stream.getvalue())
+                        if isinstance(block_stream, TagStreamView):
                             block_stream.seek(pos)
                         else:
-                            combined_stream = io.BytesIO()
-                            tag_block_header_stream = io.BytesIO(b"\x00" * tag_block_header_size)
-                            write_field_header(current_field_header_data, current_block_count, tag_block_header_stream, is_legacy=HAS_LEGACY_HEADER)
-                            combined_stream.write(tag_block_header_stream.getvalue())
-                            combined_stream.write(current_block_stream.getvalue())
-                            block_stream.write(combined_stream.getvalue())
-                            block_stream.seek(pos)
+                            pos = block_stream.tell()
+                            block_stream.seek(0, io.SEEK_END)  
+                            current_block_stream.seek(0)
+                            if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
+                                block_stream.write(current_block_stream.getvalue())
+                                block_stream.seek(pos)
+                            else:
+                                combined_stream = io.BytesIO()
+                                tag_block_header_stream = io.BytesIO(b"\x00" * tag_block_header_size)
+                                write_field_header(current_field_header_data, current_block_count, tag_block_header_stream, is_legacy=HAS_LEGACY_HEADER)
+                                combined_stream.write(tag_block_header_stream.getvalue())
+                                combined_stream.write(current_block_stream.getvalue())
+                                block_stream.write(combined_stream.getvalue())
+                                block_stream.seek(pos)
     elif field_tag == "ByteFlags":
         field_default = 0
         field_size = 1
@@ -852,7 +1014,7 @@ def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_nod
         else:
             if not unread_data_size < field_size:
                 string_pad = get_result("%s_pad" % field_key, tag_block_fields)
-                if result is not None or not PRESERVE_VERSION:
+                if string_pad is None or not PRESERVE_VERSION:
                     string_pad = 0
                 result = get_result(field_key, tag_block_fields)
                 if HAS_LEGACY_STRINGS:
@@ -873,7 +1035,7 @@ def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_nod
                         write_variable_string(block_stream, result, ">", fixed_length=len(result), terminator_length=0, append_terminator=False)
                         block_stream.seek(pos)
                     else:
-                        block_stream.write(struct.pack(struct_string, field_default))
+                        block_stream.write(struct.pack(struct_string, string_pad, field_default))
     elif field_tag == "Pad":
         field_size = 0
         tag_attribute = field_attrib.get("tag")
@@ -1453,7 +1615,7 @@ def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_nod
             if not tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
                 # We don't use field size here cause field size is used for the total read data in the block chunk. Structs come from the resource chunk written after block data. - Gen
                 pos = tag_stream.tell()
-                if not (os.stat(tag_stream.name).st_size - pos) < 16:
+                if not (get_stream_size(tag_stream) - pos) < 16:
                     def_tag = field_node[0].get("tag")
                     # TODO: Check if structs make use of the count. Seems to be one across the board but what happens if it's set manually? - Gen
                     struct_name, struct_version, struct_count, struct_size = read_field_header(tag_stream, is_legacy=HAS_LEGACY_HEADER)
@@ -1753,7 +1915,7 @@ def get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_nod
                 else:    
                     block_stream.write(struct.pack(struct_string, *field_default))
 
-def read_file(merged_defs, tag_directory, file_path="", engine_tag=tag_common.EngineTag.H2Latest.value, file_endian_override=None):
+def read_stream(merged_defs, tag_directory, tag_stream, file_path="", engine_tag=tag_common.EngineTag.H2Latest.value, file_endian_override=None):
     global PRESERVE_VERSION
     if engine_tag == tag_common.EngineTag.H1Latest.value:
         file_endian = ">"
@@ -1766,128 +1928,261 @@ def read_file(merged_defs, tag_directory, file_path="", engine_tag=tag_common.En
 
     update_interface(FileModeEnum.read, file_endian)
 
-    with open(file_path, "rb") as tag_stream:
-        tag_dict = {}
-        tag_dict["TagName"] = file_path
-        header_struct = struct.unpack('%shbb32s4sIiiihbb4s' % file_endian, tag_stream.read(64))
-
-        header_unk1 = header_struct[0]
-        header_flags = header_struct[1]
-        header_tag_type = header_struct[2]
-        header_name = header_struct[3].decode('utf-8', 'replace').split('\x00', 1)[0].strip('\x20')
-        header_tag_group = header_struct[4].decode('utf-8', 'replace')
-        if file_endian == "<":
-            header_tag_group = header_tag_group[::-1]
-        header_checksum = header_struct[5]
-        header_data_offset = header_struct[6]
-        header_data_length = header_struct[7]
-        header_unk2 = header_struct[8]
-        header_version = header_struct[9]
-        header_destination = header_struct[10]
-        header_plugin_handle = header_struct[11]
-        header_engine_tag = header_struct[12].decode('utf-8', 'replace')
-        if file_endian == "<":
-            header_engine_tag = header_engine_tag[::-1]
-
-        tag_dict["Header"] = {"unk1": header_unk1, 
-                              "flags": header_flags, 
-                              "tag type": header_tag_type, 
-                              "name": header_name, 
-                              "tag group": header_tag_group, 
-                              "checksum": header_checksum, 
-                              "data offset": header_data_offset, 
-                              "data length": header_data_length, 
-                              "unk2": header_unk2, 
-                              "version": header_version, 
-                              "destination": header_destination, 
-                              "plugin handle": header_plugin_handle, 
-                              "engine tag": header_engine_tag}
-    
-        tag_header = tag_dict["Header"]
-        if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
-            tag_groups = tag_common.h1_tag_groups
-            tag_extensions = tag_common.h1_tag_extensions
-            postprocess_functions =  h1_postprocess_functions
-        else:
-            tag_groups = tag_common.h2_tag_groups
-            tag_extensions = tag_common.h2_tag_extensions
-            postprocess_functions =  h2_postprocess_functions
+    tag_dict = {}
+    tag_dict["TagName"] = file_path
+    tag_dict["Header"] = read_header(tag_stream, file_endian)
 
-        if not is_header_valid(tag_header, tag_groups):
-            return {}
+    tag_header = tag_dict["Header"]
+    if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
+        tag_groups = tag_common.h1_tag_groups
+        tag_extensions = tag_common.h1_tag_extensions
+        postprocess_functions =  h1_postprocess_functions
+    else:
+        tag_groups = tag_common.h2_tag_groups
+        tag_extensions = tag_common.h2_tag_extensions
+        postprocess_functions =  h2_postprocess_functions
 
-        tag_group = tag_header["tag group"]
-        tag_extension = tag_groups.get(tag_group)
+    if not is_header_valid(tag_header, tag_groups):
+        return {}
 
-        is_tag_block_legacy(tag_header)
-        is_string_legacy(tag_header)
-        is_padding_legacy(tag_header)
+    tag_group = tag_header["tag group"]
+    tag_extension = tag_groups.get(tag_group)
 
-        sound_hack = False
-        if tag_group == "snd!" and not PRESERVE_VERSION:
-            sound_hack = True
-            #This is here because snd! tags are complicated. 
-            # Essentially version 0-3 do not have the sound_info block and generate it through some process when going to latest.
-            # It's not a simple conversion and I'm half thinking that making this work would be halfway to making a custom sound import pipeline. - Gen
-            PRESERVE_VERSION = True
-            PRESERVE_SIZE = True
+    is_tag_block_legacy(tag_header)
+    is_string_legacy(tag_header)
+    is_padding_legacy(tag_header)
 
-        tag_def = merged_defs.get(tag_group)
-        if tag_def is None:
-            raise ValueError(f"Tag group {tag_group} not found for extension {tag_extension}.")
-        
-        tag_dict["TagBlockHeader_%s" % tag_extension] = {"name": "tbfd", "version": 0, "size": 0}
-        tag_dict["Data"] = {}
+    sound_hack = False
+    if tag_group == "snd!" and not PRESERVE_VERSION:
+        sound_hack = True
+        #This is here because snd! tags are complicated. 
+        # Essentially version 0-3 do not have the sound_info block and generate it through some process when going to latest.
+        # It's not a simple conversion and I'm half thinking that making this work would be halfway to making a custom sound import pipeline. - Gen
+        PRESERVE_VERSION = True
+        PRESERVE_SIZE = True
 
-        latest_field_set = None
+    tag_def = merged_defs.get(tag_group)
+    if tag_def is None:
+        raise ValueError(f"Tag group {tag_group} not found for extension {tag_extension}.")
+
+    tag_dict["TagBlockHeader_%s" % tag_extension] = {"name": "tbfd", "version": 0, "size": 0}
+    tag_dict["Data"] = {}
+
+    latest_field_set = None
+    for layout in tag_def:
+        for field_set in layout:
+            if bool(field_set.attrib.get('isLatest')):
+                latest_field_set = field_set
+
+    if latest_field_set is None:
+        raise ValueError(f"Latest field set not found.")
+
+    block_count = 1
+    if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
+        version = int(latest_field_set.attrib.get('version'))
+        size = int(latest_field_set.attrib.get('sizeofValue'))
+        field_header = {"name": "tbfd", "version": version, "size": size}
+
+    else:
+        name, version, block_count, size = read_field_header(tag_stream, is_legacy=HAS_LEGACY_HEADER)
+        field_header = {"name": name, "version": version, "size": size}
+        if tag_header["tag group"] == "vrtx" and field_header["size"] == 20:
+            field_header["version"] = -1
+
+    tag_block_header = tag_dict["TagBlockHeader_%s" % tag_extension] = field_header
+    block_stream = io.BytesIO(tag_stream.read(block_count * tag_block_header["size"]))
+    for block_idx in range(block_count):
         for layout in tag_def:
-            for field_set in layout:
-                if bool(field_set.attrib.get('isLatest')):
-                    latest_field_set = field_set
+            field_set = layout[tag_block_header["version"]]
+            start_pos = block_stream.tell()
+            for field_node in field_set:
+                get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_node, tag_dict["Data"], block_idx)
+
+            read_size =  tag_block_header["size"] - (block_stream.tell() - start_pos)
+            if read_size > 0:
+                leftover_data = block_stream.read(read_size)
+                set_encoded_result("LeftOverData_%s" % tag_extension, tag_dict["Data"], leftover_data)
+
+    postprocess_step = postprocess_functions.get(tag_header["tag group"])
+    if postprocess_step is not None and not PRESERVE_VERSION:
+        start_time = time.perf_counter()
+        postprocess_step(merged_defs, tag_dict, file_endian, tag_directory)
+        add_timing("postprocess", start_time)
 
-        if latest_field_set is None:
-            raise ValueError(f"Latest field set not found.")
+    if sound_hack:
+        #This is here because snd! tags are complicated. 
+        # Essentially version 0-3 do not have the sound_info block and generate it through some process when going to latest.
+        # It's not a simple conversion and I'm half thinking that making this work would be halfway to making a custom sound import pipeline. - Gen
+        PRESERVE_VERSION = False
+        PRESERVE_SIZE = False
 
-        block_count = 1
-        if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
-            version = int(latest_field_set.attrib.get('version'))
-            size = int(latest_field_set.attrib.get('sizeofValue'))
-            field_header = {"name": "tbfd", "version": version, "size": size}
+    return tag_dict
 
-        else:
-            name, version, block_count, size = read_field_header(tag_stream, is_legacy=HAS_LEGACY_HEADER)
-            field_header = {"name": name, "version": version, "size": size}
-            if tag_header["tag group"] == "vrtx" and field_header["size"] == 20:
-                field_header["version"] = -1
-
-        tag_block_header = tag_dict["TagBlockHeader_%s" % tag_extension] = field_header
-        block_stream = io.BytesIO(tag_stream.read(block_count * tag_block_header["size"]))
-        for block_idx in range(block_count):
-            for layout in tag_def:
-                field_set = layout[tag_block_header["version"]]
-                start_pos = block_stream.tell()
-                for field_node in field_set:
-                    get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_node, tag_dict["Data"], block_idx)
-
-                read_size =  tag_block_header["size"] - (block_stream.tell() - start_pos)
-                if read_size > 0:
-                    leftover_data = block_stream.read(read_size)
-                    set_encoded_result("LeftOverData_%s" % tag_extension, tag_dict["Data"], leftover_data)
-
-        postprocess_step = postprocess_functions.get(tag_header["tag group"])
-        if postprocess_step is not None and not PRESERVE_VERSION:
-            postprocess_step(merged_defs, tag_dict, file_endian, tag_directory)
-
-        if sound_hack:
-            #This is here because snd! tags are complicated. 
-            # Essentially version 0-3 do not have the sound_info block and generate it through some process when going to latest.
-            # It's not a simple conversion and I'm half thinking that making this work would be halfway to making a custom sound import pipeline. - Gen
-            PRESERVE_VERSION = False
-            PRESERVE_SIZE = False
-
-        return tag_dict
-
-def write_file(merged_defs, tag_dict, obfuscation_buffer, file_path="", engine_tag=tag_common.EngineTag.H2Latest.value, file_endian_override=None):
+def get_content_prefix(tag_bytes):
+    checksum = 0
+    if len(tag_bytes) >= 64:
+        checksum_endian = ">" if tag_bytes[60:64] == b"blam" else "<"
+        checksum = struct.unpack_from("%sI" % checksum_endian, tag_bytes, 40)[0]
+
+    return "%08x-%d" % (checksum, len(tag_bytes))
+
+def get_content_key(tag_bytes):
+    return "%s-%s" % (get_content_prefix(tag_bytes), hashlib.sha256(tag_bytes).hexdigest())
+
+def get_tag_stamp(tag_directory, file_path):
+    if tag_cache.TAG_CACHE_CHECK == "checksum":
+        with tag_archive.open_tag_file(tag_directory, file_path, 64) as input_stream:
+            valid_header, tag_group, checksum, engine_tag = check_header(input_stream)
+
+        return (tag_group, checksum)
+
+    stat_result = tag_archive.stat_tag_file(tag_directory, file_path)
+
+    return (stat_result.st_size, stat_result.st_mtime_ns)
+
+def read_file(merged_defs, tag_directory, file_path="", engine_tag=tag_common.EngineTag.H2Latest.value, file_endian_override=None, private=False):
+    # tag_directory can point at or into a zip or tar, or be a source from tag_archive.get_tag_source already.
+    # private=True always returns a tag dict the caller can change, even when the tag cache hands out readonly views.
+    tag_directory = tag_archive.get_tag_source(tag_directory)
+    if not tag_cache.is_tag_cache_enabled():
+        with tag_archive.open_tag_file(tag_directory, file_path) as tag_stream:
+            return read_stream(merged_defs, tag_directory, tag_stream, file_path, engine_tag, file_endian_override)
+
+    cache_key = get_read_cache_key(tag_directory, file_path, engine_tag, file_endian_override)
+    # Stamped before the read so a tag saved while we read it doesn't get cached as current.
+    tag_stamp = get_tag_stamp(tag_directory, file_path)
+    tag_dict = tag_cache.get_cached_tag(cache_key, merged_defs, tag_stamp, file_path)
+    if tag_dict is None:
+        with tag_archive.open_tag_file(tag_directory, file_path) as tag_stream:
+            tag_bytes = tag_stream.read()
+
+        tag_dict = parse_tag_bytes(merged_defs, tag_directory, file_path, tag_bytes, engine_tag, cache_key, tag_stamp, None, file_endian_override)
+
+    if private:
+        tag_dict = tag_cache.get_private_tag(tag_dict)
+
+    return tag_dict
+
+def read_tag_bytes(merged_defs, tag_directory, file_path, tag_bytes, engine_tag=tag_common.EngineTag.H2Latest.value, tag_stamp=None, content_key=None, private=False):
+    tag_directory = tag_archive.get_tag_source(tag_directory)
+    if not tag_cache.is_tag_cache_enabled():
+        return read_stream(merged_defs, tag_directory, io.BytesIO(tag_bytes), file_path, engine_tag)
+
+    if tag_stamp is None:
+        tag_stamp = get_tag_stamp(tag_directory, file_path)
+
+    cache_key = get_read_cache_key(tag_directory, file_path, engine_tag, None)
+    tag_dict = tag_cache.get_cached_tag(cache_key, merged_defs, tag_stamp, file_path)
+    if tag_dict is None:
+        tag_dict = parse_tag_bytes(merged_defs, tag_directory, file_path, tag_bytes, engine_tag, cache_key, tag_stamp, content_key)
+
+    if private:
+        tag_dict = tag_cache.get_private_tag(tag_dict)
+
+    return tag_dict
+
+def get_read_cache_key(tag_directory, file_path, engine_tag, file_endian_override):
+    read_options = (file_endian_override, CONVERT_RADIANS, PRESERVE_STRINGS, PRESERVE_PADDING, PRESERVE_VERSION, PRESERVE_SIZE)
+
+    return tag_cache.get_cache_key(file_path, tag_archive.get_source_root(tag_directory), engine_tag, read_options)
+
+def parse_tag_bytes(merged_defs, tag_directory, file_path, tag_bytes, engine_tag, cache_key, tag_stamp, content_key=None, file_endian_override=None):
+    if content_key is None:
+        content_key = get_content_key(tag_bytes)
+
+    tag_dict = tag_cache.get_cached_content(cache_key, merged_defs, tag_stamp, content_key, file_path)
+    if tag_dict is None:
+        tag_dict = read_stream(merged_defs, tag_directory, io.BytesIO(tag_bytes), file_path, engine_tag, file_endian_override)
+        tag_dict = tag_cache.cache_tag(cache_key, merged_defs, tag_stamp, tag_dict, content_key)
+
+    return tag_dict
+
+def get_file_umask():
+    # os.umask can only be read by setting it so grab it once at import instead of racing other threads later.
+    umask = os.umask(0o022)
+    os.umask(umask)
+
+    return umask
+
+FILE_UMASK = get_file_umask()
+
+def get_new_file_mode(file_path):
+    # mkstemp makes the temp file 0600 and os.replace keeps that so match what a plain open() would have given us.
+    try:
+        return stat.S_IMODE(os.stat(file_path).st_mode)
+    except OSError:
+        return 0o666 & ~FILE_UMASK
+
+def open_temp_stream(file_path):
+    temp_handle, temp_path = tempfile.mkstemp(prefix=".%s." % os.path.basename(file_path), suffix=".tmp", dir=os.path.dirname(os.path.abspath(file_path)))
+
+    return os.fdopen(temp_handle, "w+b"), temp_path
+
+def discard_temp_stream(output_stream, temp_path):
+    output_stream.close()
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+def commit_temp_stream(output_stream, temp_path, file_path, fsync=False):
+    output_stream.flush()
+    if fsync:
+        os.fsync(output_stream.fileno())
+
+    output_stream.close()
+    os.chmod(temp_path, get_new_file_mode(file_path))
+    os.replace(temp_path, file_path)
+    if fsync and not os.name == "nt":
+        directory_handle = os.open(os.path.dirname(os.path.abspath(file_path)), os.O_RDONLY)
+        try:
+            os.fsync(directory_handle)
+        finally:
+            os.close(directory_handle)
+
+def find_mismatch_offset(data_view, file_view):
+    common_size = min(len(data_view), len(file_view))
+    if len(data_view) == len(file_view) and data_view == file_view:
+        return -1
+
+    for chunk_start in range(0, common_size, 65536):
+        chunk_end = min(chunk_start + 65536, common_size)
+        if data_view[chunk_start:chunk_end] != file_view[chunk_start:chunk_end]:
+            for byte_idx in range(chunk_start, chunk_end):
+                if data_view[byte_idx] != file_view[byte_idx]:
+                    return byte_idx
+
+    return common_size
+
+def find_file_mismatch(data, file_path):
+    if not os.path.isfile(file_path):
+        return None
+
+    with open(file_path, "rb") as input_stream:
+        if os.fstat(input_stream.fileno()).st_size == 0:
+            with memoryview(data) as data_view:
+                return find_mismatch_offset(data_view, b"")
+
+        with mmap.mmap(input_stream.fileno(), 0, access=mmap.ACCESS_READ) as file_map:
+            with memoryview(data) as data_view, memoryview(file_map) as file_view:
+                return find_mismatch_offset(data_view, file_view)
+
+def get_write_result(data, file_path, reference_path=None, skip_identical=False):
+    write_result = {"written": True, "mismatch offset": None, "size": len(data)}
+    if reference_path is not None:
+        write_result["mismatch offset"] = find_file_mismatch(data, reference_path)
+
+    if skip_identical:
+        destination_offset = write_result["mismatch offset"]
+        if reference_path is None or not os.path.abspath(reference_path) == os.path.abspath(file_path):
+            destination_offset = find_file_mismatch(data, file_path)
+
+        if destination_offset == -1:
+            write_result["written"] = False
+
+    return write_result
+
+def write_file(merged_defs, tag_dict, obfuscation_buffer, file_path="", engine_tag=tag_common.EngineTag.H2Latest.value, file_endian_override=None, streaming=False, fsync=False, reference_path=None, skip_identical=False, output_stream=None):
+    # streaming encodes blocks straight into the temp file instead of building the whole tag in memory first.
+    # Either way the tag is written to a temp file and renamed over file_path so a failed write never truncates it.
     global PRESERVE_VERSION
     if engine_tag == tag_common.EngineTag.H1Latest.value:
         file_endian = ">"
@@ -1929,7 +2224,9 @@ def write_file(merged_defs, tag_dict, obfuscation_buffer, file_path="", engine_t
             upgrade_function = upgrade_functions.get(tag_group)
         
         if tag_header["engine tag"] == "blam" and engine_tag is not tag_common.EngineTag.H1Latest.value and upgrade_function is not None:
+            start_time = time.perf_counter()
             tag_dict = upgrade_function(tag_dict, tag_common.EngineTag)
+            add_timing("upgrade", start_time)
             tag_header = tag_dict.get("Header")
 
         tag_group = tag_header["tag group"]
@@ -2024,21 +2321,39 @@ def write_file(merged_defs, tag_dict, obfuscation_buffer, file_path="", engine_t
 
     block_idx = 0
     initial_size =  (1 * tag_block_header["size"])
-    block_stream = io.BytesIO(b"\x00" * initial_size)
-    root = tag_dict["Data"]
-    for field_node in block_field_set:
-        get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_node, root, block_idx)
-
-    # TODO: This currently doesn't fix itself to take up the space that is left. 
-    # It will start overwriting data from the next block if the previously defined size changes to be smaller so we need to resize it.
-    # This also applies to the leftover data bit in the block section in the field reader function. - Gen
-    leftover_data = get_result("LeftOverData_%s" % tag_extension, tag_dict["Data"])
-    if leftover_data is not None and PRESERVE_VERSION:
-        leftover_bytes = base64.b64decode(leftover_data)
-        if PRESERVE_PADDING:
-            block_stream.write(leftover_bytes)
-        else:
-            block_stream.write(bytes(len(leftover_bytes)))
+    temp_stream = None
+    if streaming and output_stream is None:
+        temp_stream, temp_path = open_temp_stream(file_path)
+        root_header_size = 64
+        if not tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
+            root_header_size += tag_block_header_size
+
+        temp_stream.write(bytes(root_header_size))
+        block_stream = TagStreamView(temp_stream).create_view(initial_size)
+    else:
+        block_stream = io.BytesIO(b"\x00" * initial_size)
+
+    try:
+        root = tag_dict["Data"]
+        for field_node in block_field_set:
+            get_fields(tag_stream, block_stream, tag_header, tag_block_header, field_node, root, block_idx)
+
+        # TODO: This currently doesn't fix itself to take up the space that is left. 
+        # It will start overwriting data from the next block if the previously defined size changes to be smaller so we need to resize it.
+        # This also applies to the leftover data bit in the block section in the field reader function. - Gen
+        leftover_data = get_result("LeftOverData_%s" % tag_extension, tag_dict["Data"])
+        if leftover_data is not None and PRESERVE_VERSION:
+            leftover_bytes = base64.b64decode(leftover_data)
+            if PRESERVE_PADDING:
+                block_stream.write(leftover_bytes)
+            else:
+                block_stream.write(bytes(len(leftover_bytes)))
+
+    except BaseException:
+        if temp_stream is not None:
+            discard_temp_stream(temp_stream, temp_path)
+
+        raise
 
     engine_tag = tag_header["engine tag"]
     tag_group = tag_header["tag group"]
@@ -2046,22 +2361,67 @@ def write_file(merged_defs, tag_dict, obfuscation_buffer, file_path="", engine_t
     tag_header["tag group"] = string_to_bytes(tag_header["tag group"], file_endian)
     tag_header["engine tag"] = string_to_bytes(tag_header["engine tag"], file_endian)
 
-    combined_streams = io.BytesIO()
-    if not engine_tag == tag_common.EngineTag.H1Latest.value:
-        tag_block_header_stream = io.BytesIO(b"\x00" * tag_block_header_size)
-        if tag_group == "vrtx" and tag_block_header["size"] == 20:
-            tag_block_header["version"] = 0
-        write_field_header(tag_block_header, 1, tag_block_header_stream, is_legacy=HAS_LEGACY_HEADER)
-        combined_streams.write(tag_block_header_stream.getvalue())
+    if temp_stream is not None:
+        try:
+            if not engine_tag == tag_common.EngineTag.H1Latest.value:
+                if tag_group == "vrtx" and tag_block_header["size"] == 20:
+                    tag_block_header["version"] = 0
+                temp_stream.seek(64)
+                write_field_header(tag_block_header, 1, temp_stream, is_legacy=HAS_LEGACY_HEADER)
+
+            if GENERATE_CHECKSUM:
+                start_time = time.perf_counter()
+                tag_header["checksum"] = checksum_calculate_stream(temp_stream, 64)
+                add_timing("checksum", start_time)
+
+            temp_stream.seek(0)
+            temp_stream.write(struct.pack('%shbb32s4sIiiihbb4s' % file_endian, *tag_header.values()))
+            write_result = {"written": True, "mismatch offset": None, "size": get_stream_size(temp_stream)}
+            if reference_path is not None or skip_identical:
+                temp_stream.flush()
+                with mmap.mmap(temp_stream.fileno(), 0, access=mmap.ACCESS_READ) as output_map:
+                    write_result = get_write_result(output_map, file_path, reference_path, skip_identical)
+
+            if write_result["written"]:
+                commit_temp_stream(temp_stream, temp_path, file_path, fsync)
+            else:
+                discard_temp_stream(temp_stream, temp_path)
 
-    combined_streams.write(block_stream.getvalue())
-    if GENERATE_CHECKSUM:
-        tag_header["checksum"] = checksum_calculate(combined_streams.getvalue(), obfuscation_buffer)
+        except BaseException:
+            discard_temp_stream(temp_stream, temp_path)
+            raise
 
-    tag_stream.write(struct.pack('%shbb32s4sIiiihbb4s' % file_endian, *tag_header.values()))
-    tag_stream.write(combined_streams.getvalue())
-    with open(file_path, "wb") as f:
-        f.write(tag_stream.getvalue())
+    else:
+        combined_streams = io.BytesIO()
+        if not engine_tag == tag_common.EngineTag.H1Latest.value:
+            tag_block_header_stream = io.BytesIO(b"\x00" * tag_block_header_size)
+            if tag_group == "vrtx" and tag_block_header["size"] == 20:
+                tag_block_header["version"] = 0
+            write_field_header(tag_block_header, 1, tag_block_header_stream, is_legacy=HAS_LEGACY_HEADER)
+            combined_streams.write(tag_block_header_stream.getvalue())
+
+        combined_streams.write(block_stream.getvalue())
+        if GENERATE_CHECKSUM:
+            start_time = time.perf_counter()
+            tag_header["checksum"] = checksum_calculate(combined_streams.getvalue(), obfuscation_buffer)
+            add_timing("checksum", start_time)
+
+        tag_stream.write(struct.pack('%shbb32s4sIiiihbb4s' % file_endian, *tag_header.values()))
+        tag_stream.write(combined_streams.getvalue())
+        tag_bytes = tag_stream.getvalue()
+        if output_stream is not None:
+            write_result = get_write_result(tag_bytes, file_path, reference_path)
+            output_stream.write(tag_bytes)
+        else:
+            write_result = get_write_result(tag_bytes, file_path, reference_path, skip_identical)
+            if write_result["written"]:
+                temp_stream, temp_path = open_temp_stream(file_path)
+                try:
+                    temp_stream.write(tag_bytes)
+                    commit_temp_stream(temp_stream, temp_path, file_path, fsync)
+                except BaseException:
+                    discard_temp_stream(temp_stream, temp_path)
+                    raise
 
     if sound_hack:
         #This is here because snd! tags are complicated. 
@@ -2070,6 +2430,12 @@ def write_file(merged_defs, tag_dict, obfuscation_buffer, file_path="", engine_t
         PRESERVE_VERSION = False
         PRESERVE_SIZE = False
 
+    return write_result
+
+def add_timing(timing_key, start_time):
+    if TIMING_RECORD is not None:
+        TIMING_RECORD[timing_key] = TIMING_RECORD.get(timing_key, 0.0) + time.perf_counter() - start_time
+
 def update_interface(mode_enum=FileModeEnum.read, file_endian="<"):
     global FILE_MODE
     global FIELD_ENDIAN
@@ -2077,6 +2443,26 @@ def update_interface(mode_enum=FileModeEnum.read, file_endian="<"):
     FILE_MODE = mode_enum
     FIELD_ENDIAN = file_endian
 
+def get_merged_defs(engine_tag=tag_common.EngineTag.H2Latest.value, dump_xml=False):
+    # Library callers shouldn't write merged XML into the package tree. Pass dump_xml=True when you actually want the dump.
+    if engine_tag == tag_common.EngineTag.H1Latest.value:
+        output_dir = os.path.join(os.path.dirname(tag_common.h1_defs_directory), "h1_merged_output")
+        merged_defs = h1.generate_defs(tag_common.h1_defs_directory, output_dir, dump_xml)
+    else:
+        output_dir = os.path.join(os.path.dirname(tag_common.h2_defs_directory), "h2_merged_output")
+        merged_defs = h2.generate_defs(tag_common.h2_defs_directory, output_dir, dump_xml)
+
+    return merged_defs
+
+def get_tag_extensions(engine_tag=tag_common.EngineTag.H2Latest.value):
+    tag_groups = tag_common.h2_tag_groups
+    tag_extensions = tag_common.h2_tag_extensions
+    if engine_tag == tag_common.EngineTag.H1Latest.value:
+        tag_groups = tag_common.h1_tag_groups
+        tag_extensions = tag_common.h1_tag_extensions
+
+    return tag_groups, tag_extensions
+
 def h1_single_tag():
     output_dir = os.path.join(os.path.dirname(tag_common.h1_defs_directory), "h1_merged_output")
     merged_defs = h1.generate_defs(tag_common.h1_defs_directory, output_dir)
@@ -2085,7 +2471,7 @@ def h1_single_tag():
     output_path = r"E:\Program Files (x86)\Steam\steamapps\common\Halo MCCEK\Halo Assets\1\Vanilla\tags\tutorial.scenario"
     tag_directory = r"E:\Program Files (x86)\Steam\steamapps\common\Halo MCCEK\Halo Assets\1\Vanilla\tags"
 
-    tag_dict = read_file(merged_defs, tag_directory, read_path, engine_tag=tag_common.EngineTag.H1Latest.value)
+    tag_dict = read_file(merged_defs, tag_directory, read_path, engine_tag=tag_common.EngineTag.H1Latest.value, private=True)
     with open(os.path.join(os.path.dirname(output_path), "%s.json" % os.path.basename(output_path).rsplit(".", 1)[0]), 'w', encoding ='utf8') as json_file:
         json.dump(tag_dict, json_file, ensure_ascii = True, indent=4)
 
@@ -2110,7 +2496,7 @@ def h2_single_tag():
     output_path = r"E:\Program Files (x86)\Steam\steamapps\common\Halo MCCEK\Halo Assets\2\Vanilla\tags\h2_lens_flare.lens_flare"
     tag_directory = r"E:\Program Files (x86)\Steam\steamapps\common\Halo MCCEK\Halo Assets\2\Vanilla\tags"
 
-    tag_dict = read_file(merged_defs, tag_directory, read_path)
+    tag_dict = read_file(merged_defs, tag_directory, read_path, private=True)
     with open(os.path.join(os.path.dirname(output_path), "%s.json" % os.path.basename(output_path).rsplit(".", 1)[0]), 'w', encoding ='utf8') as json_file:
         json.dump(tag_dict, json_file, ensure_ascii = True, indent=4)
 
@@ -2127,14 +2513,6 @@ def h2_single_json():
 
         write_file(merged_defs, tag_dict, obfuscation_buffer_prepare(), output_path)
 
-def compute_file_hash(path):
-    """Compute SHA256 hash of a file in 64K chunks."""
-    sha256 = hashlib.sha256()
-    with open(path, "rb") as f:
-        while chunk := f.read(65536):
-            sha256.update(chunk)
-    return sha256.hexdigest()
-
 def h1_directory():
     input_dir = r"E:\Program Files (x86)\Steam\steamapps\common\Halo MCCEK\Halo Assets\1\Vanilla\tags"
 
@@ -2162,7 +2540,7 @@ def h1_directory():
                     output_path = os.path.join(output_dir, file)
 
                     try:
-                        tag_dict = read_file(merged_defs, input_dir, read_path, engine_tag=tag_common.EngineTag.H1Latest.value)
+                        tag_dict = read_file(merged_defs, input_dir, read_path, engine_tag=tag_common.EngineTag.H1Latest.value, private=True)
                         if DUMP_JSON:
                             try:
                                 json_filename = os.path.basename(output_path).rsplit(".", 1)[0] + ".json"
@@ -2177,18 +2555,14 @@ def h1_directory():
                                 traceback.print_exc(file=log_file)
 
                         try:
-                            write_file(merged_defs, tag_dict, obfuscation_buffer, output_path, engine_tag=tag_common.EngineTag.H1Latest.value)
-                            
-                            # Hash check after write
-                            original_hash = compute_file_hash(read_path)
-                            output_hash = compute_file_hash(output_path)
-                            if original_hash != output_hash:
-                                log_file.write(f"\nHash Mismatch:\n"
+                            # Compared against the original while the output is still in memory and unchanged outputs are left alone.
+                            write_result = write_file(merged_defs, tag_dict, obfuscation_buffer, output_path, engine_tag=tag_common.EngineTag.H1Latest.value, reference_path=read_path, skip_identical=True)
+                            if write_result["mismatch offset"] != -1:
+                                log_file.write(f"\nByte Mismatch:\n"
                                             f"  File: {file}\n"
                                             f"  Read Path: {read_path}\n"
                                             f"  Output Path: {output_path}\n"
-                                            f"  Original Hash: {original_hash}\n"
-                                            f"  Output Hash:   {output_hash}\n"
+                                            f"  First Difference: {write_result['mismatch offset']}\n"
                                             f"  The recompiled file differs from the original.\n")
                         except Exception as e:
                             log_file.write(f"\nWrite File Error:\n"
@@ -2231,7 +2605,7 @@ def h2_directory():
                     output_path = os.path.join(output_dir, file)
 
                     try:
-                        tag_dict = read_file(merged_defs, input_dir, read_path)
+                        tag_dict = read_file(merged_defs, input_dir, read_path, private=True)
                         
                         if DUMP_JSON:
                             try:
@@ -2247,18 +2621,13 @@ def h2_directory():
                                 traceback.print_exc(file=log_file)
 
                         try:
-                            write_file(merged_defs, tag_dict, obfuscation_buffer, output_path)
-                            
-                            # Hash check after write
-                            original_hash = compute_file_hash(read_path)
-                            output_hash = compute_file_hash(output_path)
-                            if original_hash != output_hash:
-                                log_file.write(f"\nHash Mismatch:\n"
+                            write_result = write_file(merged_defs, tag_dict, obfuscation_buffer, output_path, reference_path=read_path, skip_identical=True)
+                            if write_result["mismatch offset"] != -1:
+                                log_file.write(f"\nByte Mismatch:\n"
                                             f"  File: {file}\n"
                                             f"  Read Path: {read_path}\n"
                                             f"  Output Path: {output_path}\n"
-                                            f"  Original Hash: {original_hash}\n"
-                                            f"  Output Hash:   {output_hash}\n"
+                                            f"  First Difference: {write_result['mismatch offset']}\n"
                                             f"  The recompiled file differs from the original.\n")
                         except Exception as e:
                             log_file.write(f"\nWrite File Error:\n"
@@ -2278,24 +2647,46 @@ def h2_directory():
                                 f"  File: {read_path}\n")
                     traceback.print_exc(file=log_file)
 
+def get_tag_file_path(tag_directory, tag_path, tag_extension):
+    tag_directory = tag_archive.get_tag_source(tag_directory)
+    if not tag_archive.is_archive_source(tag_directory):
+        return tag_resolver.find_tag_file(tag_directory, tag_path, tag_extension)
+
+    return tag_directory.find_file(os.path.join(tag_archive.get_source_root(tag_directory), "%s.%s" % (tag_path, tag_extension)))
+
+def refresh_tag_directory(tag_directory):
+    tag_directory = tag_archive.get_tag_source(tag_directory)
+    if not tag_archive.is_archive_source(tag_directory):
+        tag_resolver.refresh_path_index(tag_directory)
+
 def read_tag(tag_path, tag_group, tag_directory, tag_groups, engine_tag, merged_defs):
     asset = None
 
+    tag_directory = tag_archive.get_tag_source(tag_directory)
     tag_extension = tag_groups.get(tag_group)
-    read_path = os.path.join(tag_directory, "%s.%s" % (tag_path, tag_extension))
-    if os.path.isfile(read_path):
-        asset = read_file(merged_defs, tag_directory, read_path, engine_tag)
+    read_path = get_tag_file_path(tag_directory, tag_path, tag_extension)
+    if read_path is not None:
+        try:
+            asset = read_file(merged_defs, tag_directory, read_path, engine_tag, private=True)
+        except FileNotFoundError:
+            pass
 
     return asset
 
 #This is just here to make tag importing not take forever during the Blender import process. 
-# Add whatever you need or just get rid of the check in get_tag_reference if you just want to import everything - Gen
+# Add whatever you need or pass your own tag_traversal.TraversalPolicy if you want a different set of tags
 TAG_WHITELIST = ("bipd", "bitm", "trak", "coll", "bloc", "crea", "ctrl", "lifi", "mach", "eqip", "mod2", "itmc", "ligh", "MGS2", "hlmt", "coll", "phmo", "mode", 
                  "ai**", "*ipd", "cin*", "clu*", "/**/", "*rea", "dec*", "dc*s", "dgr*", "*qip", "*igh", "*cen", "*sce", "sbsp", "sslt", "ltmp", "trg*", "*ehi", 
                  "*eap", "scen", "shad", "senv", "soso", "stem", "schi", "scex", "sotr", "sgla", "smet", "spla", "swat", "sky ", "ssce", "vehi", "vehc", "weap", 
                  "antr")
 
-def get_tag_references(field_node, tag_block_fields, tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender):
+DEFAULT_TRAVERSAL_POLICY = tag_traversal.TraversalPolicy(allowed_groups=TAG_WHITELIST, group_aliases={"halo1": {"mode": "mod2"}})
+
+def get_tag_references(field_node, tag_block_fields, tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender,
+                       traversal_policy=None, source_group=None):
+    if traversal_policy is None:
+        traversal_policy = DEFAULT_TRAVERSAL_POLICY
+
     field_tag = field_node.tag
     field_key = field_node.get("name")
     field_element = tag_block_fields.get(field_key)
@@ -2316,9 +2707,15 @@ def get_tag_references(field_node, tag_block_fields, tag_references, game_title,
             if latest_field_set is None:
                 raise ValueError(f"Latest field set not found.")
 
+            # Excluded blocks still get walked so their floats are prepared, the references found in them are dropped.
+            block_references = tag_references
+            if not traversal_policy.allows_field(source_group, field_key):
+                block_references = []
+
             for tag_block_element in tag_block_dict:
                 for block_field_node in latest_field_set:
-                    get_tag_references(block_field_node, tag_block_element, tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+                    get_tag_references(block_field_node, tag_block_element, block_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender,
+                                       traversal_policy, source_group)
 
     elif field_tag == "Struct":
         latest_struct_field_set = None
@@ -2331,15 +2728,17 @@ def get_tag_references(field_node, tag_block_fields, tag_references, game_title,
             raise ValueError(f"Latest field set not found.")
 
         for struct_field_node in latest_struct_field_set:
-            get_tag_references(struct_field_node, tag_block_fields, tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+            get_tag_references(struct_field_node, tag_block_fields, tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender,
+                               traversal_policy, source_group)
     
     elif field_tag == "TagReference":
         tag_reference_dict = tag_block_fields.get(field_key)
         if tag_reference_dict is not None:
-            if game_title == "halo1" and tag_reference_dict["group name"] == "mode":
-                tag_reference_dict["group name"] = "mod2"
+            reference_group = traversal_policy.get_reference_group(game_title, tag_reference_dict["group name"])
+            if not reference_group == tag_reference_dict["group name"]:
+                tag_reference_dict["group name"] = reference_group
 
-            if tag_reference_dict["group name"] in TAG_WHITELIST:
+            if traversal_policy.allows_field(source_group, field_key) and traversal_policy.allows_group(source_group, reference_group):
                 tag_references.append(tag_reference_dict)
 
 def string_empty_check(string):
@@ -2349,110 +2748,145 @@ def string_empty_check(string):
 
     return is_empty
 
-def get_disk_asset(tag_path, tag_extension):
-    asset_dump = None
-    disk_asset_path = os.path.join(os.path.expanduser("~"), "Blender Halo Toolset", "Asset Cache", "%s_%s.json" % (tag_path, tag_extension))
-    if os.path.isfile(disk_asset_path):
-        with open(disk_asset_path, 'r', encoding='utf8') as json_file:
-            asset_dump = json.load(json_file)
+def get_disk_asset(tag_path, tag_extension, checksum=None):
+    return tag_store.load_asset(tag_store.get_asset_store(), tag_resolver.get_folded_path(tag_path), tag_extension, checksum)
 
-    return asset_dump
+def get_tag_checksum(tag_path, tag_extension, tag_directory):
+    tag_checksum = None
+    read_path = get_tag_file_path(tag_directory, tag_path, tag_extension)
+    if read_path is not None:
+        with tag_archive.open_tag_file(tag_directory, read_path, 64) as input_stream:
+            valid_header, disk_tag_group, tag_checksum, disk_engine_tag = check_header(input_stream)
 
-def generate_tag_dictionary(game_title, root_tag_ref, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache={}, prepare_for_blender=True):
-    tag_group = root_tag_ref.get("group name", "")
-    tag_extension = tag_groups.get(tag_group)
-    tag_path = root_tag_ref.get("path", "")
-    
-    disk_asset_path = os.path.join(os.path.expanduser("~"), "Blender Halo Toolset", "Asset Cache", "%s_%s.json" % (tag_path, tag_extension))
-    if string_empty_check(tag_path):
-        return asset_cache
+    return tag_checksum
 
-    if asset_cache.get(tag_group) is None:
-        asset_cache[tag_group] = {}
+def generate_tag_dictionary(game_title, root_tag_ref, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache=None, prepare_for_blender=True, asset_store=None,
+                            traversal_policy=None, workers=1):
+    if asset_cache is None:
+        asset_cache = {}
 
-    if asset_cache[tag_group].get(tag_path) is None:
-        asset_cache[tag_group][tag_path] = {"blender_assets": {}, "has_disk_asset": False, "matching_checksum": False}
+    if traversal_policy is None:
+        traversal_policy = DEFAULT_TRAVERSAL_POLICY
 
-    if os.path.isfile(disk_asset_path):
-        asset_cache[tag_group][tag_path]["has_disk_asset"] = True
+    if asset_store is None:
+        asset_store = tag_store.get_asset_store()
 
-    if asset_cache[tag_group][tag_path]["has_disk_asset"]:
-        if not asset_cache[tag_group][tag_path]["matching_checksum"]:
-            with open(os.path.join(tag_directory, "%s.%s" % (tag_path, tag_extension)), 'rb') as input_stream:
-                valid_header, disk_tag_group, disk_checksum, disk_engine_tag = check_header(input_stream)
+    tag_directory = tag_archive.get_tag_source(tag_directory)
 
-            parsed_asset = get_disk_asset(tag_path, tag_extension)
-            if disk_checksum == parsed_asset["Header"]["checksum"]:
-                asset_cache[tag_group][tag_path]["matching_checksum"] = True
+    refresh_tag_directory(tag_directory)
 
-                tag_def = merged_defs.get(tag_group)
+    # workers other than 1 parses the whole closure on tag_graph's process pool first and the walk below takes the
+    # parsed assets and content keys from there instead of reading each tag itself.
+    loaded_assets = {}
+    if not workers == 1:
+        for node in tag_graph.iter_tag_graph(game_title, root_tag_ref, tag_directory, engine_tag, merged_defs, workers, False, traversal_policy=traversal_policy):
+            if node.asset is not None:
+                loaded_assets[node.key] = (node.asset, node.content_key)
 
-                block_count = 1
-                latest_field_set = None
-                for layout in tag_def:
-                    for field_set in layout:
-                        if bool(field_set.attrib.get('isLatest')):
-                            latest_field_set = field_set
-                            break
+    # Walked with a stack instead of recursing since scenario chains can go deeper than the recursion limit.
+    pending_tag_refs = [(root_tag_ref, 0)]
+    expanded_depths = {}
+    asset_entries = {}
+    while len(pending_tag_refs) > 0:
+        root_tag_ref, tag_depth = pending_tag_refs.pop()
+        tag_group = root_tag_ref.get("group name", "")
+        tag_extension = tag_groups.get(tag_group)
+        tag_path = root_tag_ref.get("path", "")
+        if string_empty_check(tag_path):
+            continue
 
-                if latest_field_set is None:
-                    raise ValueError(f"Latest field set not found.")
+        # asset_cache keeps the path as the reference spells it, lookups and the store use the folded path.
+        asset_path = tag_resolver.get_folded_path(tag_path)
+        tag_key = (tag_group, asset_path)
+        if asset_cache.get(tag_group) is None:
+            asset_cache[tag_group] = {}
 
-                tag_references = []
-                for block_idx in range(block_count):
-                    for field_node in latest_field_set:
-                        get_tag_references(field_node, parsed_asset["Data"], tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+        asset_entry = asset_cache[tag_group].get(tag_path)
+        if asset_entry is None:
+            asset_entry = asset_entries.get(tag_key)
+            if asset_entry is None:
+                asset_entry = {"blender_assets": {}, "has_disk_asset": False, "matching_checksum": False}
 
-                for tag_ref in tag_references:
-                    generate_tag_dictionary(game_title, tag_ref, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+            asset_cache[tag_group][tag_path] = asset_entry
 
-            else:
-                parsed_asset = read_tag(tag_path, tag_group, tag_directory, tag_groups, engine_tag, merged_defs)
-                if parsed_asset is None:
-                    return asset_cache
-                else:
-                    asset_cache[tag_group][tag_path]["has_disk_asset"] = True
-                    asset_cache[tag_group][tag_path]["matching_checksum"] = True
+        asset_entry = asset_entries.setdefault(tag_key, asset_entry)
 
-                tag_def = merged_defs.get(tag_group)
+        # With a max depth a tag first reached down a long chain has to be walked again if a shorter one turns up,
+        # its references might be in range now.
+        if tag_key in expanded_depths:
+            if traversal_policy.max_depth is None or expanded_depths[tag_key] <= tag_depth:
+                continue
 
-                block_count = 1
-                latest_field_set = None
-                for layout in tag_def:
-                    for field_set in layout:
-                        if bool(field_set.attrib.get('isLatest')):
-                            latest_field_set = field_set
-                            break
+        elif asset_entry["matching_checksum"]:
+            continue
 
-                if latest_field_set is None:
-                    raise ValueError(f"Latest field set not found.")
+        expanded_depths[tag_key] = tag_depth
+        loaded_asset, loaded_content_key = loaded_assets.pop(tag_key, (None, None))
 
-                tag_references = []
-                for block_idx in range(block_count):
-                    for field_node in latest_field_set:
-                        get_tag_references(field_node, parsed_asset["Data"], tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+        read_path = get_tag_file_path(tag_directory, tag_path, tag_extension)
+        if read_path is None:
+            continue
 
-                directory_dump = os.path.dirname(disk_asset_path)
-                if not os.path.exists(directory_dump):
-                    os.makedirs(directory_dump)
+        # The store index holds the checksum so a stale asset is caught without loading the payload.
+        parsed_asset = None
+        tag_checksum = None
+        stored_checksum = tag_store.get_asset_checksum(asset_store, asset_path, tag_extension)
+        if stored_checksum is not None:
+            asset_entry["has_disk_asset"] = True
+            tag_checksum = get_tag_checksum(tag_path, tag_extension, tag_directory)
+            if tag_checksum == stored_checksum:
+                parsed_asset = tag_store.load_asset(asset_store, asset_path, tag_extension)
+
+        content_key = None
+        if parsed_asset is None and loaded_asset is not None:
+            if tag_checksum is None:
+                try:
+                    tag_checksum = get_tag_checksum(tag_path, tag_extension, tag_directory)
+                except FileNotFoundError:
+                    continue
+
+            # Only the header is read to check the pool's copy is still current.
+            if loaded_asset["Header"]["checksum"] == tag_checksum:
+                content_key = loaded_content_key
+                parsed_asset = tag_store.load_content(asset_store, content_key, read_path)
+                if parsed_asset is None:
+                    parsed_asset = loaded_asset
+                elif tag_store.link_asset(asset_store, asset_path, tag_extension, parsed_asset["Header"]["checksum"], content_key, read_path):
+                    content_key = None
 
-                with open(disk_asset_path, 'w', encoding='utf8') as json_file:
-                    json.dump(parsed_asset, json_file, ensure_ascii=True, indent=4)
+        if parsed_asset is None:
+            try:
+                tag_stamp = None
+                if tag_cache.is_tag_cache_enabled():
+                    tag_stamp = get_tag_stamp(tag_directory, read_path)
+
+                with tag_archive.open_tag_file(tag_directory, read_path) as tag_stream:
+                    tag_bytes = tag_stream.read()
+
+            except FileNotFoundError:
+                continue
+
+            # The store shares payloads by content so the bytes get hashed once here and the tag cache reuses it.
+            content_key = get_content_key(tag_bytes)
+            parsed_asset = tag_store.load_content(asset_store, content_key, read_path)
+            if parsed_asset is not None:
+                # Same bytes as a tag stored under another path. If it was evicted in the meantime it's stored again below.
+                if tag_store.link_asset(asset_store, asset_path, tag_extension, parsed_asset["Header"]["checksum"], content_key, read_path):
+                    content_key = None
+            else:
+                # References get prepared and aliased in place below so it has to be a copy the cache doesn't share.
+                parsed_asset = read_tag_bytes(merged_defs, tag_directory, read_path, tag_bytes, engine_tag, tag_stamp, content_key, private=True)
+                if len(parsed_asset) == 0:
+                    continue
 
-                for tag_ref in tag_references:
-                    generate_tag_dictionary(game_title, tag_ref, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+        # The stored name is where the tag was read last time, it may have moved or be spelled differently now.
+        parsed_asset["TagName"] = read_path
 
-    else:
-        parsed_asset = read_tag(tag_path, tag_group, tag_directory, tag_groups, engine_tag, merged_defs)
-        if parsed_asset is None:
-            return asset_cache
-        else:
-            asset_cache[tag_group][tag_path]["has_disk_asset"] = True
-            asset_cache[tag_group][tag_path]["matching_checksum"] = True
+        asset_entry["has_disk_asset"] = True
+        asset_entry["matching_checksum"] = True
 
         tag_def = merged_defs.get(tag_group)
 
-        block_count = 1
         latest_field_set = None
         for layout in tag_def:
             for field_set in layout:
@@ -2464,19 +2898,17 @@ def generate_tag_dictionary(game_title, root_tag_ref, tag_directory, tag_groups,
             raise ValueError(f"Latest field set not found.")
 
         tag_references = []
-        for block_idx in range(block_count):
-            for field_node in latest_field_set:
-                get_tag_references(field_node, parsed_asset["Data"], tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+        for field_node in latest_field_set:
+            get_tag_references(field_node, parsed_asset["Data"], tag_references, game_title, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender,
+                               traversal_policy, tag_group)
 
-        directory_dump = os.path.dirname(disk_asset_path)
-        if not os.path.exists(directory_dump):
-            os.makedirs(directory_dump)
+        if content_key is not None:
+            tag_store.store_asset(asset_store, asset_path, tag_extension, parsed_asset, content_key)
 
-        with open(disk_asset_path, 'w', encoding='utf8') as json_file:
-            json.dump(parsed_asset, json_file, ensure_ascii=True, indent=4)
+        if traversal_policy.allows_depth(tag_depth + 1):
+            pending_tag_refs.extend((tag_reference, tag_depth + 1) for tag_reference in reversed(tag_references))
 
-        for tag_ref in tag_references:
-            generate_tag_dictionary(game_title, tag_ref, tag_directory, tag_groups, engine_tag, merged_defs, asset_cache, prepare_for_blender)
+    tag_store.evict_assets(asset_store)
 
     return asset_cache
 
@@ -2509,5 +2941,5 @@ def process_tag(read_path, tag_directory, read_engine=tag_common.EngineTag.H1Lat
     if write_engine is not tag_common.EngineTag.H1Latest.value:
         write_merged_defs = h2_merged_defs
 
-    tag_dict = read_file(read_merged_defs, tag_directory, read_path, engine_tag=read_engine)
+    tag_dict = read_file(read_merged_defs, tag_directory, read_path, engine_tag=read_engine, private=True)
     write_file(write_merged_defs, tag_dict, obfuscation_buffer_prepare(), None, engine_tag=write_engine)
@@ -0,0 +1,380 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import struct
+
+try:
+    from . import tag_common
+    from . import tag_interface
+except ImportError:
+    import tag_common
+    import tag_interface
+
+# Walks the on disk layout of a tag using the compiled definitions without decoding any field values.
+# Offsets mirror what get_fields consumes in read mode so anything found here lines up with read_file.
+
+FIELD_SIZE_CACHE = {}
+FIELD_NODE_INFO_CACHE = {}
+
+def get_file_endian(engine_tag):
+    file_endian = "<"
+    if engine_tag == tag_common.EngineTag.H1Latest.value:
+        file_endian = ">"
+
+    return file_endian
+
+def get_layout_field_size(field_node):
+    size_key = (field_node, tag_interface.HAS_LEGACY_STRINGS, tag_interface.HAS_LEGACY_PADDING)
+    field_size = FIELD_SIZE_CACHE.get(size_key)
+    if field_size is None:
+        field_size = tag_interface.get_fields(None, None, None, None, field_node, None, None, return_size=True)
+        if field_size is None:
+            field_size = -1
+
+        FIELD_SIZE_CACHE[size_key] = field_size
+
+    return field_size
+
+def get_field_set_info(field_set):
+    has_references = False
+    is_flat = True
+    for field_node in field_set:
+        field_tag = field_node.tag
+        if field_tag == "TagReference":
+            has_references = True
+            is_flat = False
+        elif field_tag == "Block" or field_tag == "Struct":
+            # Structs count as not flat since H2 can store a header for them in the tail.
+            has_references = has_references or get_field_node_info(field_node)[0]
+            is_flat = False
+        elif field_tag == "Data" or field_tag == "StringId" or field_tag == "OldStringId":
+            is_flat = False
+
+    return has_references, is_flat
+
+def get_field_node_info(field_node):
+    field_node_info = FIELD_NODE_INFO_CACHE.get(field_node)
+    if field_node_info is None:
+        has_references = False
+        is_flat = True
+        for layout in field_node:
+            for field_set in layout:
+                field_set_references, field_set_flat = get_field_set_info(field_set)
+                has_references = has_references or field_set_references
+                is_flat = is_flat and field_set_flat
+
+        field_node_info = FIELD_NODE_INFO_CACHE[field_node] = (has_references, is_flat)
+
+    return field_node_info
+
+def get_latest_field_set(node):
+    latest_field_set = None
+    for layout in node:
+        for field_set in layout:
+            if bool(field_set.attrib.get('isLatest')):
+                latest_field_set = field_set
+
+    if latest_field_set is None:
+        raise ValueError(f"Latest field set not found.")
+
+    return latest_field_set
+
+def read_layout_header(tag_stream):
+    tag_stream.seek(60)
+    engine_tag = tag_stream.read(4).decode('utf-8', 'replace')
+    if engine_tag != tag_common.EngineTag.H1Latest.value:
+        engine_tag = engine_tag[::-1]
+
+    file_endian = get_file_endian(engine_tag)
+    tag_stream.seek(0)
+    tag_header = tag_interface.read_header(tag_stream, file_endian)
+
+    return tag_header, file_endian
+
+def read_tail(walk_state, length):
+    walk_state["stream"].seek(walk_state["tail"])
+    data = walk_state["stream"].read(length)
+    walk_state["tail"] += len(data)
+
+    return data
+
+def skip_tail(walk_state, length):
+    if length < 0:
+        walk_state["tail"] = walk_state["file size"]
+    else:
+        walk_state["tail"] += length
+
+def walk_elements(walk_state, field_sets, block_count, block_size, path):
+    base_offset = walk_state["tail"]
+    block_data = read_tail(walk_state, block_count * block_size)
+    position = 0
+    for block_idx in range(block_count):
+        element_start = position
+        # Root block elements all share tag_dict["Data"] so only nested blocks get an index in the path.
+        element_path = path
+        if len(path) > 0:
+            element_path = path + (block_idx,)
+
+        for field_set in field_sets:
+            position = yield from walk_fields(walk_state, field_set, block_data, base_offset, position, (block_idx + 1) * block_size, element_path)
+
+        if block_size - (position - element_start) > 0:
+            position = element_start + block_size
+
+def read_block_header(walk_state, field_node):
+    if walk_state["is h1"]:
+        latest_field_set = get_latest_field_set(field_node)
+        block_version = int(latest_field_set.attrib.get('version'))
+        block_size = int(latest_field_set.attrib.get('sizeofValue'))
+    else:
+        header_size = 16
+        pack_string = "<4s3i"
+        if tag_interface.HAS_LEGACY_HEADER:
+            header_size = 12
+            pack_string = "<4s2hi"
+
+        block_name, block_version, header_count, block_size = struct.unpack(pack_string, read_tail(walk_state, header_size))
+
+    return block_version, block_size
+
+def walk_block(walk_state, field_node, block_count, path):
+    block_version, block_size = read_block_header(walk_state, field_node)
+    field_sets = [layout[block_version] for layout in field_node]
+    yield from walk_elements(walk_state, field_sets, block_count, block_size, path)
+
+def walk_struct(walk_state, field_node, block_data, base_offset, position, limit, path):
+    struct_header = None
+    if not walk_state["is h1"]:
+        pos = walk_state["tail"]
+        if not (walk_state["file size"] - pos) < 16:
+            def_tag = field_node[0].get("tag")
+            header_size = 16
+            pack_string = "<4s3i"
+            if tag_interface.HAS_LEGACY_HEADER:
+                header_size = 12
+                pack_string = "<4s2hi"
+
+            walk_state["stream"].seek(pos)
+            struct_name, struct_version, struct_count, struct_size = struct.unpack(pack_string, walk_state["stream"].read(header_size))
+            struct_name = struct_name.decode('utf-8', 'replace')[::-1]
+            if def_tag == struct_name:
+                walk_state["tail"] += header_size
+                struct_header = (struct_version, struct_size)
+
+    if struct_header is None:
+        struct_field_set = None
+        for struct_layout in field_node:
+            for current_struct_field_set in struct_layout:
+                if int(current_struct_field_set.attrib.get('version')) == 0:
+                    struct_field_set = current_struct_field_set
+
+        if struct_field_set is None:
+            raise ValueError(f"Latest field set not found.")
+
+        struct_header = (int(struct_field_set.attrib.get('version')), int(struct_field_set.attrib.get('sizeofValue')))
+
+    struct_version, struct_size = struct_header
+    unread_data_size = limit - position
+    if unread_data_size < struct_size:
+        struct_size = unread_data_size
+
+    struct_limit = position + struct_size
+    for struct_layout in field_node:
+        position = yield from walk_fields(walk_state, struct_layout[struct_version], block_data, base_offset, position, struct_limit, path)
+
+    return position
+
+def walk_fields(walk_state, field_set, block_data, base_offset, position, limit, path):
+    field_filter = walk_state["filter"]
+    block_filter = walk_state["block filter"]
+    for field_node in field_set:
+        field_tag = field_node.tag
+        if field_tag == "Struct":
+            position = yield from walk_struct(walk_state, field_node, block_data, base_offset, position, limit, path)
+            continue
+
+        field_size = get_layout_field_size(field_node)
+        if field_size < 0:
+            continue
+
+        unread_data_size = limit - position
+        if field_tag == "LongBlockIndex":
+            # read_file compares against the field default here so we do the same to stay in sync.
+            if unread_data_size < 0:
+                continue
+
+        elif unread_data_size < field_size:
+            continue
+
+        field_path = path + (field_node.get("name"),)
+        endian_override = field_node.get("endianOverride") or walk_state["endian"]
+        tail_offset = None
+        if field_tag == "Block":
+            block_count = struct.unpack_from('%si' % endian_override, block_data, position)[0]
+            if block_count > 0:
+                tail_offset = walk_state["tail"]
+
+            if field_filter is None or field_filter(field_node):
+                yield field_path, field_node, base_offset + position, block_data[position:position + field_size], tail_offset
+
+            skip_block = block_count > 0 and block_filter is not None and not block_filter(field_node)
+            if skip_block and get_field_node_info(field_node)[1]:
+                block_version, block_size = read_block_header(walk_state, field_node)
+                skip_tail(walk_state, block_count * block_size)
+
+            elif skip_block:
+                walk_state["filter"] = lambda field_node: False
+                walk_state["block filter"] = None
+                yield from walk_block(walk_state, field_node, block_count, field_path)
+                walk_state["filter"] = field_filter
+                walk_state["block filter"] = block_filter
+
+            elif block_count > 0:
+                yield from walk_block(walk_state, field_node, block_count, field_path)
+
+        else:
+            if field_tag == "Data":
+                tail_offset = walk_state["tail"]
+                skip_tail(walk_state, struct.unpack_from('%si' % endian_override, block_data, position)[0])
+            elif field_tag == "TagReference":
+                path_length = struct.unpack_from('%si' % endian_override, block_data, position + 8)[0]
+                if path_length > 0:
+                    tail_offset = walk_state["tail"]
+                    skip_tail(walk_state, path_length + 1)
+            elif field_tag == "StringId" or (field_tag == "OldStringId" and not tag_interface.HAS_LEGACY_STRINGS):
+                string_length = struct.unpack_from('>2H', block_data, position)[1]
+                if string_length > 0:
+                    tail_offset = walk_state["tail"]
+                    skip_tail(walk_state, string_length)
+
+            if field_filter is None or field_filter(field_node):
+                yield field_path, field_node, base_offset + position, block_data[position:position + field_size], tail_offset
+
+        position += field_size
+
+    return position
+
+def iterate_tag_layout(merged_defs, tag_stream, field_filter=None, block_filter=None):
+    # Yields (field path, field node, offset, field bytes, tail offset) with field paths matching tag_dict["Data"].
+    tag_header, file_endian = read_layout_header(tag_stream)
+    if tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value:
+        tag_groups = tag_common.h1_tag_groups
+    else:
+        tag_groups = tag_common.h2_tag_groups
+
+    if not tag_interface.is_header_valid(tag_header, tag_groups):
+        raise ValueError(f"Invalid tag header for group {tag_header['tag group']}.")
+
+    tag_def = merged_defs.get(tag_header["tag group"])
+    if tag_def is None:
+        raise ValueError(f"Tag group {tag_header['tag group']} not found.")
+
+    tag_interface.is_tag_block_legacy(tag_header)
+    tag_interface.is_string_legacy(tag_header)
+    tag_interface.is_padding_legacy(tag_header)
+
+    walk_state = {"stream": tag_stream,
+                  "file size": tag_interface.get_stream_size(tag_stream),
+                  "tail": 64,
+                  "endian": file_endian,
+                  "is h1": tag_header["engine tag"] == tag_common.EngineTag.H1Latest.value,
+                  "filter": field_filter,
+                  "block filter": block_filter}
+
+    block_count = 1
+    if walk_state["is h1"]:
+        latest_field_set = get_latest_field_set(tag_def)
+        version = int(latest_field_set.attrib.get('version'))
+        size = int(latest_field_set.attrib.get('sizeofValue'))
+    else:
+        tag_stream.seek(64)
+        name, version, block_count, size = tag_interface.read_field_header(tag_stream, is_legacy=tag_interface.HAS_LEGACY_HEADER)
+        walk_state["tail"] = tag_stream.tell()
+        if tag_header["tag group"] == "vrtx" and size == 20:
+            version = -1
+
+    field_sets = [layout[version] for layout in tag_def]
+    yield from walk_elements(walk_state, field_sets, block_count, size, ())
+
+def is_reference_field(field_node):
+    return field_node.tag == "TagReference"
+
+def can_hold_references(field_node):
+    return get_field_node_info(field_node)[0]
+
+def scan_tag_references(merged_defs, tag_stream, field_filter=None):
+    reference_filter = is_reference_field
+    block_filter = can_hold_references
+    if field_filter is not None:
+        reference_filter = lambda field_node: is_reference_field(field_node) and field_filter(field_node)
+        block_filter = lambda field_node: can_hold_references(field_node) and field_filter(field_node)
+
+    tag_header, file_endian = read_layout_header(tag_stream)
+    tag_references = []
+    for field_path, field_node, offset, field_bytes, tail_offset in iterate_tag_layout(merged_defs, tag_stream, reference_filter, block_filter):
+        if tail_offset is None:
+            continue
+
+        endian_override = field_node.get("endianOverride") or file_endian
+        tag_group, unk1, length, unk2 = struct.unpack('%s4siii' % endian_override, field_bytes)
+        if int.from_bytes(tag_group, 'little' if endian_override == '<' else 'big', signed=True) == -1:
+            tag_group = None
+        else:
+            tag_group = tag_group.decode('utf-8', 'replace')
+            if endian_override == "<":
+                tag_group = tag_group[::-1]
+
+        tag_stream.seek(tail_offset)
+        tag_path = tag_stream.read(length + 1).decode('utf-8', 'replace').split('\x00', 1)[0].strip('\x20')
+        if len(tag_path) > 0:
+            tag_references.append((tag_group, tag_path, field_path))
+
+    return tag_references
+
+def find_tag_fields(merged_defs, tag_stream, field_paths):
+    pending_paths = {tuple(field_path) for field_path in field_paths}
+    field_names = {field_path[-1] for field_path in pending_paths}
+    located_fields = {}
+    if len(pending_paths) == 0:
+        return located_fields
+
+    for field_path, field_node, offset, field_bytes, tail_offset in iterate_tag_layout(merged_defs, tag_stream, lambda field_node: field_node.get("name") in field_names):
+        if field_path in pending_paths:
+            located_fields[field_path] = (field_node, offset, field_bytes)
+            pending_paths.discard(field_path)
+            if len(pending_paths) == 0:
+                break
+
+    return located_fields
+
+def get_field_offset(merged_defs, file_path, field_path):
+    with open(file_path, "rb") as tag_stream:
+        located_field = find_tag_fields(merged_defs, tag_stream, [field_path]).get(tuple(field_path))
+
+    if located_field is None:
+        raise ValueError(f"Field {field_path} is not stored in {file_path}.")
+
+    return located_field[1]
@@ -0,0 +1,220 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import io
+import os
+import json
+import math
+import struct
+import traceback
+
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from . import tag_common
+    from . import tag_interface
+    from . import tag_layout
+except ImportError:
+    import tag_common
+    import tag_interface
+    import tag_layout
+
+# Fields that own data outside of their fixed slot or that write_file does not round trip byte for byte.
+UNPATCHABLE_FIELDS = {"Block", "Data", "StringId", "OldStringId", "TagReference", "Struct", "Pad", "Skip", "UselessPad", "VertexBuffer"}
+
+def is_field_patchable(field_node):
+    field_tag = field_node.tag
+    if field_tag == "OldStringId" and tag_interface.HAS_LEGACY_STRINGS:
+        return True
+
+    return field_tag not in UNPATCHABLE_FIELDS
+
+def decode_field_value(field_node, field_bytes, tag_header, file_endian):
+    tag_interface.update_interface(tag_interface.FileModeEnum.read, file_endian)
+    tag_block_fields = {}
+    tag_interface.get_fields(None, io.BytesIO(field_bytes), tag_header, {"size": len(field_bytes)}, field_node, tag_block_fields, 0)
+
+    return tag_block_fields.get(field_node.get("name"))
+
+def encode_field_value(field_node, value, tag_header, file_endian):
+    field_size = tag_layout.get_layout_field_size(field_node)
+    tag_interface.update_interface(tag_interface.FileModeEnum.write, file_endian)
+    block_stream = io.BytesIO(bytes(field_size))
+    tag_interface.get_fields(None, block_stream, tag_header, {"size": field_size}, field_node, {field_node.get("name"): value}, 0)
+    field_bytes = block_stream.getvalue()
+    if len(field_bytes) != field_size:
+        raise ValueError(f"Field {field_node.get('name')} encoded to {len(field_bytes)} bytes but the slot is {field_size} bytes.")
+
+    return field_bytes
+
+def patch_tag_stream(merged_defs, tag_stream, field_values):
+    # field_values maps field paths like ("weapons", 0, "damage") to values as read_file gives them, or to a callable taking the old value.
+    if isinstance(field_values, dict):
+        field_values = list(field_values.items())
+
+    field_values = [(tuple(field_path), value) for field_path, value in field_values]
+    located_fields = tag_layout.find_tag_fields(merged_defs, tag_stream, [field_path for field_path, value in field_values])
+    tag_header, file_endian = tag_layout.read_layout_header(tag_stream)
+    file_size = tag_interface.get_stream_size(tag_stream)
+    for field_path, value in field_values:
+        located_field = located_fields.get(field_path)
+        if located_field is None:
+            raise ValueError(f"Field {field_path} is not stored in this tag.")
+
+        if not is_field_patchable(located_field[0]):
+            raise ValueError(f"Field {field_path} of type {located_field[0].tag} can't be patched in place.")
+
+    changes = []
+    checksum = tag_header["checksum"]
+    for field_path, value in field_values:
+        field_node, offset, old_bytes = located_fields[field_path]
+        old_value = decode_field_value(field_node, old_bytes, tag_header, file_endian)
+        if callable(value):
+            value = value(old_value)
+
+        new_bytes = encode_field_value(field_node, value, tag_header, file_endian)
+        if new_bytes != old_bytes:
+            tag_stream.seek(offset)
+            tag_stream.write(new_bytes)
+            checksum = tag_interface.checksum_patch(checksum, old_bytes, new_bytes, file_size - (offset + len(new_bytes)))
+            located_fields[field_path] = (field_node, offset, new_bytes)
+
+        changes.append({"field path": list(field_path),
+                        "offset": offset,
+                        "old value": old_value,
+                        "new value": decode_field_value(field_node, new_bytes, tag_header, file_endian),
+                        "changed": new_bytes != old_bytes})
+
+    if tag_interface.GENERATE_CHECKSUM and checksum != tag_header["checksum"]:
+        tag_stream.seek(40) # Position of the checksum in all tags
+        tag_stream.write(struct.pack('%sI' % file_endian, checksum))
+
+    return changes
+
+def patch_tag_file(merged_defs, file_path, field_values):
+    with open(file_path, "r+b") as tag_stream:
+        return patch_tag_stream(merged_defs, tag_stream, field_values)
+
+WORKER_STATE = {}
+
+EXPRESSION_GLOBALS = {"__builtins__": {}, "math": math, "abs": abs, "min": min, "max": max, "round": round, "int": int, "float": float}
+
+def initialize_edit_worker(engine_tag):
+    if WORKER_STATE.get("engine tag") != engine_tag:
+        WORKER_STATE["merged defs"] = tag_interface.get_merged_defs(engine_tag, dump_xml=False)
+        WORKER_STATE["engine tag"] = engine_tag
+
+    if WORKER_STATE.get("obfuscation buffer") is None:
+        WORKER_STATE["obfuscation buffer"] = tag_interface.obfuscation_buffer_prepare()
+
+def get_transform(value, expression):
+    transform = value
+    if callable(expression):
+        transform = expression
+    elif expression is not None:
+        compiled_expression = compile(expression, "<expression>", "eval")
+        transform = lambda old_value: eval(compiled_expression, EXPRESSION_GLOBALS, {"value": tag_interface.prepare_float_field(old_value)})
+
+    return transform
+
+def set_tag_dict_value(tag_block_fields, field_path, value):
+    for field_key in field_path[:-1]:
+        tag_block_fields = tag_block_fields[field_key]
+
+    old_value = tag_block_fields[field_path[-1]]
+    if callable(value):
+        value = value(old_value)
+
+    tag_block_fields[field_path[-1]] = value
+
+    return old_value, value
+
+def edit_tag(read_path, input_dir, field_path, value, expression, engine_tag):
+    initialize_edit_worker(engine_tag)
+    merged_defs = WORKER_STATE["merged defs"]
+    transform = get_transform(value, expression)
+    result = {"path": os.path.relpath(read_path, input_dir), "mode": "patched", "changes": [], "error": None}
+    try:
+        result["changes"] = patch_tag_file(merged_defs, read_path, [(field_path, transform)])
+
+    except ValueError as patch_error:
+        result["mode"] = "rewritten"
+        try:
+            tag_dict = tag_interface.read_file(merged_defs, input_dir, read_path, engine_tag=engine_tag, private=True)
+            old_value, new_value = set_tag_dict_value(tag_dict["Data"], field_path, transform)
+            tag_interface.write_file(merged_defs, tag_dict, WORKER_STATE["obfuscation buffer"], read_path, engine_tag=engine_tag)
+            result["changes"] = [{"field path": list(field_path), "offset": None, "old value": old_value, "new value": new_value, "changed": old_value != new_value}]
+            result["patch error"] = str(patch_error)
+
+        except Exception as e:
+            result["mode"] = "error"
+            result["error"] = f"{type(e).__name__}: {e}"
+            result["traceback"] = traceback.format_exc()
+
+    except Exception as e:
+        result["mode"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+        result["traceback"] = traceback.format_exc()
+
+    return result
+
+def bulk_edit_directory(input_dir, tag_group, field_path, value=None, expression=None, engine_tag=tag_common.EngineTag.H2Latest.value, merged_defs=None, workers=None, report_path=None):
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    tag_extension = tag_groups.get(tag_group)
+    if tag_extension is None:
+        raise ValueError(f"Tag group {tag_group} not found.")
+
+    field_path = tuple(field_path)
+    read_paths = []
+    for root, dirs, files in os.walk(input_dir):
+        for file in files:
+            if file.rsplit(".", 1)[-1] == tag_extension:
+                read_paths.append(os.path.join(root, file))
+
+    if merged_defs is not None:
+        WORKER_STATE["merged defs"] = merged_defs
+        WORKER_STATE["engine tag"] = engine_tag
+
+    if workers == 1:
+        results = [edit_tag(read_path, input_dir, field_path, value, expression, engine_tag) for read_path in read_paths]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=initialize_edit_worker, initargs=(engine_tag,)) as executor:
+            futures = [executor.submit(edit_tag, read_path, input_dir, field_path, value, expression, engine_tag) for read_path in read_paths]
+            results = [future.result() for future in futures]
+
+    results.sort(key=lambda result: result["path"])
+    report = {"tag group": tag_group,
+              "field path": list(field_path),
+              "patched": sum(1 for result in results if result["mode"] == "patched"),
+              "rewritten": sum(1 for result in results if result["mode"] == "rewritten"),
+              "errors": sum(1 for result in results if result["mode"] == "error"),
+              "tags": results}
+
+    if report_path is not None:
+        with open(report_path, 'w', encoding='utf8') as report_file:
+            json.dump(report, report_file, ensure_ascii=True, indent=4)
+
+    return report
@@ -0,0 +1,181 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+
+# Lists a tags directory once with scandir so resolving a reference doesn't hit the disk every time. Only directories
+# whose mtime moved get listed again. References are written on Windows so lookups fall back to a lowercase copy of the index.
+
+TAG_PATH_INDEXES = {}
+
+def get_index_path(tag_path):
+    return tag_path.replace("\\", "/").strip("/")
+
+def get_folded_path(tag_path):
+    return get_index_path(tag_path).lower()
+
+def split_index_path(index_path):
+    if "/" in index_path:
+        return index_path.rsplit("/", 1)
+
+    return "", index_path
+
+class TagPathIndex:
+    def __init__(self, root_path):
+        self.root_path = os.path.abspath(root_path)
+        # Relative directory path: {"mtime", "files", "dirs", "folded files"}.
+        self.directories = {}
+        self.folded_dirs = {}
+        self.scan_directory("")
+
+    def get_real_path(self, index_path):
+        if len(index_path) == 0:
+            return self.root_path
+
+        return os.path.join(self.root_path, *index_path.split("/"))
+
+    def remove_directory(self, index_dir):
+        directory = self.directories.pop(index_dir, None)
+        if self.folded_dirs.get(index_dir.lower()) == index_dir:
+            del self.folded_dirs[index_dir.lower()]
+
+        if directory is not None:
+            for dir_name in directory["dirs"]:
+                self.remove_directory("%s/%s" % (index_dir, dir_name) if index_dir else dir_name)
+
+    def scan_directory(self, index_dir):
+        pending_dirs = [index_dir]
+        while len(pending_dirs) > 0:
+            index_dir = pending_dirs.pop()
+            real_dir = self.get_real_path(index_dir)
+            try:
+                # mtime is read before listing so anything that changes mid listing shows up on the next refresh.
+                dir_mtime = os.stat(real_dir).st_mtime_ns
+                with os.scandir(real_dir) as dir_entries:
+                    file_names = set()
+                    dir_names = set()
+                    for dir_entry in dir_entries:
+                        if dir_entry.is_dir(follow_symlinks=False):
+                            dir_names.add(dir_entry.name)
+                        elif dir_entry.is_file():
+                            file_names.add(dir_entry.name)
+
+            except OSError:
+                self.remove_directory(index_dir)
+                continue
+
+            old_directory = self.directories.get(index_dir)
+            if old_directory is not None:
+                for dir_name in old_directory["dirs"] - dir_names:
+                    self.remove_directory("%s/%s" % (index_dir, dir_name) if index_dir else dir_name)
+
+            folded_files = {}
+            for file_name in sorted(file_names):
+                folded_files.setdefault(file_name.lower(), file_name)
+
+            self.directories[index_dir] = {"mtime": dir_mtime, "files": file_names, "dirs": dir_names, "folded files": folded_files}
+            folded_dir = index_dir.lower()
+            if self.folded_dirs.get(folded_dir) not in self.directories or index_dir < self.folded_dirs[folded_dir]:
+                self.folded_dirs[folded_dir] = index_dir
+
+            for dir_name in dir_names:
+                child_dir = "%s/%s" % (index_dir, dir_name) if index_dir else dir_name
+                if child_dir not in self.directories:
+                    pending_dirs.append(child_dir)
+
+    def is_directory_current(self, index_dir):
+        try:
+            return os.stat(self.get_real_path(index_dir)).st_mtime_ns == self.directories[index_dir]["mtime"]
+        except OSError:
+            return False
+
+    def refresh(self):
+        stale_dirs = [index_dir for index_dir in self.directories if not self.is_directory_current(index_dir)]
+        # Parents go first so removed trees are dropped before anything tries to list them.
+        stale_dirs.sort(key=len)
+        for index_dir in stale_dirs:
+            if index_dir in self.directories:
+                self.scan_directory(index_dir)
+
+        return len(stale_dirs)
+
+    def refresh_path(self, index_path):
+        folded_dir = ""
+        for dir_name in [""] + index_path.lower().split("/")[:-1]:
+            if dir_name:
+                folded_dir = "%s/%s" % (folded_dir, dir_name) if folded_dir else dir_name
+
+            index_dir = self.folded_dirs.get(folded_dir)
+            if index_dir is None:
+                break
+
+            if not self.is_directory_current(index_dir):
+                self.scan_directory(index_dir)
+
+    def find_file(self, file_path):
+        index_path = get_index_path(file_path)
+        for attempt in range(2):
+            index_dir, file_name = split_index_path(index_path)
+            directory = self.directories.get(index_dir)
+            if directory is not None and file_name in directory["files"]:
+                return self.get_real_path(index_path)
+
+            folded_dir, folded_name = split_index_path(index_path.lower())
+            real_dir = self.folded_dirs.get(folded_dir)
+            if real_dir is not None:
+                real_name = self.directories[real_dir]["folded files"].get(folded_name)
+                if real_name is not None:
+                    return self.get_real_path("%s/%s" % (real_dir, real_name) if real_dir else real_name)
+
+            if attempt == 0:
+                self.refresh_path(index_path)
+
+        return None
+
+def get_path_index(tag_directory):
+    index_key = os.path.abspath(tag_directory)
+    path_index = TAG_PATH_INDEXES.get(index_key)
+    if path_index is None:
+        path_index = TagPathIndex(tag_directory)
+        TAG_PATH_INDEXES[index_key] = path_index
+
+    return path_index
+
+def refresh_path_index(tag_directory):
+    index_key = os.path.abspath(tag_directory)
+    path_index = TAG_PATH_INDEXES.get(index_key)
+    if path_index is None:
+        return get_path_index(tag_directory)
+
+    path_index.refresh()
+
+    return path_index
+
+def find_tag_file(tag_directory, tag_path, tag_extension):
+    return get_path_index(tag_directory).find_file("%s.%s" % (tag_path, tag_extension))
+
+def clear_path_indexes():
+    TAG_PATH_INDEXES.clear()
@@ -0,0 +1,151 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import struct
+
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    from . import tag_common
+    from . import tag_interface
+except ImportError:
+    import tag_common
+    import tag_interface
+
+# Reads the 64 byte header and the root tbfd header of every tag in a directory and nothing else.
+# Nothing here touches the tag_interface globals so it's safe to run on threads.
+
+SCAN_FIELDS = ("path", "tag group", "engine tag", "version", "checksum", "file size", "mtime", "root version", "root count", "root size",
+               "flags", "tag type", "data offset", "data length", "destination", "plugin handle")
+
+SCAN_CHUNK_SIZE = 256
+
+def get_scan_extensions(engine_tag=None):
+    if engine_tag == tag_common.EngineTag.H1Latest.value:
+        return set(tag_common.h1_tag_extensions)
+    elif engine_tag is not None:
+        return set(tag_common.h2_tag_extensions)
+
+    return set(tag_common.h1_tag_extensions) | set(tag_common.h2_tag_extensions)
+
+def iter_tag_entries(input_dir, tag_extensions=None):
+    pending_dirs = [input_dir]
+    while len(pending_dirs) > 0:
+        with os.scandir(pending_dirs.pop()) as dir_entries:
+            for dir_entry in dir_entries:
+                if dir_entry.is_dir(follow_symlinks=False):
+                    pending_dirs.append(dir_entry.path)
+                elif tag_extensions is None or dir_entry.name.rsplit(".", 1)[-1] in tag_extensions:
+                    yield dir_entry.path, dir_entry.stat()
+
+def unpack_scan_record(path, header_bytes, file_size, mtime):
+    if len(header_bytes) < 64:
+        return (path, None, None, None, None, file_size, mtime, None, None, None, None, None, None, None, None, None)
+
+    file_endian = ">"
+    if not header_bytes[60:64] == b"blam":
+        file_endian = "<"
+
+    (unk1, flags, tag_type, name, tag_group, checksum, data_offset, data_length, unk2, version, destination,
+     plugin_handle, engine_tag) = struct.unpack_from('%shbb32s4sIiiihbb4s' % file_endian, header_bytes)
+
+    tag_group = tag_group.decode('utf-8', 'replace')
+    engine_tag = engine_tag.decode('utf-8', 'replace')
+    if file_endian == "<":
+        tag_group = tag_group[::-1]
+        engine_tag = engine_tag[::-1]
+
+    root_version = root_count = root_size = None
+    if not engine_tag == tag_common.EngineTag.H1Latest.value:
+        if engine_tag == tag_common.EngineTag.H2V1.value:
+            if len(header_bytes) >= 76:
+                root_name, root_version, root_count, root_size = struct.unpack_from('<4s2hi', header_bytes, 64)
+        elif len(header_bytes) >= 80:
+            root_name, root_version, root_count, root_size = struct.unpack_from('<4s3i', header_bytes, 64)
+
+    return (path, tag_group, engine_tag, version, checksum, file_size, mtime, root_version, root_count, root_size,
+            flags, tag_type, data_offset, data_length, destination, plugin_handle)
+
+def scan_tag_header(path, stat_result=None):
+    try:
+        with open(path, "rb") as input_stream:
+            if stat_result is None:
+                stat_result = os.fstat(input_stream.fileno())
+
+            header_bytes = input_stream.read(80)
+
+    except OSError:
+        header_bytes = b""
+        if stat_result is None:
+            return (path, None, None, None, None, None, None, None, None, None, None, None, None, None, None, None)
+
+    return unpack_scan_record(path, header_bytes, stat_result.st_size, stat_result.st_mtime_ns)
+
+def scan_tag_chunk(tag_entries):
+    return [scan_tag_header(path, stat_result) for path, stat_result in tag_entries]
+
+def scan_tag_files(tag_entries, workers=None):
+    chunks = []
+    current_chunk = []
+    for tag_entry in tag_entries:
+        current_chunk.append(tag_entry)
+        if len(current_chunk) == SCAN_CHUNK_SIZE:
+            chunks.append(current_chunk)
+            current_chunk = []
+
+    if len(current_chunk) > 0:
+        chunks.append(current_chunk)
+
+    scan_records = []
+    if workers == 1:
+        for chunk in chunks:
+            scan_records.extend(scan_tag_chunk(chunk))
+    else:
+        if workers is None:
+            workers = min(32, (os.cpu_count() or 1) * 4)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for chunk_records in executor.map(scan_tag_chunk, chunks):
+                scan_records.extend(chunk_records)
+
+    return scan_records
+
+def scan_tag_headers(input_dir, engine_tag=None, workers=None, relative=True):
+    scan_records = scan_tag_files(iter_tag_entries(input_dir, get_scan_extensions(engine_tag)), workers)
+    if relative:
+        scan_records = [(os.path.relpath(scan_record[0], input_dir),) + scan_record[1:] for scan_record in scan_records]
+
+    scan_records.sort(key=lambda scan_record: scan_record[0])
+
+    return scan_records
+
+def is_scan_record_valid(scan_record):
+    tag_groups = tag_common.h2_tag_groups
+    if scan_record[2] == tag_common.EngineTag.H1Latest.value:
+        tag_groups = tag_common.h1_tag_groups
+
+    return scan_record[1] is not None and tag_interface.is_header_valid({"tag group": scan_record[1], "engine tag": scan_record[2]}, tag_groups)
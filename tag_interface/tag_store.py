@@ -0,0 +1,243 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import os
+import time
+import zlib
+import pickle
+import sqlite3
+import threading
+
+# Parsed assets for the Blender importer in a single SQLite file. assets is a small index holding the checksum of each
+# tag, the pickled and compressed asset sits in asset_payloads keyed by tag_interface.get_content_key so copies of a tag
+# share one payload. tag_path is folded with tag_resolver.get_folded_path so every spelling lands on the same row.
+
+ASSET_STORE_VERSION = 3
+
+ASSET_STORE_PATH = os.path.join(os.path.expanduser("~"), "Blender Halo Toolset", "Asset Cache", "asset_store.db")
+
+ASSET_STORE_SIZE = 2147483648
+
+ASSET_STORE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS store_info (key TEXT PRIMARY KEY, value TEXT)",
+    "CREATE TABLE IF NOT EXISTS assets ("
+    "tag_path TEXT, "
+    "tag_extension TEXT, "
+    "checksum INTEGER, "
+    "content_key TEXT, "
+    "tag_name TEXT, "
+    "last_access REAL, "
+    "PRIMARY KEY (tag_path, tag_extension))",
+    "CREATE TABLE IF NOT EXISTS asset_payloads ("
+    "content_key TEXT PRIMARY KEY, "
+    "payload BLOB, "
+    "payload_size INTEGER)",
+    "CREATE INDEX IF NOT EXISTS assets_last_access ON assets (last_access)",
+    "CREATE INDEX IF NOT EXISTS assets_content_key ON assets (content_key)",
+)
+
+ASSET_STORE_TABLES = ("assets", "asset_payloads")
+
+ASSET_STORES = {}
+
+def open_asset_store(store_path=None):
+    if store_path is None:
+        store_path = ASSET_STORE_PATH
+
+    os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+    # Another session may be in the middle of a write so wait on the lock instead of failing right away.
+    connection = sqlite3.connect(store_path, timeout=30.0)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA synchronous=NORMAL")
+    with connection:
+        connection.execute(ASSET_STORE_SCHEMA[0])
+        version_row = connection.execute("SELECT value FROM store_info WHERE key = 'version'").fetchone()
+        if version_row is not None and not version_row["value"] == str(ASSET_STORE_VERSION):
+            # It's only a cache so a store from another version is started over instead of converted.
+            for table_name in ASSET_STORE_TABLES:
+                connection.execute("DROP TABLE IF EXISTS %s" % table_name)
+
+        for statement in ASSET_STORE_SCHEMA:
+            connection.execute(statement)
+
+        connection.execute("INSERT OR REPLACE INTO store_info (key, value) VALUES ('version', ?)", (str(ASSET_STORE_VERSION),))
+
+    return connection
+
+def get_asset_store(store_path=None):
+    if store_path is None:
+        store_path = ASSET_STORE_PATH
+
+    store_key = (os.path.abspath(store_path), os.getpid(), threading.get_ident())
+    connection = ASSET_STORES.get(store_key)
+    if connection is None:
+        connection = open_asset_store(store_path)
+        ASSET_STORES[store_key] = connection
+
+    return connection
+
+def close_asset_stores():
+    for connection in ASSET_STORES.values():
+        connection.close()
+
+    ASSET_STORES.clear()
+
+def get_asset_checksum(connection, tag_path, tag_extension):
+    asset_row = connection.execute("SELECT checksum FROM assets WHERE tag_path = ? AND tag_extension = ?", (tag_path, tag_extension)).fetchone()
+    if asset_row is None:
+        return None
+
+    return asset_row["checksum"]
+
+def unpack_payload(payload):
+    # Payloads are pickles so don't point ASSET_STORE_PATH or get_asset_store at a file that came from someone else.
+    try:
+        return pickle.loads(zlib.decompress(payload))
+    except Exception:
+        # Written by something newer or cut short. Treat it as a miss, it'll get replaced by the next store.
+        return None
+
+def load_asset(connection, tag_path, tag_extension, checksum=None):
+    asset_row = connection.execute("SELECT a.checksum, a.tag_name, p.payload FROM assets a JOIN asset_payloads p ON p.content_key = a.content_key "
+                                   "WHERE a.tag_path = ? AND a.tag_extension = ?", (tag_path, tag_extension)).fetchone()
+    if asset_row is None or (checksum is not None and not asset_row["checksum"] == checksum):
+        return None
+
+    parsed_asset = unpack_payload(asset_row["payload"])
+    if parsed_asset is not None:
+        if asset_row["tag_name"] is not None:
+            parsed_asset["TagName"] = asset_row["tag_name"]
+
+        with connection:
+            connection.execute("UPDATE assets SET last_access = ? WHERE tag_path = ? AND tag_extension = ?", (time.time(), tag_path, tag_extension))
+
+    return parsed_asset
+
+def load_content(connection, content_key, tag_name=None):
+    payload_row = connection.execute("SELECT payload FROM asset_payloads WHERE content_key = ?", (content_key,)).fetchone()
+    if payload_row is None:
+        return None
+
+    parsed_asset = unpack_payload(payload_row["payload"])
+    if parsed_asset is not None and tag_name is not None:
+        parsed_asset["TagName"] = tag_name
+
+    return parsed_asset
+
+def begin_write(connection):
+    # Takes the write lock up front so another session can't change the rows between our read and our write.
+    connection.execute("BEGIN IMMEDIATE")
+
+def set_asset_row(connection, tag_path, tag_extension, checksum, content_key, tag_name):
+    # Called inside the caller's transaction.
+    old_content_key = get_asset_content_key(connection, tag_path, tag_extension)
+    connection.execute("INSERT OR REPLACE INTO assets (tag_path, tag_extension, checksum, content_key, tag_name, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                       (tag_path, tag_extension, checksum, content_key, tag_name, time.time()))
+    if old_content_key is not None and not old_content_key == content_key:
+        remove_unused_payload(connection, old_content_key)
+
+def link_asset(connection, tag_path, tag_extension, checksum, content_key, tag_name=None):
+    with connection:
+        begin_write(connection)
+        if connection.execute("SELECT 1 FROM asset_payloads WHERE content_key = ?", (content_key,)).fetchone() is None:
+            return False
+
+        set_asset_row(connection, tag_path, tag_extension, checksum, content_key, tag_name)
+
+    return True
+
+def store_asset(connection, tag_path, tag_extension, parsed_asset, content_key, checksum=None):
+    if checksum is None:
+        checksum = parsed_asset["Header"]["checksum"]
+
+    payload = zlib.compress(pickle.dumps(parsed_asset, pickle.HIGHEST_PROTOCOL), 1)
+    with connection:
+        begin_write(connection)
+        connection.execute("INSERT OR REPLACE INTO asset_payloads (content_key, payload, payload_size) VALUES (?, ?, ?)", (content_key, payload, len(payload)))
+        set_asset_row(connection, tag_path, tag_extension, checksum, content_key, parsed_asset.get("TagName"))
+
+def get_asset_content_key(connection, tag_path, tag_extension):
+    asset_row = connection.execute("SELECT content_key FROM assets WHERE tag_path = ? AND tag_extension = ?", (tag_path, tag_extension)).fetchone()
+    if asset_row is None:
+        return None
+
+    return asset_row["content_key"]
+
+def remove_asset(connection, tag_path, tag_extension):
+    with connection:
+        begin_write(connection)
+        content_key = get_asset_content_key(connection, tag_path, tag_extension)
+        connection.execute("DELETE FROM assets WHERE tag_path = ? AND tag_extension = ?", (tag_path, tag_extension))
+        if content_key is not None:
+            remove_unused_payload(connection, content_key)
+
+def remove_unused_payload(connection, content_key):
+    # Called inside the caller's transaction.
+    connection.execute("DELETE FROM asset_payloads WHERE content_key = ? AND NOT EXISTS (SELECT 1 FROM assets WHERE content_key = ?)", (content_key, content_key))
+
+def get_store_size(connection):
+    return connection.execute("SELECT COALESCE(SUM(payload_size), 0) FROM asset_payloads").fetchone()[0]
+
+def evict_assets(connection, max_size=None):
+    if max_size is None:
+        max_size = ASSET_STORE_SIZE
+
+    if get_store_size(connection) <= max_size:
+        return 0
+
+    evicted_keys = []
+    with connection:
+        # The user counts have to match the rows we delete so everything from here on holds the write lock.
+        begin_write(connection)
+        store_size = get_store_size(connection)
+        payload_sizes = {}
+        payload_users = {}
+        for payload_row in connection.execute("SELECT p.content_key, p.payload_size, COUNT(a.content_key) AS users FROM asset_payloads p "
+                                              "LEFT JOIN assets a ON a.content_key = p.content_key GROUP BY p.content_key"):
+            payload_sizes[payload_row["content_key"]] = payload_row["payload_size"]
+            payload_users[payload_row["content_key"]] = payload_row["users"]
+
+        for asset_row in connection.execute("SELECT tag_path, tag_extension, content_key FROM assets ORDER BY last_access").fetchall():
+            if store_size <= max_size:
+                break
+
+            evicted_keys.append((asset_row["tag_path"], asset_row["tag_extension"]))
+            content_key = asset_row["content_key"]
+            if content_key in payload_users:
+                payload_users[content_key] -= 1
+                if payload_users[content_key] == 0:
+                    store_size -= payload_sizes[content_key]
+
+        connection.executemany("DELETE FROM assets WHERE tag_path = ? AND tag_extension = ?", evicted_keys)
+        connection.execute("DELETE FROM asset_payloads WHERE content_key NOT IN (SELECT content_key FROM assets)")
+
+    return len(evicted_keys)
+
+def clear_asset_store(connection):
+    with connection:
+        connection.execute("DELETE FROM assets")
+        connection.execute("DELETE FROM asset_payloads")
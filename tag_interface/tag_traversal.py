@@ -0,0 +1,119 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+try:
+    from . import tag_common
+except ImportError:
+    import tag_common
+
+# Decides which references get followed when walking from a tag to everything it needs. The checks also work on the
+# definitions so the reference scanner in tag_layout can skip blocks that can't hold a reference the policy wants.
+
+class TraversalPolicy:
+    def __init__(self, allowed_groups=None, group_rules=None, max_depth=None, excluded_fields=(), group_aliases=None):
+        # group_rules maps a source group to the groups followed from it instead of allowed_groups. None allows everything.
+        self.allowed_groups = None if allowed_groups is None else frozenset(allowed_groups)
+        self.group_rules = {source_group: frozenset(target_groups) for source_group, target_groups in (group_rules or {}).items()}
+        self.max_depth = max_depth
+        self.excluded_fields = frozenset(excluded_fields)
+        self.group_aliases = group_aliases or {}
+        self.field_cache = {}
+
+    def __getstate__(self):
+        # Policies get sent to graph workers, the cache is keyed on definition nodes which don't make the trip.
+        policy_state = dict(self.__dict__)
+        policy_state["field_cache"] = {}
+
+        return policy_state
+
+    def get_reference_group(self, game_title, reference_group):
+        return self.group_aliases.get(game_title, {}).get(reference_group, reference_group)
+
+    def get_allowed_groups(self, source_group):
+        return self.group_rules.get(source_group, self.allowed_groups)
+
+    def allows_group(self, source_group, reference_group):
+        allowed_groups = self.get_allowed_groups(source_group)
+
+        return allowed_groups is None or reference_group in allowed_groups
+
+    def allows_depth(self, depth):
+        return self.max_depth is None or depth <= self.max_depth
+
+    def allows_field(self, source_group, field_name):
+        return not (field_name in self.excluded_fields or (source_group, field_name) in self.excluded_fields)
+
+    def get_field_groups(self, field_node):
+        field_groups = set()
+        for tag_node in field_node:
+            if not tag_node.text:
+                return None
+
+            # H1 definitions name the group by its extension.
+            reference_group = tag_common.h1_tag_extensions.get(tag_node.text, tag_node.text)
+            field_groups.add(reference_group)
+            field_groups.update(tag_common.tag_group_children.get(reference_group, ()))
+
+        if len(field_groups) == 0:
+            return None
+
+        for game_aliases in self.group_aliases.values():
+            field_groups.update(game_aliases[reference_group] for reference_group in list(field_groups) if reference_group in game_aliases)
+
+        return field_groups
+
+    def allows_field_node(self, source_group, field_node):
+        cache_key = (source_group, field_node)
+        field_allowed = self.field_cache.get(cache_key)
+        if field_allowed is None:
+            field_allowed = False
+            if self.allows_field(source_group, field_node.get("name")):
+                if field_node.tag == "TagReference":
+                    allowed_groups = self.get_allowed_groups(source_group)
+                    field_groups = self.get_field_groups(field_node)
+                    field_allowed = allowed_groups is None or field_groups is None or not allowed_groups.isdisjoint(field_groups)
+                else:
+                    field_allowed = self.has_allowed_fields(source_group, field_node)
+
+            self.field_cache[cache_key] = field_allowed
+
+        return field_allowed
+
+    def has_allowed_fields(self, source_group, field_node):
+        for layout in field_node:
+            for field_set in layout:
+                for child_node in field_set:
+                    if child_node.tag == "Struct":
+                        if self.has_allowed_fields(source_group, child_node):
+                            return True
+
+                    elif child_node.tag in ("TagReference", "Block") and self.allows_field_node(source_group, child_node):
+                        return True
+
+        return False
+
+    def get_field_filter(self, source_group):
+        return lambda field_node: self.allows_field_node(source_group, field_node)
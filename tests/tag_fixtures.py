@@ -0,0 +1,189 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tag_interface"))
+
+import tag_common
+import tag_defaults
+import tag_interface
+
+# Tags for the tests are built from the definitions instead of shipping binaries. Values are random but seeded
+# so every run writes the same bytes.
+
+H1_ENGINE_TAG = tag_common.EngineTag.H1Latest.value
+H2_ENGINE_TAG = tag_common.EngineTag.H2Latest.value
+
+MERGED_DEFS = {}
+
+def get_merged_defs(engine_tag=H2_ENGINE_TAG):
+    merged_defs = MERGED_DEFS.get(engine_tag)
+    if merged_defs is None:
+        merged_defs = MERGED_DEFS[engine_tag] = tag_interface.get_merged_defs(engine_tag)
+
+    return merged_defs
+
+def get_tag_reference(tag_group, tag_path):
+    return {"group name": tag_group, "unk1": 0, "length": len(tag_path), "unk2": -1, "path": tag_path}
+
+def get_latest_field_set(field_node):
+    for layout in field_node:
+        for field_set in layout:
+            if field_set.get("isLatest"):
+                return field_set
+
+    return None
+
+def get_random_value(field_node, rng):
+    field_tag = field_node.tag
+    if field_tag in ("Real", "RealFraction"):
+        return rng.choice([0.0, 1.5, -2.25, 100.0])
+    elif field_tag == "Angle":
+        return 90.0
+    elif field_tag in ("AngleBounds", "RealBounds", "RealFractionBounds"):
+        return {"Min": 1.0, "Max": 2.0}
+    elif field_tag == "ShortBounds":
+        return {"Min": 1, "Max": 2}
+    elif field_tag in ("ShortInteger", "CharInteger", "LongInteger", "ShortBlockIndex", "LongBlockIndex", "CharBlockIndex", "CustomShortBlockIndex",
+                       "CustomLongBlockIndex", "WordFlags", "LongFlags", "ByteFlags", "WordBlockFlags"):
+        return rng.randint(0, 100)
+    elif field_tag in ("ShortEnum", "CharEnum", "LongEnum"):
+        return {"type": field_tag, "value": rng.randint(0, 3), "value name": ""}
+    elif field_tag == "String":
+        return rng.choice(["", "abc", "hello world"])
+    elif field_tag in ("StringId", "OldStringId"):
+        return rng.choice(["", "marine", "default"])
+    elif field_tag == "TagReference":
+        return rng.choice([get_tag_reference(None, ""), get_tag_reference("bitm", "shared\\bitmaps\\foo")])
+    elif field_tag in ("RealPoint3D", "RealVector3D", "RealEulerAngles3D"):
+        return (1.0, 2.0, 3.0)
+    elif field_tag in ("RealPoint2D", "RealVector2D", "RealEulerAngles2D"):
+        return (1.0, 2.0)
+    elif field_tag == "RealRgbColor":
+        return {"R": 0.5, "G": 0.25, "B": 1.0}
+    elif field_tag == "RealArgbColor":
+        return {"A": 1.0, "R": 0.5, "G": 0.25, "B": 1.0}
+
+    return None
+
+def fill_field_set(field_set, tag_block_fields, rng, depth=0):
+    for field_node in field_set:
+        field_key = field_node.get("name")
+        if field_node.tag == "Struct":
+            fill_field_set(get_latest_field_set(field_node), tag_block_fields, rng, depth)
+        elif field_node.tag == "Block":
+            block_count = rng.choice([0, 1, 2]) if depth < 4 else 0
+            block_field_set = get_latest_field_set(field_node)
+            tag_block_fields[field_key] = []
+            for _ in range(block_count):
+                tag_block_element = {}
+                fill_field_set(block_field_set, tag_block_element, rng, depth + 1)
+                tag_block_fields[field_key].append(tag_block_element)
+        else:
+            field_value = get_random_value(field_node, rng)
+            if field_value is not None:
+                tag_block_fields[field_key] = field_value
+
+def get_tag_path(tags_dir, tag_group, tag_path, engine_tag=H2_ENGINE_TAG):
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+
+    return os.path.join(tags_dir, *tag_path.replace("\\", "/").split("/")) + "." + tag_groups[tag_group]
+
+def write_random_tag(tags_dir, tag_group, tag_path, engine_tag=H2_ENGINE_TAG, seed=1):
+    merged_defs = get_merged_defs(engine_tag)
+    file_path = get_tag_path(tags_dir, tag_group, tag_path, engine_tag)
+    tag_data = {}
+    fill_field_set(get_latest_field_set(merged_defs[tag_group]), tag_data, random.Random(seed))
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    try:
+        tag_interface.write_file(merged_defs, {"Data": tag_data}, tag_interface.obfuscation_buffer_prepare(), file_path, engine_tag=engine_tag)
+    except Exception:
+        # A few groups have postprocessing that needs real data.
+        if os.path.exists(file_path):
+            os.remove(file_path)
+
+        return None
+
+    return file_path
+
+def write_random_tags(tags_dir, engine_tag=H2_ENGINE_TAG, seed=1):
+    tag_groups, tag_extensions = tag_interface.get_tag_extensions(engine_tag)
+    merged_defs = get_merged_defs(engine_tag)
+    file_paths = []
+    for tag_group in tag_groups:
+        if merged_defs.get(tag_group) is not None:
+            file_path = write_random_tag(tags_dir, tag_group, "t", engine_tag, seed)
+            if file_path is not None:
+                file_paths.append(file_path)
+
+    return file_paths
+
+def write_default_tag(tags_dir, tag_group, tag_path, engine_tag=H2_ENGINE_TAG, **field_values):
+    merged_defs = get_merged_defs(engine_tag)
+    file_path = get_tag_path(tags_dir, tag_group, tag_path, engine_tag)
+    tag_dict = tag_defaults.get_default_tag_dict(merged_defs, tag_group, engine_tag)
+    for field_key, field_value in field_values.items():
+        tag_dict["Data"][field_key.replace("_", " ")] = field_value
+
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    tag_interface.write_file(merged_defs, tag_dict, tag_interface.obfuscation_buffer_prepare(), file_path, engine_tag=engine_tag)
+
+    return file_path
+
+# A small H2 graph for the loaders. The biped spells the shader path with other case than the model does, the shader and
+# its template reference each other, the collision model doesn't exist and effe isn't in the default whitelist.
+TAG_GRAPH = (("bipd", "objects\\test\\test", {"model": ("hlmt", "objects\\test\\test"), "modifier shader": ("shad", "Objects\\Test\\Skin"), "creation effect": ("effe", "effects\\test\\spawn")}),
+             ("hlmt", "objects\\test\\test", {"render model": ("mode", "objects\\test\\test"), "collision model": ("coll", "objects\\test\\missing"), "hologram shader": ("shad", "objects\\test\\skin")}),
+             ("mode", "objects\\test\\test", {}),
+             ("shad", "objects\\test\\skin", {"template": ("stem", "shaders\\test")}),
+             ("stem", "shaders\\test", {"aux-1 shader": ("shad", "objects\\test\\skin")}),
+             ("effe", "effects\\test\\spawn", {}))
+
+def write_tag_graph(tags_dir):
+    for tag_group, tag_path, tag_references in TAG_GRAPH:
+        field_values = {field_key: get_tag_reference(reference_group, reference_path) for field_key, (reference_group, reference_path) in tag_references.items()}
+        write_default_tag(tags_dir, tag_group, tag_path, **field_values)
+
+    return get_tag_reference("bipd", "objects\\test\\test")
+
+def get_tag_dict_value(tag_block_fields, field_path):
+    for field_key in field_path:
+        tag_block_fields = tag_block_fields[field_key]
+
+    return tag_block_fields
+
+def read_layout_tag(file_path, engine_tag=H2_ENGINE_TAG):
+    # Layout and patching follow the field set on disk so read without upgrading.
+    preserve_version = tag_interface.PRESERVE_VERSION
+    tag_interface.PRESERVE_VERSION = True
+    try:
+        return tag_interface.read_file(get_merged_defs(engine_tag), os.path.dirname(file_path), file_path, engine_tag=engine_tag)
+    finally:
+        tag_interface.PRESERVE_VERSION = preserve_version
@@ -0,0 +1,125 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+import tag_fixtures
+
+import tag_archive
+import tag_interface
+import tag_resolver
+import tag_store
+
+class TagArchiveTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        self.model_path = tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "objects\\test\\test")
+        self.biped_path = tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\test\\test", model=tag_fixtures.get_tag_reference("hlmt", "objects\\test\\test"))
+        self.zip_path = os.path.join(self.temp_dir, "tags.zip")
+        with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_DEFLATED) as zip_file:
+            for file_path in (self.model_path, self.biped_path):
+                zip_file.write(file_path, os.path.relpath(file_path, self.temp_dir).replace(os.sep, "/"))
+
+        self.tar_path = os.path.join(self.temp_dir, "tags.tar")
+        with tarfile.open(self.tar_path, "w") as tar_file:
+            tar_file.add(self.tags_dir, "tags")
+
+        self.merged_defs = tag_fixtures.get_merged_defs()
+        self.tag_groups, self.tag_extensions = tag_interface.get_tag_extensions(tag_fixtures.H2_ENGINE_TAG)
+
+    def tearDown(self):
+        tag_archive.close_tag_sources()
+        tag_store.close_asset_stores()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_archive_path(self, archive_path, file_path):
+        return os.path.join(archive_path, os.path.relpath(file_path, self.temp_dir))
+
+    def test_read_file_from_archive(self):
+        disk_dict = tag_interface.read_file(self.merged_defs, self.tags_dir, self.biped_path)
+        for archive_path in (self.zip_path, self.tar_path):
+            archive_tags_dir = os.path.join(archive_path, "tags")
+            archive_dict = tag_interface.read_file(self.merged_defs, archive_tags_dir, self.get_archive_path(archive_path, self.biped_path))
+            self.assertEqual(archive_dict["Header"], disk_dict["Header"])
+            self.assertEqual(archive_dict["Data"], disk_dict["Data"])
+
+    def test_read_tag_from_zip(self):
+        archive_tags_dir = os.path.join(self.zip_path, "tags")
+        tag_dict = tag_interface.read_tag("Objects\\Test\\TEST", "bipd", archive_tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG, self.merged_defs)
+        self.assertIsNotNone(tag_dict)
+        self.assertEqual(tag_dict["Data"]["model"]["path"], "objects\\test\\test")
+        self.assertIsNone(tag_interface.read_tag("objects\\test\\missing", "bipd", archive_tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG, self.merged_defs))
+
+    def test_replaced_archive_is_opened_again(self):
+        archive_tags_dir = os.path.join(self.zip_path, "tags")
+        tag_source = tag_archive.get_tag_source(archive_tags_dir)
+        self.assertIs(tag_archive.get_tag_source(archive_tags_dir), tag_source)
+        self.assertFalse(tag_source.isfile(self.get_archive_path(self.zip_path, self.biped_path) + "_copy"))
+
+        new_zip_path = os.path.join(self.temp_dir, "new_tags.zip")
+        with zipfile.ZipFile(new_zip_path, "w") as zip_file:
+            zip_file.write(self.biped_path, "tags/objects/test/test.biped_copy")
+
+        os.replace(new_zip_path, self.zip_path)
+        os.utime(self.zip_path, ns=(0, 0))
+        new_tag_source = tag_archive.get_tag_source(archive_tags_dir)
+        self.assertIsNot(new_tag_source, tag_source)
+        self.assertIsNone(tag_source.zip_file.fp)
+        self.assertTrue(new_tag_source.isfile(self.get_archive_path(self.zip_path, self.biped_path) + "_copy"))
+
+    def test_sources_are_bounded(self):
+        self.assertEqual(tag_archive.get_tag_source(self.tags_dir), self.tags_dir)
+        source_limit = tag_archive.TAG_SOURCE_LIMIT
+        try:
+            tag_archive.TAG_SOURCE_LIMIT = 1
+            zip_source = tag_archive.get_tag_source(os.path.join(self.zip_path, "tags"))
+            tar_source = tag_archive.get_tag_source(os.path.join(self.tar_path, "tags"))
+        finally:
+            tag_archive.TAG_SOURCE_LIMIT = source_limit
+
+        self.assertEqual(list(tag_archive.TAG_SOURCES.values()), [tar_source])
+        self.assertIsNone(zip_source.zip_file.fp)
+
+    def test_generate_tag_dictionary_from_zip(self):
+        asset_store = tag_store.get_asset_store(os.path.join(self.temp_dir, "asset_store.db"))
+        root_tag_ref = tag_fixtures.get_tag_reference("bipd", "objects\\test\\test")
+        asset_cache = tag_interface.generate_tag_dictionary("halo2", root_tag_ref, os.path.join(self.zip_path, "tags"), self.tag_groups, tag_fixtures.H2_ENGINE_TAG,
+                                                            self.merged_defs, asset_store=asset_store)
+        for tag_group in ("bipd", "hlmt"):
+            self.assertEqual([asset_entry["matching_checksum"] for asset_entry in asset_cache[tag_group].values()], [True], tag_group)
+
+        stored_asset = tag_store.load_asset(asset_store, tag_resolver.get_folded_path("objects\\test\\test"), "model")
+        self.assertEqual(stored_asset["TagName"], self.get_archive_path(self.zip_path, self.model_path))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,341 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from concurrent.futures import ProcessPoolExecutor
+
+import tag_fixtures
+
+import tag_batch
+import tag_interface
+
+def get_result_summary(report):
+    return [(result["path"], result["status"], result["size"], result["mismatch offset"]) for result in report["tags"]]
+
+def read_output_files(output_dir):
+    output_files = {}
+    for root, dirs, files in os.walk(output_dir):
+        for file in files:
+            with open(os.path.join(root, file), "rb") as output_file:
+                output_files[os.path.relpath(os.path.join(root, file), output_dir)] = output_file.read()
+
+    return output_files
+
+class BudgetExecutor:
+    # Keeps track of the estimates of tags still running so tests can see the peak.
+    def __init__(self, executor, tag_estimates):
+        self.executor = executor
+        self.tag_estimates = {read_path: estimate for estimate, read_path in tag_estimates}
+        self.running_estimates = {}
+        self.peak_estimate = 0
+        self.lock = threading.Lock()
+
+    def submit(self, function, read_path, *args):
+        future = self.executor.submit(function, read_path, *args)
+        with self.lock:
+            self.running_estimates[future] = self.tag_estimates[read_path]
+            if future.done():
+                self.running_estimates.pop(future)
+
+            self.peak_estimate = max(self.peak_estimate, sum(self.running_estimates.values()))
+
+        future.add_done_callback(self.finish)
+
+        return future
+
+    def finish(self, future):
+        with self.lock:
+            self.running_estimates.pop(future, None)
+
+class BatchRoundTripTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.tags_dirs = {}
+        for engine_tag in (tag_fixtures.H1_ENGINE_TAG, tag_fixtures.H2_ENGINE_TAG):
+            tags_dir = cls.tags_dirs[engine_tag] = os.path.join(cls.temp_dir, engine_tag.strip("!"), "tags")
+            tag_fixtures.write_random_tags(tags_dir, engine_tag)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def get_output_dir(self, engine_tag, name):
+        return os.path.join(self.temp_dir, engine_tag.strip("!"), name)
+
+    def test_workers_match_single_process(self):
+        for engine_tag, tags_dir in self.tags_dirs.items():
+            serial_dir = self.get_output_dir(engine_tag, "serial")
+            parallel_dir = self.get_output_dir(engine_tag, "parallel")
+            serial_report = tag_batch.round_trip_directory(tags_dir, serial_dir, engine_tag=engine_tag, workers=1)
+            parallel_report = tag_batch.round_trip_directory(tags_dir, parallel_dir, engine_tag=engine_tag, workers=2)
+            self.assertEqual(get_result_summary(parallel_report), get_result_summary(serial_report))
+            self.assertEqual(parallel_report["processed"], len(os.listdir(tags_dir)))
+            self.assertEqual(parallel_report["errors"], 0)
+            self.assertEqual(read_output_files(parallel_dir), read_output_files(serial_dir))
+
+    def test_manifest_skips_unchanged_tags(self):
+        engine_tag = tag_fixtures.H2_ENGINE_TAG
+        tags_dir = self.tags_dirs[engine_tag]
+        output_dir = self.get_output_dir(engine_tag, "manifest")
+        manifest_path = os.path.join(self.temp_dir, "manifest.json")
+        first_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=1, manifest_path=manifest_path)
+        self.assertEqual(first_report["processed"], len(first_report["tags"]))
+
+        second_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=1, manifest_path=manifest_path)
+        self.assertEqual(second_report["processed"], 0)
+        self.assertEqual(get_result_summary(second_report), get_result_summary(first_report))
+
+        # A missing output counts as a change even though the source didn't move.
+        os.remove(os.path.join(output_dir, "t.biped"))
+        third_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=1, manifest_path=manifest_path)
+        self.assertEqual(third_report["processed"], 1)
+        self.assertTrue(os.path.isfile(os.path.join(output_dir, "t.biped")))
+
+        generate_checksum = tag_interface.GENERATE_CHECKSUM
+        try:
+            tag_interface.GENERATE_CHECKSUM = not generate_checksum
+            settings_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=1, manifest_path=manifest_path)
+        finally:
+            tag_interface.GENERATE_CHECKSUM = generate_checksum
+
+        self.assertEqual(settings_report["processed"], len(first_report["tags"]))
+
+    def test_pipeline_matches_directory(self):
+        for engine_tag, tags_dir in self.tags_dirs.items():
+            directory_dir = self.get_output_dir(engine_tag, "directory")
+            pipeline_dir = self.get_output_dir(engine_tag, "pipeline")
+            directory_report = tag_batch.round_trip_directory(tags_dir, directory_dir, engine_tag=engine_tag, workers=1)
+            pipeline_report = tag_batch.round_trip_pipeline(tags_dir, pipeline_dir, engine_tag=engine_tag, io_workers=2, max_buffered_bytes=4096)
+            self.assertEqual(get_result_summary(pipeline_report), get_result_summary(directory_report))
+            self.assertEqual(read_output_files(pipeline_dir), read_output_files(directory_dir))
+
+    def test_pipeline_checkpoint_and_timing(self):
+        engine_tag = tag_fixtures.H2_ENGINE_TAG
+        tags_dir = os.path.join(self.temp_dir, "pipeline_tags")
+        tag_fixtures.write_default_tag(tags_dir, "bipd", "good")
+        with open(os.path.join(tags_dir, "bad.vehicle"), "wb") as bad_file:
+            bad_file.write(bytes(16))
+
+        output_dir = os.path.join(self.temp_dir, "pipeline_checkpoint")
+        checkpoint_path = os.path.join(self.temp_dir, "pipeline_checkpoint.jsonl")
+        timing_path = os.path.join(self.temp_dir, "pipeline_timing.jsonl")
+        first_report = tag_batch.round_trip_pipeline(tags_dir, output_dir, engine_tag=engine_tag, checkpoint_path=checkpoint_path, timing_path=timing_path)
+        self.assertEqual([(result["path"], result["status"]) for result in first_report["tags"]], [("bad.vehicle", "parse error"), ("good.biped", "identical")])
+        self.assertEqual(os.listdir(output_dir), ["good.biped"])
+
+        timing_records = tag_batch.read_timing_records(timing_path)
+        self.assertEqual(len(timing_records), 2)
+        self.assertEqual(timing_records[1]["tag group"], "bipd")
+        self.assertEqual(timing_records[1]["bytes in"], timing_records[1]["bytes out"])
+        self.assertIn("bipd", first_report["timing"]["groups"])
+
+        # Finished tags are taken from the checkpoint and only the failed one is tried again.
+        second_report = tag_batch.round_trip_pipeline(tags_dir, output_dir, engine_tag=engine_tag, checkpoint_path=checkpoint_path)
+        self.assertEqual(second_report["processed"], 1)
+        self.assertEqual(get_result_summary(second_report), get_result_summary(first_report))
+
+    def test_checkpoint_resumes(self):
+        engine_tag = tag_fixtures.H2_ENGINE_TAG
+        tags_dir = self.tags_dirs[engine_tag]
+        output_dir = self.get_output_dir(engine_tag, "checkpoint")
+        checkpoint_path = os.path.join(self.temp_dir, "checkpoint.jsonl")
+        full_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=2, checkpoint_path=checkpoint_path)
+
+        # Keep the run line and ten entries and cut the next one off halfway like a killed run would.
+        with open(checkpoint_path, "r", encoding="utf8") as checkpoint_file:
+            checkpoint_lines = checkpoint_file.read().splitlines()
+
+        with open(checkpoint_path, "w", encoding="utf8") as checkpoint_file:
+            checkpoint_file.write("\n".join(checkpoint_lines[:11]) + "\n" + checkpoint_lines[11][:20])
+
+        resumed_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=2, checkpoint_path=checkpoint_path)
+        self.assertEqual(resumed_report["processed"], len(full_report["tags"]) - 10)
+        self.assertEqual(get_result_summary(resumed_report), get_result_summary(full_report))
+
+        finished_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=2, checkpoint_path=checkpoint_path)
+        self.assertEqual(finished_report["processed"], 0)
+
+        # A checkpoint from another run is started over.
+        other_report = tag_batch.round_trip_directory(tags_dir, self.get_output_dir(engine_tag, "checkpoint_other"), engine_tag=engine_tag, workers=1, checkpoint_path=checkpoint_path)
+        self.assertEqual(other_report["processed"], len(full_report["tags"]))
+
+    def test_checkpoint_retries_failed_tags(self):
+        engine_tag = tag_fixtures.H2_ENGINE_TAG
+        tags_dir = os.path.join(self.temp_dir, "retry_tags")
+        broken_path = tag_fixtures.write_default_tag(tags_dir, "bipd", "broken")
+        tag_fixtures.write_default_tag(tags_dir, "vehi", "good")
+        with open(broken_path, "r+b") as broken_file:
+            broken_file.truncate(70)
+
+        output_dir = os.path.join(self.temp_dir, "retry_output")
+        checkpoint_path = os.path.join(self.temp_dir, "retry_checkpoint.jsonl")
+        first_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=1, checkpoint_path=checkpoint_path)
+        self.assertEqual([(result["path"], result["status"]) for result in first_report["tags"]], [("broken.biped", "parse error"), ("good.vehicle", "identical")])
+
+        tag_fixtures.write_default_tag(tags_dir, "bipd", "broken")
+        retry_report = tag_batch.round_trip_directory(tags_dir, output_dir, engine_tag=engine_tag, workers=1, checkpoint_path=checkpoint_path)
+        self.assertEqual(retry_report["processed"], 1)
+        self.assertEqual([(result["path"], result["status"]) for result in retry_report["tags"]], [("broken.biped", "identical"), ("good.vehicle", "identical")])
+
+    def test_timing_report(self):
+        engine_tag = tag_fixtures.H2_ENGINE_TAG
+        tags_dir = self.tags_dirs[engine_tag]
+        timing_path = os.path.join(self.temp_dir, "timing.jsonl")
+        report = tag_batch.round_trip_directory(tags_dir, self.get_output_dir(engine_tag, "timing"), engine_tag=engine_tag, workers=2, timing_path=timing_path, top_count=5)
+        timing_records = tag_batch.read_timing_records(timing_path)
+        self.assertEqual([timing_record["path"] for timing_record in timing_records], [result["path"] for result in report["tags"]])
+        for timing_record, result in zip(timing_records, report["tags"]):
+            self.assertEqual(timing_record["status"], result["status"])
+            self.assertEqual(timing_record["bytes in"], result["size"])
+            self.assertGreater(timing_record["tag dict size"], 0)
+            self.assertAlmostEqual(timing_record["total"], sum(timing_record[timing_key] for timing_key in ("read", "postprocess", "upgrade", "write", "checksum")))
+
+        timing_summary = report["timing"]
+        self.assertEqual(sum(group_summary["tags"] for group_summary in timing_summary["groups"].values()), len(timing_records))
+        self.assertEqual(len(timing_summary["slowest"]), 5)
+        slowest_totals = [slow_tag["total"] for slow_tag in timing_summary["slowest"]]
+        self.assertEqual(slowest_totals, sorted(slowest_totals, reverse=True))
+        self.assertEqual(slowest_totals[0], max(timing_record["total"] for timing_record in timing_records))
+
+    def test_timing_percentiles(self):
+        tag_times = [float(tag_time) for tag_time in range(1, 101)]
+        self.assertEqual(tag_batch.get_percentile(tag_times, 50), 51.0)
+        self.assertEqual(tag_batch.get_percentile(tag_times, 99), 100.0)
+        self.assertEqual(tag_batch.get_percentile([2.0], 90), 2.0)
+
+    def test_memory_budget(self):
+        engine_tag = tag_fixtures.H2_ENGINE_TAG
+        tags_dir = self.tags_dirs[engine_tag]
+        memory_model = {"overhead": 0, "margin": 1.0, "default ratio": 1.0, "ratios": {}}
+        tag_estimates = sorted(((os.path.getsize(os.path.join(tags_dir, file)), os.path.join(tags_dir, file)) for file in os.listdir(tags_dir)), reverse=True)
+        memory_budget = tag_estimates[len(tag_estimates) // 2][0] * 3
+
+        results = []
+        isolated_paths = []
+        tag_batch.WORKER_STATE["merged defs"] = tag_fixtures.get_merged_defs(engine_tag)
+        tag_batch.WORKER_STATE["engine tag"] = engine_tag
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            budget_executor = BudgetExecutor(executor, tag_estimates)
+            fitting_estimates = [tag_estimate for tag_estimate in tag_estimates if tag_estimate[0] <= memory_budget]
+            tag_batch.round_trip_budgeted(budget_executor, fitting_estimates, memory_budget, 4, (tags_dir, self.get_output_dir(engine_tag, "budgeted"), engine_tag, False, False),
+                                          results.append, isolated_paths)
+
+        self.assertEqual(len(results), len(fitting_estimates))
+        self.assertEqual(isolated_paths, [])
+        self.assertLessEqual(budget_executor.peak_estimate, memory_budget)
+        self.assertGreater(budget_executor.peak_estimate, tag_estimates[-1][0])
+
+        # Tags over the whole budget skip the pool and still come out the same.
+        serial_report = tag_batch.round_trip_directory(tags_dir, self.get_output_dir(engine_tag, "budget_serial"), engine_tag=engine_tag, workers=1)
+        budget_report = tag_batch.round_trip_directory(tags_dir, self.get_output_dir(engine_tag, "budget"), engine_tag=engine_tag, workers=2, memory_budget=memory_budget, memory_model=memory_model)
+        self.assertLess(len(fitting_estimates), len(tag_estimates))
+        self.assertEqual(get_result_summary(budget_report), get_result_summary(serial_report))
+
+        isolated_paths = []
+        round_trip_isolated_tag = tag_batch.round_trip_isolated_tag
+        def record_isolated_tag(read_path, *args):
+            isolated_paths.append(read_path)
+            return round_trip_isolated_tag(read_path, *args)
+
+        try:
+            tag_batch.round_trip_isolated_tag = record_isolated_tag
+            budget_report = tag_batch.round_trip_directory(tags_dir, self.get_output_dir(engine_tag, "budget_single"), engine_tag=engine_tag, workers=1, memory_budget=memory_budget, memory_model=memory_model)
+        finally:
+            tag_batch.round_trip_isolated_tag = round_trip_isolated_tag
+
+        self.assertEqual(sorted(isolated_paths), sorted(read_path for estimate, read_path in tag_estimates if estimate > memory_budget))
+        self.assertEqual(get_result_summary(budget_report), get_result_summary(serial_report))
+
+    def test_calibrate_memory_model(self):
+        timing_records = [{"tag group": "bipd", "bytes in": 100, "tag dict size": 1000},
+                          {"tag group": "bipd", "bytes in": 300, "tag dict size": 1000},
+                          {"tag group": "vehi", "bytes in": 0, "tag dict size": 1000}]
+        memory_model = tag_batch.calibrate_memory_model(timing_records)
+        self.assertEqual(memory_model["ratios"]["bipd"], 5.0)
+        self.assertNotIn("vehi", memory_model["ratios"])
+        self.assertNotIn("bipd", tag_batch.DEFAULT_MEMORY_MODEL["ratios"])
+        self.assertEqual(tag_batch.estimate_tag_memory(memory_model, "bipd", 1000), memory_model["overhead"] + 7500)
+        self.assertEqual(tag_batch.estimate_tag_memory(memory_model, "bitm", 1000), memory_model["overhead"] + 6000)
+
+class IterTagsTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.tags_dir = os.path.join(cls.temp_dir, "tags")
+        for tag_path, bounding_radius in (("objects\\small", 0.5), ("objects\\large", 4.0)):
+            tag_fixtures.write_default_tag(cls.tags_dir, "bipd", tag_path, bounding_radius=bounding_radius)
+
+        tag_fixtures.write_default_tag(cls.tags_dir, "vehi", "objects\\vehicle")
+        cls.broken_path = tag_fixtures.write_default_tag(cls.temp_dir, "bipd", "broken\\broken")
+        with open(cls.broken_path, "r+b") as broken_file:
+            broken_file.truncate(70)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def get_tag_names(self, tag_items):
+        return sorted(os.path.basename(read_path) for read_path, tag_header, tag in tag_items)
+
+    def test_groups_and_projection(self):
+        tag_items = list(tag_batch.iter_tags(self.tags_dir, groups=["bipd"], projection=[("bounding radius",)]))
+        self.assertEqual(self.get_tag_names(tag_items), ["large.biped", "small.biped"])
+        for read_path, tag_header, tag in tag_items:
+            self.assertEqual(tag_header["tag group"], "bipd")
+            tag_dict = tag_interface.read_file(tag_fixtures.get_merged_defs(), self.tags_dir, read_path)
+            self.assertEqual(tag[("bounding radius",)], tag_dict["Data"]["bounding radius"])
+
+    def test_lazy_and_stages(self):
+        tag_items = tag_batch.iter_tags(self.tags_dir, lazy=True, header_filter=lambda read_path, tag_header: tag_header["tag group"] == "bipd")
+        tag_items = tag_batch.map_tags(tag_items, lambda read_path, tag_header, tag_view: tag_view.read()["Data"]["bounding radius"])
+        tag_items = tag_batch.filter_tags(tag_items, lambda read_path, tag_header, bounding_radius: bounding_radius > 1.0)
+        self.assertEqual([(os.path.basename(read_path), bounding_radius) for read_path, tag_header, bounding_radius in tag_items], [("large.biped", 4.0)])
+
+    def test_workers_keep_order(self):
+        serial_items = list(tag_batch.iter_tags(self.tags_dir, order="size"))
+        parallel_items = list(tag_batch.iter_tags(self.tags_dir, order="size", workers=2, read_ahead=1))
+        self.assertEqual([read_path for read_path, tag_header, tag in parallel_items], [read_path for read_path, tag_header, tag in serial_items])
+        self.assertEqual([tag for read_path, tag_header, tag in parallel_items], [tag for read_path, tag_header, tag in serial_items])
+
+    def test_skip_errors(self):
+        broken_dir = os.path.dirname(self.broken_path)
+        with self.assertRaises(Exception):
+            list(tag_batch.iter_tags(broken_dir))
+
+        self.assertEqual(list(tag_batch.iter_tags(broken_dir, skip_errors=True)), [])
+        self.assertEqual(list(tag_batch.iter_tags(broken_dir, workers=2, skip_errors=True)), [])
+        with self.assertRaises(ValueError):
+            list(tag_batch.iter_tags(self.tags_dir, order="name"))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_batch
+import tag_cache
+import tag_graph
+import tag_interface
+
+class ReadonlyTagCacheTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.merged_defs = tag_fixtures.get_merged_defs()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "objects\\test\\test")
+        tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\test\\test", model=tag_fixtures.get_tag_reference("hlmt", "objects\\test\\test"))
+
+        tag_batch.WORKER_STATE["merged defs"] = self.merged_defs
+        tag_batch.WORKER_STATE["engine tag"] = tag_fixtures.H2_ENGINE_TAG
+        tag_cache.enable_tag_cache(64 * 1024 * 1024, view="readonly")
+
+    def tearDown(self):
+        tag_cache.disable_tag_cache()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_round_trip(self):
+        tag_paths, invalid_paths = tag_batch.collect_tag_paths(self.tags_dir, tag_fixtures.H2_ENGINE_TAG)
+        output_dir = os.path.join(self.temp_dir, "output")
+        # Second pass is served from the cache.
+        for _ in range(2):
+            results = [tag_batch.round_trip_tag(read_path, self.tags_dir, output_dir, tag_fixtures.H2_ENGINE_TAG) for read_path in tag_paths]
+            self.assertEqual([result["status"] for result in results], ["identical"] * len(tag_paths), [result["log"] for result in results])
+
+        self.assertGreater(tag_cache.get_tag_cache_stats()["hits"], 0)
+
+    def test_graph_load(self):
+        root_tag_ref = tag_fixtures.get_tag_reference("bipd", "objects\\test\\test")
+        for _ in range(2):
+            graph = tag_graph.load_tag_graph("halo2", root_tag_ref, self.tags_dir, tag_fixtures.H2_ENGINE_TAG, self.merged_defs, workers=1)
+            self.assertEqual([node.error for node in graph if node.error], [])
+            self.assertEqual(sorted(node.tag_group for node in graph if not node.missing), ["bipd", "hlmt"])
+
+        cached_tag = tag_interface.read_file(self.merged_defs, self.tags_dir, os.path.join(self.tags_dir, "objects", "test", "test.biped"), tag_fixtures.H2_ENGINE_TAG)
+        self.assertIsInstance(cached_tag, tag_cache.MappingProxyType)
+
+class ContentKeyTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.merged_defs = tag_fixtures.get_merged_defs()
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\unique", model=tag_fixtures.get_tag_reference("hlmt", "objects\\test\\test"))
+        for tag_name in ("copy_a", "copy_b", "copy_c"):
+            tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\%s" % tag_name)
+
+        tag_cache.enable_tag_cache(64 * 1024 * 1024, view="readonly")
+
+    def tearDown(self):
+        tag_cache.disable_tag_cache()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_tag_path(self, tag_name):
+        return os.path.join(self.tags_dir, "objects", "%s.biped" % tag_name)
+
+    def test_copies_share_one_entry(self):
+        tag_names = ("copy_a", "copy_b", "copy_c")
+        for tag_name in tag_names:
+            tag_dict = tag_interface.read_file(self.merged_defs, self.tags_dir, self.get_tag_path(tag_name), tag_fixtures.H2_ENGINE_TAG)
+            self.assertEqual(tag_dict["TagName"], self.get_tag_path(tag_name))
+
+        tag_stats = tag_cache.get_tag_cache_stats()
+        self.assertEqual(tag_stats["misses"], 1)
+        self.assertEqual(tag_stats["shared"], len(tag_names) - 1)
+        self.assertEqual(tag_stats["contents"], 1)
+        self.assertEqual(tag_stats["entries"], len(tag_names))
+
+    def test_copies_count_against_the_budget_once(self):
+        tag_interface.read_file(self.merged_defs, self.tags_dir, self.get_tag_path("copy_a"), tag_fixtures.H2_ENGINE_TAG)
+        entry_size = tag_cache.get_tag_cache_stats()["size"]
+        for tag_name in ("copy_b", "copy_c"):
+            tag_interface.read_file(self.merged_defs, self.tags_dir, self.get_tag_path(tag_name), tag_fixtures.H2_ENGINE_TAG)
+
+        self.assertEqual(tag_cache.get_tag_cache_stats()["size"], entry_size)
+
+    def test_tag_directory_is_part_of_the_key(self):
+        tag_path = self.get_tag_path("unique")
+        tag_interface.read_file(self.merged_defs, self.tags_dir, tag_path, tag_fixtures.H2_ENGINE_TAG)
+        tag_interface.read_file(self.merged_defs, os.path.join(self.tags_dir, "objects"), tag_path, tag_fixtures.H2_ENGINE_TAG)
+        tag_interface.read_file(self.merged_defs, self.tags_dir, tag_path, tag_fixtures.H2_ENGINE_TAG)
+
+        tag_stats = tag_cache.get_tag_cache_stats()
+        self.assertEqual(tag_stats["misses"], 2)
+        self.assertEqual(tag_stats["hits"], 1)
+        self.assertEqual(len(tag_cache.TAG_CACHE), 2)
+
+if __name__ == "__main__":
+    unittest.main()
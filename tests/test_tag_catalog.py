@@ -0,0 +1,164 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_catalog
+
+class TagCatalogTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        self.catalog_path = os.path.join(self.temp_dir, "catalog.db")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_catalog_paths(self, rows):
+        return [row["path"] for row in rows]
+
+    def test_update_catalog(self):
+        tag_files = tag_fixtures.write_random_tags(self.tags_dir)
+        update_counts = tag_catalog.update_catalog(self.catalog_path, self.tags_dir)
+        self.assertEqual(update_counts, {"added": len(tag_files), "updated": 0, "removed": 0, "unchanged": 0})
+
+        update_counts = tag_catalog.update_catalog(self.catalog_path, self.tags_dir)
+        self.assertEqual(update_counts, {"added": 0, "updated": 0, "removed": 0, "unchanged": len(tag_files)})
+
+        tag_fixtures.write_default_tag(self.tags_dir, "bipd", "t", bounding_radius=2.0)
+        os.remove(os.path.join(self.tags_dir, "t.vehicle"))
+        update_counts = tag_catalog.update_catalog(self.catalog_path, self.tags_dir)
+        self.assertEqual(update_counts, {"added": 0, "updated": 1, "removed": 1, "unchanged": len(tag_files) - 2})
+
+        connection = tag_catalog.open_catalog(self.catalog_path)
+        try:
+            biped_rows = tag_catalog.find_tags(connection, tag_group="bipd")
+            self.assertEqual(self.get_catalog_paths(biped_rows), ["t.biped"])
+            self.assertEqual(biped_rows[0]["tag_key"], "t")
+            self.assertEqual(biped_rows[0]["valid"], 1)
+            self.assertEqual(self.get_catalog_paths(tag_catalog.find_tags(connection, tag_group="vehi")), [])
+            self.assertEqual(len(tag_catalog.find_tags(connection, engine_tag=tag_fixtures.H2_ENGINE_TAG)), len(tag_files) - 1)
+
+        finally:
+            connection.close()
+
+class CatalogDependencyTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        self.catalog_path = os.path.join(self.temp_dir, "catalog.db")
+        tag_fixtures.write_tag_graph(self.tags_dir)
+        tag_catalog.update_catalog(self.catalog_path, self.tags_dir, references=True, merged_defs=tag_fixtures.get_merged_defs())
+        self.connection = tag_catalog.open_catalog(self.catalog_path)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_catalog_path(self, tag_path):
+        return os.path.join(*tag_path.split("/"))
+
+    def test_dependency_queries(self):
+        biped_path = self.get_catalog_path("objects/test/test.biped")
+        shader_path = self.get_catalog_path("objects/test/skin.shader")
+        template_path = self.get_catalog_path("shaders/test.shader_template")
+        model_path = self.get_catalog_path("objects/test/test.model")
+        render_model_path = self.get_catalog_path("objects/test/test.render_model")
+        effect_path = self.get_catalog_path("effects/test/spawn.effect")
+        self.assertEqual(tag_catalog.get_dependencies(self.connection, biped_path), sorted([model_path, shader_path, effect_path]))
+        self.assertEqual(tag_catalog.get_dependencies(self.connection, biped_path, transitive=True), sorted([model_path, shader_path, effect_path, render_model_path, template_path]))
+        self.assertEqual(tag_catalog.get_dependents(self.connection, shader_path), sorted([biped_path, model_path, template_path]))
+        # The shader and its template reference each other, the closure still ends.
+        self.assertEqual(tag_catalog.get_dependents(self.connection, template_path, transitive=True), sorted([biped_path, model_path, shader_path]))
+        self.assertEqual(tag_catalog.get_orphans(self.connection), [biped_path])
+        self.assertEqual([(row["path"], row["reference_group"], row["reference_path"]) for row in tag_catalog.get_missing_references(self.connection)],
+                         [(model_path, "coll", "objects\\test\\missing")])
+        self.assertEqual([row["path"] for row in tag_catalog.find_referencing_tags(self.connection, "OBJECTS/test/skin", "shad")], sorted([biped_path, model_path, template_path]))
+
+    def test_references_without_group(self):
+        self.connection.close()
+        tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\test\\no_group", model=tag_fixtures.get_tag_reference("", "objects\\test\\skin"),
+                                       **{"modifier shader": tag_fixtures.get_tag_reference(None, "objects\\test\\nothing")})
+        tag_catalog.update_catalog(self.catalog_path, self.tags_dir, references=True, merged_defs=tag_fixtures.get_merged_defs())
+        self.connection = tag_catalog.open_catalog(self.catalog_path)
+        no_group_path = self.get_catalog_path("objects/test/no_group.biped")
+        reference_rows = self.connection.execute("SELECT reference_group, reference_path FROM tag_references WHERE path = ? ORDER BY reference_path", (no_group_path,)).fetchall()
+        self.assertEqual([tuple(row) for row in reference_rows], [(None, "objects\\test\\nothing"), (None, "objects\\test\\skin")])
+        self.assertEqual(tag_catalog.get_dependencies(self.connection, no_group_path), [self.get_catalog_path("objects/test/skin.shader")])
+        self.assertIn(no_group_path, tag_catalog.get_dependents(self.connection, self.get_catalog_path("objects/test/skin.shader")))
+        self.assertEqual([row["reference_path"] for row in tag_catalog.get_missing_references(self.connection, no_group_path)], ["objects\\test\\nothing"])
+
+        # Rows from before groups were normalized can hold an empty string.
+        with self.connection:
+            self.connection.execute("UPDATE tag_references SET reference_group = '' WHERE path = ?", (no_group_path,))
+
+        self.assertEqual(tag_catalog.get_dependencies(self.connection, no_group_path), [self.get_catalog_path("objects/test/skin.shader")])
+        self.assertEqual([row["reference_path"] for row in tag_catalog.get_missing_references(self.connection, no_group_path)], ["objects\\test\\nothing"])
+
+    def test_changed_tag_drops_stale_references(self):
+        biped_path = self.get_catalog_path("objects/test/test.biped")
+        tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\test\\test")
+        tag_catalog.update_catalog(self.catalog_path, self.tags_dir)
+        self.assertEqual(tag_catalog.get_dependencies(self.connection, biped_path), [])
+        self.assertEqual(self.connection.execute("SELECT references_scanned FROM tags WHERE path = ?", (biped_path,)).fetchone()[0], 0)
+
+        tag_catalog.update_catalog(self.catalog_path, self.tags_dir, references=True, merged_defs=tag_fixtures.get_merged_defs())
+        self.assertEqual(tag_catalog.get_dependencies(self.connection, biped_path), [])
+        self.assertEqual(self.connection.execute("SELECT references_scanned FROM tags WHERE path = ?", (biped_path,)).fetchone()[0], 1)
+
+    def test_catalog_is_writable_during_scan(self):
+        tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\test\\test", bounding_radius=2.0)
+        scanned_paths = []
+        read_tag_references = tag_catalog.read_tag_references
+        def write_during_scan(merged_defs, read_path):
+            # Fails with "database is locked" if the update holds the write lock while it scans.
+            connection = sqlite3.connect(self.catalog_path, timeout=0)
+            try:
+                with connection:
+                    connection.execute("INSERT OR REPLACE INTO catalog_info (key, value) VALUES ('scan', ?)", (read_path,))
+            finally:
+                connection.close()
+
+            scanned_paths.append(read_path)
+            return read_tag_references(merged_defs, read_path)
+
+        try:
+            tag_catalog.read_tag_references = write_during_scan
+            tag_catalog.update_catalog(self.catalog_path, self.tags_dir, references=True, merged_defs=tag_fixtures.get_merged_defs())
+        finally:
+            tag_catalog.read_tag_references = read_tag_references
+
+        self.assertEqual(len(scanned_paths), 1)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_defaults
+import tag_interface
+
+class DefaultTagTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        tag_defaults.clear_default_tag_images()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+        tag_defaults.clear_default_tag_images()
+
+    def test_default_image_is_read_only(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        default_image = tag_defaults.get_default_tag_image(merged_defs, "bipd")
+        with self.assertRaises(TypeError):
+            default_image["bytes"] = b""
+        with self.assertRaises(TypeError):
+            default_image["tag dict"]["Data"]["bounding radius"] = 1.0
+
+        tag_dict = tag_defaults.get_default_tag_dict(merged_defs, "bipd")
+        tag_dict["Data"]["bounding radius"] = 1.0
+        self.assertNotEqual(tag_defaults.get_default_tag_dict(merged_defs, "bipd")["Data"]["bounding radius"], 1.0)
+
+    def test_default_tag_matches_read_file(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        file_path = os.path.join(self.temp_dir, "default.biped")
+        tag_defaults.create_default_tag(merged_defs, "bipd", file_path)
+        tag_dict = tag_interface.read_file(merged_defs, self.temp_dir, file_path)
+        default_dict = tag_defaults.get_default_tag_dict(merged_defs, "bipd")
+        self.assertEqual(tag_dict["Header"], default_dict["Header"])
+        self.assertEqual(tag_dict["Data"], default_dict["Data"])
+
+    def test_failed_write_keeps_the_old_tag(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        file_path = os.path.join(self.temp_dir, "default.biped")
+        with open(file_path, "wb") as output_stream:
+            output_stream.write(b"old tag")
+
+        commit_temp_stream = tag_interface.commit_temp_stream
+        def fail_commit(output_stream, temp_path, file_path, fsync=False):
+            raise OSError("disk full")
+
+        try:
+            tag_interface.commit_temp_stream = fail_commit
+            with self.assertRaises(OSError):
+                tag_defaults.create_default_tag(merged_defs, "bipd", file_path)
+        finally:
+            tag_interface.commit_temp_stream = commit_temp_stream
+
+        with open(file_path, "rb") as input_stream:
+            self.assertEqual(input_stream.read(), b"old tag")
+
+        self.assertEqual(os.listdir(self.temp_dir), ["default.biped"])
+
+    def test_image_follows_write_options(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        generate_checksum = tag_interface.GENERATE_CHECKSUM
+        try:
+            tag_interface.GENERATE_CHECKSUM = False
+            unchecked_image = tag_defaults.get_default_tag_image(merged_defs, "bipd")
+            tag_interface.GENERATE_CHECKSUM = True
+            checked_image = tag_defaults.get_default_tag_image(merged_defs, "bipd")
+        finally:
+            tag_interface.GENERATE_CHECKSUM = generate_checksum
+
+        self.assertIsNot(unchecked_image, checked_image)
+        self.assertEqual(len(tag_defaults.DEFAULT_TAG_IMAGES), 2)
+
+    def test_image_cache_is_bounded(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        image_limit = tag_defaults.DEFAULT_TAG_IMAGE_LIMIT
+        try:
+            tag_defaults.DEFAULT_TAG_IMAGE_LIMIT = 2
+            for tag_group in ("bipd", "vehi", "weap"):
+                tag_defaults.get_default_tag_image(merged_defs, tag_group)
+        finally:
+            tag_defaults.DEFAULT_TAG_IMAGE_LIMIT = image_limit
+
+        self.assertEqual([image_key[1] for image_key in tag_defaults.DEFAULT_TAG_IMAGES], ["vehi", "weap"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,207 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_archive
+import tag_batch
+import tag_graph
+import tag_interface
+import tag_resolver
+import tag_store
+
+def get_graph_summary(graph):
+    return {node.key: (node.depth, node.missing, node.error, sorted(edge.target for edge in node.references)) for node in graph}
+
+def get_out_of_order_keys(node_keys, graph, cycle_keys):
+    # Returns the nodes that came out before something they reference, tags in the same loop can't be ordered.
+    seen_keys = set()
+    out_of_order_keys = []
+    for node_key in node_keys:
+        for edge in graph.nodes[node_key].references:
+            if edge.target not in seen_keys and not (node_key in cycle_keys and edge.target in cycle_keys):
+                out_of_order_keys.append(node_key)
+
+        seen_keys.add(node_key)
+
+    return out_of_order_keys
+
+class TagGraphTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        self.root_tag_ref = tag_fixtures.write_tag_graph(self.tags_dir)
+        self.merged_defs = tag_fixtures.get_merged_defs()
+        self.tag_groups, self.tag_extensions = tag_interface.get_tag_extensions(tag_fixtures.H2_ENGINE_TAG)
+        self.asset_store = tag_store.get_asset_store(os.path.join(self.temp_dir, "asset_store.db"))
+
+    def tearDown(self):
+        tag_store.close_asset_stores()
+        tag_resolver.clear_path_indexes()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def load_graph(self, workers=1, **graph_options):
+        return tag_graph.load_tag_graph("halo2", self.root_tag_ref, self.tags_dir, tag_fixtures.H2_ENGINE_TAG, self.merged_defs, workers=workers, **graph_options)
+
+    def generate_tag_dictionary(self, root_tag_ref, **dictionary_options):
+        return tag_interface.generate_tag_dictionary("halo2", root_tag_ref, self.tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG, self.merged_defs,
+                                                     asset_store=self.asset_store, **dictionary_options)
+
+    def test_load_tag_graph(self):
+        graph = self.load_graph()
+        self.assertEqual(get_graph_summary(graph), {("bipd", "objects/test/test"): (0, False, None, [("hlmt", "objects/test/test"), ("shad", "objects/test/skin")]),
+                                                    ("hlmt", "objects/test/test"): (1, False, None, [("coll", "objects/test/missing"), ("mode", "objects/test/test"), ("shad", "objects/test/skin")]),
+                                                    ("shad", "objects/test/skin"): (1, False, None, [("stem", "shaders/test")]),
+                                                    ("mode", "objects/test/test"): (2, False, None, []),
+                                                    ("coll", "objects/test/missing"): (2, True, None, []),
+                                                    ("stem", "shaders/test"): (2, False, None, [("shad", "objects/test/skin")])})
+        self.assertEqual(graph.root, ("bipd", "objects/test/test"))
+        self.assertEqual(sorted(node.key for node in graph.dependents("shad", "objects\\test\\skin")), [("bipd", "objects/test/test"), ("hlmt", "objects/test/test"), ("stem", "shaders/test")])
+        self.assertEqual(graph.get_node("mode", "objects\\test\\test").asset["Header"]["tag group"], "mode")
+
+    def test_pool_matches_single_process(self):
+        self.assertEqual(get_graph_summary(self.load_graph(workers=2)), get_graph_summary(self.load_graph()))
+
+    def test_reference_scan_matches_full_load(self):
+        scanned_graph = self.load_graph(references_only=True)
+        self.assertEqual(get_graph_summary(scanned_graph), get_graph_summary(self.load_graph()))
+        self.assertEqual([node.asset for node in scanned_graph], [None] * len(scanned_graph))
+        for tag_group, tag_path, tag_references in tag_fixtures.TAG_GRAPH:
+            loaded_tag = tag_graph.load_graph_tag(tag_group, tag_path, self.tags_dir, "halo2", tag_fixtures.H2_ENGINE_TAG, False)
+            scanned_tag = tag_graph.scan_graph_tag(tag_group, tag_path, self.tags_dir, "halo2", tag_fixtures.H2_ENGINE_TAG, False)
+            self.assertEqual(scanned_tag[0], loaded_tag[0])
+            self.assertEqual(sorted(scanned_tag[2]), sorted(loaded_tag[2]), tag_path)
+
+        self.assertEqual(tag_graph.scan_graph_tag("bipd", "objects\\test\\missing", self.tags_dir, "halo2", tag_fixtures.H2_ENGINE_TAG, False), (False, None, [], None))
+
+    def test_batch_worker_state_is_left_alone(self):
+        worker_state = dict(tag_batch.WORKER_STATE)
+        for workers in (1, 2):
+            self.load_graph(workers=workers)
+            self.assertEqual(tag_batch.WORKER_STATE, worker_state)
+
+    def iter_graph(self, workers=1, graph=None):
+        return tag_graph.iter_tag_graph("halo2", self.root_tag_ref, self.tags_dir, tag_fixtures.H2_ENGINE_TAG, self.merged_defs, workers=workers, graph=graph)
+
+    def test_iter_tag_graph_order(self):
+        cycle_keys = {("shad", "objects/test/skin"), ("stem", "shaders/test")}
+        for workers in (1, 2):
+            graph = tag_graph.TagGraph()
+            node_keys = [node.key for node in self.iter_graph(workers, graph)]
+            self.assertEqual(sorted(node_keys), sorted(graph.nodes))
+            self.assertEqual(get_out_of_order_keys(node_keys, graph, cycle_keys), [])
+            # The loop comes out after everything outside it that's ready, the model and biped need it so they follow.
+            self.assertEqual(set(node_keys[:2]), {("mode", "objects/test/test"), ("coll", "objects/test/missing")})
+            self.assertEqual(set(node_keys[2:4]), cycle_keys)
+            self.assertEqual(node_keys[4:], [("hlmt", "objects/test/test"), ("bipd", "objects/test/test")])
+
+    def test_iter_tag_graph_is_lazy(self):
+        graph = tag_graph.TagGraph()
+        node_iter = self.iter_graph(graph=graph)
+        first_node = next(node_iter)
+        self.assertEqual(first_node.key, ("mode", "objects/test/test"))
+        self.assertIsNotNone(first_node.asset)
+        self.assertTrue([node for node in graph if node.asset is None and not node.missing])
+        node_iter.close()
+
+    def test_cycle_order(self):
+        graph = self.load_graph()
+        node_keys = tag_graph.get_cycle_order(graph, graph.nodes)
+        cycle_keys = {("shad", "objects/test/skin"), ("stem", "shaders/test")}
+        self.assertEqual(sorted(node_keys), sorted(graph.nodes))
+        self.assertEqual(get_out_of_order_keys(node_keys, graph, cycle_keys), [])
+        cycle_indices = sorted(node_keys.index(node_key) for node_key in cycle_keys)
+        self.assertEqual(cycle_indices[1] - cycle_indices[0], 1)
+        # Keys outside node_keys are left out and edges to them are ignored.
+        self.assertEqual(tag_graph.get_cycle_order(graph, [("hlmt", "objects/test/test"), ("mode", "objects/test/test")]), [("mode", "objects/test/test"), ("hlmt", "objects/test/test")])
+
+    def test_generate_tag_dictionary_matches_graph(self):
+        graph = self.load_graph()
+        asset_cache = self.generate_tag_dictionary(self.root_tag_ref)
+        loaded_keys = set((tag_group, tag_resolver.get_folded_path(tag_path)) for tag_group, group_assets in asset_cache.items()
+                          for tag_path, asset_entry in group_assets.items() if asset_entry["matching_checksum"])
+        self.assertEqual(loaded_keys, set(node.key for node in graph if not node.missing))
+
+    def test_generate_tag_dictionary_on_pool(self):
+        pool_store = tag_store.get_asset_store(os.path.join(self.temp_dir, "pool_asset_store.db"))
+        pool_cache = tag_interface.generate_tag_dictionary("halo2", self.root_tag_ref, self.tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG, self.merged_defs,
+                                                           asset_store=pool_store, workers=2)
+        asset_cache = self.generate_tag_dictionary(self.root_tag_ref)
+        self.assertEqual(pool_cache, asset_cache)
+        for node in self.load_graph():
+            if not node.missing:
+                tag_extension = self.tag_groups[node.tag_group]
+                self.assertEqual(tag_store.load_asset(pool_store, node.key[1], tag_extension), tag_store.load_asset(self.asset_store, node.key[1], tag_extension))
+
+    def test_pool_assets_are_not_read_again(self):
+        for node in self.load_graph(workers=2):
+            if not node.missing:
+                with open(tag_interface.get_tag_file_path(self.tags_dir, node.tag_path, self.tag_groups[node.tag_group]), "rb") as tag_stream:
+                    self.assertEqual(node.content_key, tag_interface.get_content_key(tag_stream.read()))
+
+        read_sizes = []
+        open_tag_file = tag_archive.open_tag_file
+        def record_open_tag_file(tag_source, file_path, size=-1):
+            read_sizes.append(size)
+            return open_tag_file(tag_source, file_path, size)
+
+        try:
+            tag_archive.open_tag_file = record_open_tag_file
+            tag_interface.generate_tag_dictionary("halo2", self.root_tag_ref, self.tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG, self.merged_defs,
+                                                  asset_store=self.asset_store, workers=2)
+        finally:
+            tag_archive.open_tag_file = open_tag_file
+
+        # Only headers are read in this process, the workers read the tags themselves.
+        self.assertTrue(read_sizes)
+        self.assertEqual(set(read_sizes), {64})
+
+    def test_deep_reference_chain(self):
+        # More tags in a row than the recursion limit allows frames.
+        chain_length = 150
+        for tag_idx in range(chain_length):
+            tag_group, reference_group = ("shad", "stem") if tag_idx % 2 == 0 else ("stem", "shad")
+            field_key = "template" if tag_group == "shad" else "aux-1 shader"
+            tag_fixtures.write_default_tag(self.tags_dir, tag_group, "chain\\%d" % tag_idx, **{field_key: tag_fixtures.get_tag_reference(reference_group, "chain\\%d" % (tag_idx + 1))})
+
+        recursion_limit = sys.getrecursionlimit()
+        try:
+            sys.setrecursionlimit(120)
+            asset_cache = self.generate_tag_dictionary(tag_fixtures.get_tag_reference("shad", "chain\\0"))
+        finally:
+            sys.setrecursionlimit(recursion_limit)
+
+        self.assertEqual(sum(1 for group_assets in asset_cache.values() for asset_entry in group_assets.values() if asset_entry["matching_checksum"]), chain_length)
+
+if __name__ == "__main__":
+    unittest.main()
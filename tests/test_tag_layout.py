@@ -0,0 +1,164 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import io
+import os
+import copy
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_interface
+import tag_layout
+import tag_patching
+
+# tag_layout and tag_patching walk the on disk layout on their own instead of going through get_fields. These make
+# sure the two keep agreeing with a full read and a full write for every group.
+
+PATCH_VALUES = {"Real": 7.5, "RealFraction": 0.5, "ShortInteger": 42, "LongInteger": 4242, "LongFlags": 5, "WordFlags": 3, "Angle": 45.0,
+                "RealBounds": {"Min": 3.0, "Max": 4.0}, "ShortEnum": {"type": "ShortEnum", "value": 2, "value name": ""}}
+
+SKIPPED_FIELDS = ("Block", "Data", "TagReference", "StringId", "OldStringId", "Pad", "Skip", "UselessPad", "VertexBuffer")
+
+def get_tag_references(tag_block_fields, field_path, tag_references):
+    for field_key, field_value in tag_block_fields.items():
+        if isinstance(field_value, dict) and "group name" in field_value and "path" in field_value:
+            if len(field_value["path"]) > 0:
+                tag_references.append((field_value["group name"], field_value["path"], field_path + (field_key,)))
+
+        elif isinstance(field_value, list):
+            for element_idx, tag_block_element in enumerate(field_value):
+                if isinstance(tag_block_element, dict):
+                    get_tag_references(tag_block_element, field_path + (field_key, element_idx), tag_references)
+
+    return tag_references
+
+def write_tag_bytes(engine_tag, tag_dict, file_path):
+    # write_file encodes the header in place.
+    tag_dict = copy.deepcopy(tag_dict)
+    output_stream = io.BytesIO()
+    tag_interface.write_file(tag_fixtures.get_merged_defs(engine_tag), tag_dict, tag_interface.obfuscation_buffer_prepare(), file_path, engine_tag=engine_tag, output_stream=output_stream)
+
+    return output_stream.getvalue()
+
+class TagLayoutTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.tag_files = []
+        for engine_tag in (tag_fixtures.H1_ENGINE_TAG, tag_fixtures.H2_ENGINE_TAG):
+            tags_dir = os.path.join(cls.temp_dir, engine_tag.strip("!"))
+            cls.tag_files.extend((engine_tag, file_path) for file_path in tag_fixtures.write_random_tags(tags_dir, engine_tag))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def test_layout_matches_read_file(self):
+        field_count = 0
+        for engine_tag, file_path in self.tag_files:
+            merged_defs = tag_fixtures.get_merged_defs(engine_tag)
+            tag_dict = tag_fixtures.read_layout_tag(file_path, engine_tag)
+            with open(file_path, "rb") as tag_stream:
+                tag_bytes = tag_stream.read()
+                tag_stream.seek(0)
+                layout_records = list(tag_layout.iterate_tag_layout(merged_defs, tag_stream))
+
+            file_endian = tag_layout.get_file_endian(tag_dict["Header"]["engine tag"])
+            for field_path, field_node, offset, field_bytes, tail_offset in layout_records:
+                self.assertEqual(tag_bytes[offset:offset + len(field_bytes)], field_bytes, (file_path, field_path))
+                if field_node.tag in SKIPPED_FIELDS:
+                    continue
+
+                field_value = tag_patching.decode_field_value(field_node, field_bytes, tag_dict["Header"], file_endian)
+                self.assertEqual(field_value, tag_fixtures.get_tag_dict_value(tag_dict["Data"], field_path), (file_path, field_path))
+                field_count += 1
+
+        self.assertGreater(field_count, 1000)
+
+    def test_reference_scan_matches_read_file(self):
+        reference_count = 0
+        for engine_tag, file_path in self.tag_files:
+            tag_dict = tag_fixtures.read_layout_tag(file_path, engine_tag)
+            with open(file_path, "rb") as tag_stream:
+                scanned_references = tag_layout.scan_tag_references(tag_fixtures.get_merged_defs(engine_tag), tag_stream)
+
+            read_references = get_tag_references(tag_dict["Data"], (), [])
+            self.assertEqual(sorted(scanned_references, key=str), sorted(read_references, key=str), file_path)
+            reference_count += len(read_references)
+
+        self.assertGreater(reference_count, 0)
+
+    def test_patch_matches_full_write(self):
+        patched_count = 0
+        for engine_tag, file_path in self.tag_files:
+            merged_defs = tag_fixtures.get_merged_defs(engine_tag)
+            tag_dict = tag_fixtures.read_layout_tag(file_path, engine_tag)
+            with open(file_path, "rb") as tag_stream:
+                tag_bytes = tag_stream.read()
+
+            if not write_tag_bytes(engine_tag, tag_dict, file_path) == tag_bytes:
+                # Tags that don't round trip as is can't be compared after a patch either.
+                continue
+
+            with open(file_path, "rb") as tag_stream:
+                patch_records = [(field_path, field_node) for field_path, field_node, offset, field_bytes, tail_offset in tag_layout.iterate_tag_layout(merged_defs, tag_stream)
+                                 if field_node.tag in PATCH_VALUES and tag_patching.is_field_patchable(field_node)]
+
+            if len(patch_records) == 0:
+                continue
+
+            field_values = [(field_path, PATCH_VALUES[field_node.tag]) for field_path, field_node in patch_records[:3] + patch_records[-2:]]
+            tag_stream = io.BytesIO(tag_bytes)
+            tag_patching.patch_tag_stream(merged_defs, tag_stream, field_values)
+            patched_bytes = tag_stream.getvalue()
+
+            for field_path, field_value in field_values:
+                tag_block_fields = tag_fixtures.get_tag_dict_value(tag_dict["Data"], field_path[:-1])
+                tag_block_fields[field_path[-1]] = field_value
+
+            self.assertEqual(patched_bytes, write_tag_bytes(engine_tag, tag_dict, file_path), file_path)
+            header = tag_interface.read_header(io.BytesIO(patched_bytes), tag_layout.get_file_endian(tag_dict["Header"]["engine tag"]))
+            self.assertEqual(header["checksum"], tag_interface.checksum_calculate(patched_bytes[64:], tag_interface.obfuscation_buffer_prepare()), file_path)
+            patched_count += 1
+
+        self.assertGreater(patched_count, 100)
+
+    def test_checksum_patch(self):
+        obfuscation_buffer = tag_interface.obfuscation_buffer_prepare()
+        old_bytes = bytes(range(37))
+        new_bytes = bytes([old_bytes[0] ^ 1]) + old_bytes[1:36] + b"\xff"
+        for trailing_length in (0, 1, 2, 3, 7, 8, 255, 4097):
+            trailing_bytes = bytes(byte_idx % 251 for byte_idx in range(trailing_length))
+            checksum = tag_interface.checksum_calculate(b"tag" + old_bytes + trailing_bytes, obfuscation_buffer)
+            self.assertEqual(tag_interface.checksum_patch(checksum, old_bytes, new_bytes, trailing_length),
+                             tag_interface.checksum_calculate(b"tag" + new_bytes + trailing_bytes, obfuscation_buffer))
+
+if __name__ == "__main__":
+    unittest.main()
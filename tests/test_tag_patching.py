@@ -0,0 +1,67 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_interface
+import tag_patching
+
+class BulkEditTests(unittest.TestCase):
+    def setUp(self):
+        self.tags_dir = tempfile.mkdtemp()
+        self.tag_files = [tag_fixtures.write_default_tag(self.tags_dir, "bipd", "objects\\biped_%d" % tag_idx, bounding_radius=float(tag_idx + 1)) for tag_idx in range(3)]
+        tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "objects\\model")
+
+    def tearDown(self):
+        shutil.rmtree(self.tags_dir, ignore_errors=True)
+
+    def read_tag(self, file_path):
+        return tag_interface.read_file(tag_fixtures.get_merged_defs(), self.tags_dir, file_path)
+
+    def test_expression_patches_in_place(self):
+        report = tag_patching.bulk_edit_directory(self.tags_dir, "bipd", ("bounding radius",), expression="value * 2", merged_defs=tag_fixtures.get_merged_defs(), workers=1)
+        self.assertEqual((report["patched"], report["rewritten"], report["errors"]), (3, 0, 0))
+        for tag_idx, file_path in enumerate(self.tag_files):
+            self.assertEqual(self.read_tag(file_path)["Data"]["bounding radius"], float(tag_idx + 1) * 2)
+
+    def test_variable_size_field_is_rewritten(self):
+        tag_reference = tag_fixtures.get_tag_reference("hlmt", "objects\\model")
+        report = tag_patching.bulk_edit_directory(self.tags_dir, "bipd", ("model",), value=tag_reference, merged_defs=tag_fixtures.get_merged_defs(), workers=1)
+        self.assertEqual((report["patched"], report["rewritten"], report["errors"]), (0, 3, 0))
+        for file_path in self.tag_files:
+            self.assertEqual(self.read_tag(file_path)["Data"]["model"]["path"], "objects\\model")
+
+    def test_workers_match_single_process(self):
+        report = tag_patching.bulk_edit_directory(self.tags_dir, "bipd", ("bounding radius",), value=5.0, merged_defs=tag_fixtures.get_merged_defs(), workers=2)
+        self.assertEqual(report["patched"], 3)
+        self.assertEqual([self.read_tag(file_path)["Data"]["bounding radius"] for file_path in self.tag_files], [5.0] * 3)
+
+if __name__ == "__main__":
+    unittest.main()
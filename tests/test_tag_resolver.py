@@ -0,0 +1,98 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tempfile
+import unittest
+import multiprocessing
+
+from concurrent.futures import ProcessPoolExecutor
+
+import tag_fixtures
+import tag_graph
+import tag_resolver
+
+def find_forked_tag(tag_directory, tag_path, tag_extension):
+    # Runs in the worker, the parent tagged its index so a rebuilt one comes back without the mark.
+    tag_file = tag_resolver.find_tag_file(tag_directory, tag_path, tag_extension)
+
+    return tag_file, getattr(tag_resolver.get_path_index(tag_directory), "test_mark", None)
+
+class TagResolverTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        tag_fixtures.write_tag_graph(self.tags_dir)
+        tag_resolver.clear_path_indexes()
+
+    def tearDown(self):
+        tag_resolver.clear_path_indexes()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_forked_worker_reuses_index(self):
+        path_index = tag_resolver.get_path_index(self.tags_dir)
+        path_index.test_mark = os.getpid()
+        shader_path = tag_fixtures.get_tag_path(self.tags_dir, "shad", "objects\\test\\skin")
+        with ProcessPoolExecutor(1, mp_context=multiprocessing.get_context("fork")) as executor:
+            tag_file, test_mark = executor.submit(find_forked_tag, self.tags_dir, "objects\\test\\skin", "shader").result()
+
+        self.assertEqual(tag_file, shader_path)
+        self.assertEqual(test_mark, os.getpid())
+
+    def test_index_keyed_on_root_path(self):
+        path_index = tag_resolver.get_path_index(self.tags_dir)
+        self.assertIs(tag_resolver.get_path_index(os.path.join(self.tags_dir, "objects", "..")), path_index)
+        self.assertIs(tag_resolver.refresh_path_index(self.tags_dir), path_index)
+        self.assertEqual(list(tag_resolver.TAG_PATH_INDEXES), [os.path.abspath(self.tags_dir)])
+
+    def test_new_file_found_after_index_built(self):
+        self.assertIsNone(tag_resolver.find_tag_file(self.tags_dir, "objects\\test\\added", "model"))
+        added_path = tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "objects\\test\\added")
+        self.assertEqual(tag_resolver.find_tag_file(self.tags_dir, "objects\\test\\added", "model"), added_path)
+
+    def test_lookup_ignores_case(self):
+        crate_path = tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "Levels\\Shared\\Crate")
+        for tag_path in ("Levels\\Shared\\Crate", "levels\\shared\\crate", "LEVELS/shared/CRATE"):
+            self.assertEqual(tag_resolver.find_tag_file(self.tags_dir, tag_path, "model"), crate_path)
+
+        self.assertIsNone(tag_resolver.find_tag_file(self.tags_dir, "levels\\shared\\crate", "biped"))
+
+    def test_case_collision_picks_first_sorted_name(self):
+        tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "objects\\case\\crate")
+        upper_path = tag_fixtures.write_default_tag(self.tags_dir, "hlmt", "objects\\case\\Crate")
+        self.assertEqual(tag_resolver.find_tag_file(self.tags_dir, "objects\\case\\CRATE", "model"), upper_path)
+
+    def test_graph_nodes_ignore_case(self):
+        graph = tag_graph.TagGraph()
+        shader_node = graph.add_node("shad", "Objects\\Test\\Skin")
+        self.assertIs(graph.add_node("shad", "objects/test/skin"), shader_node)
+        self.assertIs(graph.get_node("shad", "OBJECTS\\TEST\\SKIN"), shader_node)
+        self.assertEqual(shader_node.tag_path, "Objects\\Test\\Skin")
+
+if __name__ == "__main__":
+    unittest.main()
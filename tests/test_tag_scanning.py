@@ -0,0 +1,85 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_interface
+import tag_scanning
+
+HEADER_FIELDS = ("tag group", "engine tag", "version", "checksum", "flags", "tag type", "data offset", "data length", "destination", "plugin handle")
+
+class TagScanningTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.tags_dirs = {}
+        for engine_tag in (tag_fixtures.H1_ENGINE_TAG, tag_fixtures.H2_ENGINE_TAG):
+            tags_dir = cls.tags_dirs[engine_tag] = os.path.join(cls.temp_dir, engine_tag.strip("!"))
+            tag_fixtures.write_random_tags(tags_dir, engine_tag)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def test_scan_matches_read_file(self):
+        for engine_tag, tags_dir in self.tags_dirs.items():
+            merged_defs = tag_fixtures.get_merged_defs(engine_tag)
+            scan_records = tag_scanning.scan_tag_headers(tags_dir, engine_tag)
+            self.assertEqual([scan_record[0] for scan_record in scan_records], sorted(os.listdir(tags_dir)))
+            for scan_record in scan_records:
+                tag_header = dict(zip(tag_scanning.SCAN_FIELDS, scan_record))
+                file_path = os.path.join(tags_dir, tag_header["path"])
+                tag_dict = tag_interface.read_file(merged_defs, tags_dir, file_path, engine_tag=engine_tag)
+                self.assertEqual({field: tag_header[field] for field in HEADER_FIELDS}, {field: tag_dict["Header"][field] for field in HEADER_FIELDS}, file_path)
+                self.assertEqual(tag_header["file size"], os.path.getsize(file_path))
+                self.assertTrue(tag_scanning.is_scan_record_valid(scan_record))
+                if engine_tag == tag_fixtures.H1_ENGINE_TAG:
+                    self.assertIsNone(tag_header["root count"])
+                else:
+                    self.assertEqual(tag_header["root count"], 1)
+
+    def test_threaded_scan_matches_serial(self):
+        tags_dir = self.tags_dirs[tag_fixtures.H2_ENGINE_TAG]
+        self.assertEqual(tag_scanning.scan_tag_headers(tags_dir, workers=4), tag_scanning.scan_tag_headers(tags_dir, workers=1))
+
+    def test_short_file_is_invalid(self):
+        file_path = os.path.join(self.temp_dir, "short.biped")
+        with open(file_path, "wb") as short_file:
+            short_file.write(bytes(32))
+
+        scan_record = tag_scanning.scan_tag_header(file_path)
+        self.assertIsNone(scan_record[1])
+        self.assertEqual(scan_record[5], 32)
+        self.assertFalse(tag_scanning.is_scan_record_valid(scan_record))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,177 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import tag_fixtures
+
+import tag_cache
+import tag_interface
+import tag_resolver
+import tag_store
+
+def get_asset(checksum, tag_name, size=0):
+    return {"TagName": tag_name, "Header": {"checksum": checksum}, "Data": {"filler": bytes(size)}}
+
+class AssetStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store_path = os.path.join(self.temp_dir, "asset_store.db")
+        self.connection = tag_store.open_asset_store(self.store_path)
+
+    def tearDown(self):
+        self.connection.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def get_payload_keys(self):
+        return sorted(row["content_key"] for row in self.connection.execute("SELECT content_key FROM asset_payloads"))
+
+    def test_store_and_load(self):
+        tag_store.store_asset(self.connection, "objects/a", "biped", get_asset(1, "tags/objects/a.biped"), "content 1")
+        self.assertEqual(tag_store.get_asset_checksum(self.connection, "objects/a", "biped"), 1)
+        self.assertEqual(tag_store.load_asset(self.connection, "objects/a", "biped"), get_asset(1, "tags/objects/a.biped"))
+        self.assertIsNone(tag_store.load_asset(self.connection, "objects/a", "biped", 2))
+        self.assertIsNone(tag_store.load_asset(self.connection, "objects/a", "vehicle"))
+
+        # Copies share the payload and keep their own TagName.
+        tag_store.link_asset(self.connection, "objects/b", "biped", 1, "content 1", "tags/objects/b.biped")
+        self.assertEqual(tag_store.load_asset(self.connection, "objects/b", "biped")["TagName"], "tags/objects/b.biped")
+        self.assertEqual(tag_store.load_content(self.connection, "content 1", "tags/objects/c.biped")["TagName"], "tags/objects/c.biped")
+        self.assertEqual(self.get_payload_keys(), ["content 1"])
+
+        tag_store.store_asset(self.connection, "objects/a", "biped", get_asset(2, "tags/objects/a.biped"), "content 2")
+        self.assertEqual(self.get_payload_keys(), ["content 1", "content 2"])
+        tag_store.remove_asset(self.connection, "objects/b", "biped")
+        self.assertEqual(self.get_payload_keys(), ["content 2"])
+
+    def test_evict_shared_payloads(self):
+        for tag_idx, content_key in enumerate(("shared", "shared", "single", "newest")):
+            tag_store.store_asset(self.connection, "objects/%d" % tag_idx, "biped", get_asset(tag_idx, "objects/%d.biped" % tag_idx, 65536), content_key)
+            self.connection.execute("UPDATE assets SET last_access = ? WHERE tag_path = ?", (tag_idx, "objects/%d" % tag_idx))
+            self.connection.commit()
+
+        payload_size = self.connection.execute("SELECT payload_size FROM asset_payloads WHERE content_key = 'single'").fetchone()[0]
+        self.assertEqual(tag_store.evict_assets(self.connection, tag_store.get_store_size(self.connection)), 0)
+
+        # Dropping the first user of the shared payload frees nothing so the second one has to go too.
+        self.assertEqual(tag_store.evict_assets(self.connection, tag_store.get_store_size(self.connection) - 1), 2)
+        self.assertEqual(self.get_payload_keys(), ["newest", "single"])
+        self.assertEqual(tag_store.evict_assets(self.connection, payload_size), 1)
+        self.assertEqual(self.get_payload_keys(), ["newest"])
+
+    def test_concurrent_writers(self):
+        errors = []
+        def write_assets(writer_idx):
+            connection = tag_store.open_asset_store(self.store_path)
+            try:
+                for write_idx in range(40):
+                    content_key = "content %d %d" % (writer_idx, write_idx)
+                    if write_idx % 2 == 0:
+                        tag_store.store_asset(connection, "objects/shared", "biped", get_asset(write_idx, "objects/shared.biped"), content_key)
+                    else:
+                        tag_store.link_asset(connection, "objects/shared", "biped", write_idx, "content 0 0")
+                        tag_store.store_asset(connection, "objects/%d" % writer_idx, "biped", get_asset(write_idx, "objects/%d.biped" % writer_idx), content_key)
+
+                    tag_store.evict_assets(connection, 0)
+
+            except Exception as e:
+                errors.append(e)
+
+            finally:
+                connection.close()
+
+        writers = [threading.Thread(target=write_assets, args=(writer_idx,)) for writer_idx in range(4)]
+        for writer in writers:
+            writer.start()
+
+        for writer in writers:
+            writer.join()
+
+        self.assertEqual(errors, [])
+        # No payload is left behind without a path using it.
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM asset_payloads WHERE content_key NOT IN (SELECT content_key FROM assets)").fetchone()[0], 0)
+
+class TagDictionaryStoreTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        self.root_tag_ref = tag_fixtures.write_tag_graph(self.tags_dir)
+        self.model_path = tag_fixtures.get_tag_path(self.tags_dir, "hlmt", "objects\\test\\test")
+        self.copy_path = tag_fixtures.get_tag_path(self.tags_dir, "hlmt", "objects\\copy\\test")
+        os.makedirs(os.path.dirname(self.copy_path))
+        shutil.copyfile(self.model_path, self.copy_path)
+        self.merged_defs = tag_fixtures.get_merged_defs()
+        self.tag_groups, self.tag_extensions = tag_interface.get_tag_extensions(tag_fixtures.H2_ENGINE_TAG)
+        self.connection = tag_store.open_asset_store(os.path.join(self.temp_dir, "asset_store.db"))
+
+    def tearDown(self):
+        tag_cache.disable_tag_cache()
+        self.connection.close()
+        tag_resolver.clear_path_indexes()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def generate_tag_dictionary(self, root_tag_ref, asset_cache=None):
+        return tag_interface.generate_tag_dictionary("halo2", root_tag_ref, self.tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG, self.merged_defs, asset_cache,
+                                                     asset_store=self.connection)
+
+    def test_copies_share_one_payload(self):
+        asset_cache = self.generate_tag_dictionary(tag_fixtures.get_tag_reference("hlmt", "Objects\\Test\\Test"))
+        self.generate_tag_dictionary(tag_fixtures.get_tag_reference("hlmt", "objects\\copy\\test"), asset_cache)
+        self.assertTrue(asset_cache["hlmt"]["Objects\\Test\\Test"]["matching_checksum"])
+        self.assertTrue(asset_cache["hlmt"]["objects\\copy\\test"]["matching_checksum"])
+
+        # The model, its render model, the shader and its template, with the copy pointing at the model's payload.
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM assets").fetchone()[0], 5)
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM asset_payloads").fetchone()[0], 4)
+        self.assertEqual(tag_store.get_asset_content_key(self.connection, "objects/test/test", "model"), tag_store.get_asset_content_key(self.connection, "objects/copy/test", "model"))
+        self.assertEqual(tag_store.load_asset(self.connection, "objects/test/test", "model")["TagName"], self.model_path)
+        self.assertEqual(tag_store.load_asset(self.connection, "objects/copy/test", "model")["TagName"], self.copy_path)
+
+    def test_spellings_share_one_entry(self):
+        asset_cache = self.generate_tag_dictionary(self.root_tag_ref)
+        # The biped and the template spell the shader differently, both are there and it was only walked once.
+        self.assertEqual(sorted(asset_cache["shad"]), ["Objects\\Test\\Skin", "objects\\test\\skin"])
+        self.assertIs(asset_cache["shad"]["Objects\\Test\\Skin"], asset_cache["shad"]["objects\\test\\skin"])
+        self.assertTrue(asset_cache["shad"]["objects\\test\\skin"]["matching_checksum"])
+
+    def test_reads_through_tag_cache(self):
+        uncached_dict = tag_interface.read_file(self.merged_defs, self.tags_dir, self.model_path)
+        tag_cache.enable_tag_cache(64 * 1024 * 1024, view="readonly")
+        self.generate_tag_dictionary(self.root_tag_ref)
+        self.assertGreater(tag_cache.get_tag_cache_stats()["misses"], 0)
+
+        # The walk prepares floats on its own copy so what the cache holds is still the tag as read.
+        cached_dict = tag_interface.read_file(self.merged_defs, self.tags_dir, self.model_path)
+        self.assertEqual(tag_cache.get_tag_cache_stats()["hits"], 1)
+        self.assertEqual(tag_cache.get_private_tag(cached_dict)["Data"], uncached_dict["Data"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_graph
+import tag_interface
+import tag_resolver
+import tag_traversal
+
+def get_node_depths(graph):
+    return {node.key: node.depth for node in graph}
+
+class TraversalPolicyTests(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.tags_dir = os.path.join(self.temp_dir, "tags")
+        self.root_tag_ref = tag_fixtures.write_tag_graph(self.tags_dir)
+        self.merged_defs = tag_fixtures.get_merged_defs()
+        self.tag_groups, self.tag_extensions = tag_interface.get_tag_extensions(tag_fixtures.H2_ENGINE_TAG)
+
+    def tearDown(self):
+        tag_resolver.clear_path_indexes()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def load_graph(self, traversal_policy, workers=1, **graph_options):
+        return tag_graph.load_tag_graph("halo2", self.root_tag_ref, self.tags_dir, tag_fixtures.H2_ENGINE_TAG, self.merged_defs, workers=workers,
+                                        traversal_policy=traversal_policy, **graph_options)
+
+    def get_references(self, game_title, tag_block_fields, traversal_policy):
+        tag_references = []
+        for field_node in tag_fixtures.get_latest_field_set(self.merged_defs["hlmt"]):
+            tag_interface.get_tag_references(field_node, tag_block_fields, tag_references, game_title, self.tags_dir, self.tag_groups, tag_fixtures.H2_ENGINE_TAG,
+                                             self.merged_defs, {}, False, traversal_policy, "hlmt")
+
+        return [(tag_reference["group name"], tag_reference["path"]) for tag_reference in tag_references]
+
+    def test_group_aliases(self):
+        traversal_policy = tag_interface.DEFAULT_TRAVERSAL_POLICY
+        self.assertEqual(traversal_policy.get_reference_group("halo1", "mode"), "mod2")
+        self.assertEqual(traversal_policy.get_reference_group("halo2", "mode"), "mode")
+        self.assertEqual(traversal_policy.get_reference_group("halo1", "shad"), "shad")
+
+        tag_block_fields = {"render model": tag_fixtures.get_tag_reference("mode", "objects\\test\\test"),
+                            "collision model": tag_fixtures.get_tag_reference("coll", "objects\\test\\test")}
+        self.assertEqual(self.get_references("halo2", tag_block_fields, tag_traversal.TraversalPolicy(group_aliases={"halo1": {"mode": "mod2"}})),
+                         [("mode", "objects\\test\\test"), ("coll", "objects\\test\\test")])
+        self.assertEqual(self.get_references("halo1", tag_block_fields, tag_traversal.TraversalPolicy(group_aliases={"halo1": {"mode": "mod2"}})),
+                         [("mod2", "objects\\test\\test"), ("coll", "objects\\test\\test")])
+        # Allowed groups are checked against the group after the alias.
+        tag_block_fields["render model"]["group name"] = "mode"
+        self.assertEqual(self.get_references("halo1", tag_block_fields, tag_traversal.TraversalPolicy(allowed_groups={"mode"}, group_aliases={"halo1": {"mode": "mod2"}})), [])
+
+    def test_field_filter(self):
+        traversal_policy = tag_traversal.TraversalPolicy(excluded_fields={("hlmt", "collision model")})
+        field_filter = traversal_policy.get_field_filter("hlmt")
+        field_nodes = {field_node.get("name"): field_node for field_node in tag_fixtures.get_latest_field_set(self.merged_defs["hlmt"])}
+        self.assertFalse(field_filter(field_nodes["collision model"]))
+        self.assertTrue(field_filter(field_nodes["render model"]))
+        self.assertTrue(traversal_policy.get_field_filter("bipd")(field_nodes["collision model"]))
+
+        graph = self.load_graph(traversal_policy)
+        self.assertIsNone(graph.get_node("coll", "objects\\test\\missing"))
+        self.assertIsNotNone(graph.get_node("mode", "objects\\test\\test"))
+        self.assertEqual(get_node_depths(self.load_graph(traversal_policy, references_only=True)), get_node_depths(graph))
+
+    def test_group_rules(self):
+        traversal_policy = tag_traversal.TraversalPolicy(allowed_groups={"hlmt", "shad"}, group_rules={"bipd": {"hlmt"}})
+        self.assertEqual(get_node_depths(self.load_graph(traversal_policy)), {("bipd", "objects/test/test"): 0, ("hlmt", "objects/test/test"): 1, ("shad", "objects/test/skin"): 2})
+
+    def test_policy_pickles_without_cache(self):
+        traversal_policy = tag_traversal.TraversalPolicy(allowed_groups={"hlmt"})
+        traversal_policy.get_field_filter("bipd")(tag_fixtures.get_latest_field_set(self.merged_defs["hlmt"])[0])
+        self.assertEqual(pickle.loads(pickle.dumps(traversal_policy)).field_cache, {})
+
+    def test_max_depth_keeps_shortest_depth(self):
+        # The shader is one reference from the biped and two through the model, the template past it is only reached
+        # at depth 2 when the shader got the shorter depth.
+        for workers in (1, 2):
+            self.assertEqual(get_node_depths(self.load_graph(tag_traversal.TraversalPolicy(max_depth=1), workers)),
+                             {("bipd", "objects/test/test"): 0, ("hlmt", "objects/test/test"): 1, ("shad", "objects/test/skin"): 1, ("effe", "effects/test/spawn"): 1})
+            graph = self.load_graph(tag_traversal.TraversalPolicy(max_depth=2), workers)
+            self.assertEqual(get_node_depths(graph)[("stem", "shaders/test")], 2)
+            self.assertEqual(get_node_depths(graph), get_node_depths(self.load_graph(tag_traversal.TraversalPolicy(), workers)))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,121 @@
+# ##### BEGIN MIT LICENSE BLOCK #####
+#
+# MIT License
+#
+# Copyright (c) 2025 Steven Garcia
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+#
+# ##### END MIT LICENSE BLOCK #####
+
+
+import os
+import copy
+import shutil
+import tempfile
+import unittest
+
+import tag_fixtures
+
+import tag_defaults
+import tag_interface
+
+class TagWriteTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.mkdtemp()
+        cls.tag_files = []
+        for engine_tag in (tag_fixtures.H1_ENGINE_TAG, tag_fixtures.H2_ENGINE_TAG):
+            tags_dir = os.path.join(cls.temp_dir, engine_tag.strip("!"))
+            cls.tag_files.extend((engine_tag, file_path) for file_path in tag_fixtures.write_random_tags(tags_dir, engine_tag))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.temp_dir, ignore_errors=True)
+
+    def write_tag(self, engine_tag, tag_dict, output_path, **write_options):
+        # write_file encodes the header in place.
+        return tag_interface.write_file(tag_fixtures.get_merged_defs(engine_tag), copy.deepcopy(tag_dict), tag_interface.obfuscation_buffer_prepare(), output_path,
+                                        engine_tag=engine_tag, **write_options)
+
+    def test_streaming_matches_buffered(self):
+        output_dir = os.path.join(self.temp_dir, "output")
+        os.makedirs(output_dir, exist_ok=True)
+        for engine_tag, file_path in self.tag_files:
+            tag_dict = tag_interface.read_file(tag_fixtures.get_merged_defs(engine_tag), os.path.dirname(file_path), file_path, engine_tag=engine_tag)
+            buffered_path = os.path.join(output_dir, "buffered_" + os.path.basename(file_path))
+            streamed_path = os.path.join(output_dir, "streamed_" + os.path.basename(file_path))
+            self.write_tag(engine_tag, tag_dict, buffered_path)
+            self.write_tag(engine_tag, tag_dict, streamed_path, streaming=True)
+            with open(buffered_path, "rb") as buffered_file, open(streamed_path, "rb") as streamed_file:
+                self.assertEqual(buffered_file.read(), streamed_file.read(), file_path)
+
+        self.assertEqual([file for file in os.listdir(output_dir) if file.endswith(".tmp")], [])
+
+    def test_failed_write_keeps_old_tag(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        output_path = tag_fixtures.write_default_tag(self.temp_dir, "bipd", "failed_write")
+        os.chmod(output_path, 0o640)
+        with open(output_path, "rb") as tag_file:
+            tag_bytes = tag_file.read()
+
+        tag_dict = tag_defaults.get_default_tag_dict(merged_defs, "bipd")
+        tag_dict["Data"]["bounding radius"] = "not a float"
+        for streaming in (False, True):
+            with self.assertRaises(Exception):
+                self.write_tag(tag_fixtures.H2_ENGINE_TAG, tag_dict, output_path, streaming=streaming)
+
+            with open(output_path, "rb") as tag_file:
+                self.assertEqual(tag_file.read(), tag_bytes)
+
+        tag_dict["Data"]["bounding radius"] = 2.0
+        for streaming in (False, True):
+            self.write_tag(tag_fixtures.H2_ENGINE_TAG, tag_dict, output_path, streaming=streaming)
+            self.assertEqual(os.stat(output_path).st_mode & 0o777, 0o640)
+
+        self.assertEqual([file for file in os.listdir(os.path.dirname(output_path)) if file.endswith(".tmp")], [])
+
+    def test_skip_identical(self):
+        output_path = tag_fixtures.write_default_tag(self.temp_dir, "bipd", "skip_identical")
+        tag_dict = tag_interface.read_file(tag_fixtures.get_merged_defs(), self.temp_dir, output_path)
+        os.utime(output_path, ns=(1000000000, 1000000000))
+        for streaming in (False, True):
+            write_result = self.write_tag(tag_fixtures.H2_ENGINE_TAG, tag_dict, output_path, streaming=streaming, skip_identical=True)
+            self.assertFalse(write_result["written"])
+            self.assertEqual(os.stat(output_path).st_mtime_ns, 1000000000)
+
+        tag_dict["Data"]["bounding radius"] = 3.0
+        write_result = self.write_tag(tag_fixtures.H2_ENGINE_TAG, tag_dict, output_path, skip_identical=True)
+        self.assertTrue(write_result["written"])
+        self.assertEqual(tag_interface.read_file(tag_fixtures.get_merged_defs(), self.temp_dir, output_path)["Data"]["bounding radius"], 3.0)
+
+    def test_old_string_id_round_trip(self):
+        merged_defs = tag_fixtures.get_merged_defs()
+        output_path = os.path.join(self.temp_dir, "old_string_id.antenna")
+        for marker_name, expected_name in ((None, ""), ("", ""), ("marker", "marker")):
+            tag_dict = tag_defaults.get_default_tag_dict(merged_defs, "ant!")
+            tag_dict["Data"]["attachment marker name"] = marker_name
+            tag_dict["Data"]["attachment marker name_pad"] = None
+            self.write_tag(tag_fixtures.H2_ENGINE_TAG, tag_dict, output_path)
+            tag_dict = tag_interface.read_file(merged_defs, self.temp_dir, output_path)
+            self.assertEqual(tag_dict["Data"]["attachment marker name"], expected_name)
+            self.assertEqual(tag_dict["Data"]["attachment marker name_pad"], 0)
+
+if __name__ == "__main__":
+    unittest.main()